@@ -0,0 +1,111 @@
+# backend/analytics.py
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, type_coerce, BigInteger
+from sqlalchemy.orm import selectinload
+from config import Config
+from models import Order, Product, SalesDaily, ProductSales, CategorySales
+from pagination import TTLCache
+from sales_rollups import day_bucket
+from money import from_cents
+
+SUMMARY_PERIODS = ('7', '30', '90', '365')  # anything else means all time
+
+
+def summary_metrics(db, period, now):
+    """Period, today and yesterday totals in one conditional-aggregation pass
+    over sales_daily -> (revenue, orders, today revenue, today orders, yesterday revenue),
+    revenues as integer cents"""
+    today_day = day_bucket(now)
+    yesterday_day = day_bucket(now - timedelta(days=1))
+    start_day = day_bucket(now - timedelta(days=int(period))) if period in SUMMARY_PERIODS else None
+
+    def when(condition, column):
+        return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+    # The raw cents, not Money's dollars, so the sums stay integers
+    revenue = type_coerce(SalesDaily.revenue, BigInteger)
+    if start_day:
+        period_revenue = when(SalesDaily.day >= start_day, revenue)
+        period_orders = when(SalesDaily.day >= start_day, SalesDaily.order_count)
+    else:
+        period_revenue = func.coalesce(func.sum(revenue), 0)
+        period_orders = func.coalesce(func.sum(SalesDaily.order_count), 0)
+
+    query = db.query(
+        period_revenue,
+        period_orders,
+        when(SalesDaily.day == today_day, revenue),
+        when(SalesDaily.day == today_day, SalesDaily.order_count),
+        when(SalesDaily.day == yesterday_day, revenue)
+    )
+    if start_day:
+        # Every period starts on or before yesterday
+        query = query.filter(SalesDaily.day >= start_day)
+    return query.one()
+
+
+def analytics_summary(db, period, now=None):
+    """Dashboard summary payload; five statements whatever the order history size"""
+    now = now or datetime.utcnow()
+    total_revenue, total_orders, today_revenue, today_orders, yesterday_revenue = \
+        summary_metrics(db, period, now)
+
+    # Average order value, in cents rounded half-up
+    avg_order_value = (2 * total_revenue + total_orders) // (2 * total_orders) if total_orders > 0 else 0
+
+    # Calculate growth percentage
+    revenue_growth = 0
+    if yesterday_revenue > 0:
+        revenue_growth = ((today_revenue - yesterday_revenue) / yesterday_revenue) * 100
+
+    top_products = db.query(
+        ProductSales.product_id,
+        Product.name,
+        ProductSales.quantity,
+        ProductSales.revenue
+    ).join(Product, ProductSales.product_id == Product.id)\
+     .order_by(ProductSales.quantity.desc())\
+     .limit(5)\
+     .all()
+
+    category_sales = db.query(
+        CategorySales.category,
+        CategorySales.quantity,
+        CategorySales.revenue
+    ).order_by(CategorySales.revenue.desc()).all()
+
+    # Items loaded with one selectin query for to_dict()'s item_count
+    recent_orders = db.query(Order).options(
+        selectinload(Order.line_items)
+    ).order_by(Order.created_at.desc(), Order.id.desc()).limit(10).all()
+
+    return {
+        'success': True,
+        'period': period,
+        'summary': {
+            'total_revenue': from_cents(total_revenue),
+            'total_orders': total_orders,
+            'avg_order_value': from_cents(avg_order_value),
+            'today_revenue': from_cents(today_revenue),
+            'today_orders': today_orders,
+            'revenue_growth': round(revenue_growth, 2),
+            'yesterday_revenue': from_cents(yesterday_revenue)
+        },
+        'top_products': [{
+            'product_id': p[0],
+            'name': p[1],
+            'total_quantity': p[2] or 0,
+            'total_revenue': float(p[3] or 0)
+        } for p in top_products],
+        'category_sales': [{
+            'category': c[0] or 'Uncategorized',
+            'total_quantity': c[1] or 0,
+            'total_revenue': float(c[2] or 0)
+        } for c in category_sales],
+        'recent_orders': [order.to_dict() for order in recent_orders]
+    }
+
+
+# Summary responses keyed by (period, UTC day); cleared when an order is
+# created, and the TTL bounds staleness from orders placed on other workers
+analytics_cache = TTLCache(ttl_seconds=Config.ANALYTICS_CACHE_TTL)
@@ -1,14 +1,33 @@
-from flask import Flask, request, jsonify, session, redirect, url_for, render_template
+from flask import Flask, request, jsonify, session, redirect, url_for, render_template, make_response, Response, stream_with_context
 from flask_cors import CORS
-from cart_singleton import cart_manager
-from database import get_db, init_db, get_db_session
-from models import OrderItem, Order, Product, CartItem, User
+from cart_singleton import cart_manager, bump_cart_version
+from catalog_cache import catalog_cache, bump_catalog_version, ensure_catalog_version
+from version_counters import bump_version_counter
+from role_cache import role_cache
+from database import get_db, init_db, get_db_session, engine
+from query_counter import install_query_counter, query_budget
+from models import OrderItem, Order, Product, CartItem, User, SalesDaily, SalesHourly, Promotion
 from factories import ProductFactoryManager, ProductBuilder
-from sqlalchemy import desc, asc, or_
-from datetime import datetime
-import random
-import string
+from search_index import apply_search
+from facets import parse_facets, facet_counts_from_query, facet_counts_from_rows
+from checkout import checkout_cart, EmptyCartError, CouponError
+from sales_rollups import ensure_sales_rollups, day_bucket
+from analytics import analytics_summary, analytics_cache
+from timeseries import sales_series, InvalidSeries
+from exports import EXPORT_FORMATS, orders_export_statement, order_items_export_statement, stream_rows
+from promotions import promotion_index, to_discount, ensure_default_promotions
+from pricing_engine import price_cart
+from discount_optimizer import optimize_discounts
+from order_numbers import order_number_generator
+from idempotency import idempotent, store_idempotent_response, IdempotencyKeyLost
+from pagination import encode_cursor, decode_cursor, apply_keyset, InvalidCursor, product_count_cache
+from sqlalchemy import desc, asc, or_, case, select, literal, String
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from datetime import datetime, timedelta
 import json
+import hashlib
 from config import Config
 from discount_decorators import DiscountFactory, BasePriceCalculator
 from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, func  # Add func here
@@ -36,19 +55,22 @@ from discount_decorators import (
 CORS(app, 
      origins=["http://localhost:8000", "http://localhost:5000", "http://127.0.0.1:8000", "http://127.0.0.1:5000", "null"],
      supports_credentials=True,
-     allow_headers=['Content-Type', 'Authorization', 'Accept', 'X-Requested-With', 'Origin'],
+     allow_headers=['Content-Type', 'Authorization', 'Accept', 'X-Requested-With', 'Origin', 'Idempotency-Key'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'PATCH'],
      expose_headers=['Content-Type', 'Authorization', 'Set-Cookie'],
      allow_credentials=True)
 # Initialize database
 init_db()
+ensure_default_promotions()
+ensure_catalog_version()
+ensure_sales_rollups()
+order_number_generator.prepare()
+install_query_counter(app, engine)
 
 # Utility functionsf
 def generate_order_number():
     """Generate unique order number"""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    return f"ORD-{timestamp}-{random_str}"
+    return order_number_generator.next_order_number()
 # Add this decorator function RIGHT AFTER YOUR IMPORTS, before your routes
 def admin_required(f):
     @wraps(f)
@@ -56,19 +78,59 @@ def admin_required(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Unauthorized', 'success': False}), 401
         
-        # Check if user is admin
-        db = get_db_session()
+        # Check if user is admin (role cached briefly, see role_cache.py)
         try:
-            user = db.query(User).filter(User.id == session['user_id']).first()
-            if not user or user.role != 'admin':
-                return jsonify({'error': 'Admin access required', 'success': False}), 403
+            role = role_cache.get_role(session['user_id'], load_user_role)
         except Exception as e:
             return jsonify({'error': str(e), 'success': False}), 500
-        finally:
-            db.close()
+        if role != 'admin':
+            return jsonify({'error': 'Admin access required', 'success': False}), 403
         
         return f(*args, **kwargs)
     return decorated_function
+def load_user_role(user_id):
+    """Current role from the database, None if the user no longer exists"""
+    db = get_db_session()
+    try:
+        return db.query(User.role).filter(User.id == user_id).scalar()
+    finally:
+        db.close()
+def catalog_conditional_get(f):
+    """ETag / Last-Modified support for catalog reads.
+
+    The ETag is derived from the shared catalog version, so it is the same
+    on every worker and across restarts, and If-None-Match is answered with
+    304 before the view runs.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        path_hash = hashlib.sha1(request.full_path.encode()).hexdigest()[:16]
+        etag = f"{catalog_cache.version}-{path_hash}"
+        last_modified = catalog_cache.modified_at
+        
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            not_modified = bool(request.if_modified_since) and last_modified <= request.if_modified_since
+        
+        if not_modified:
+            response = app.response_class(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        if 'user_id' in session:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+        else:
+            # Anonymous catalog pages may be stored by a shared reverse proxy
+            response.cache_control.public = True
+            response.cache_control.max_age = Config.CATALOG_HTTP_MAX_AGE
+        return response
+    return decorated_function
 # ==================== AUTHENTICATION ENDPOINTS ====================
 
 @app.route('/api/login', methods=['POST'])
@@ -279,7 +341,7 @@ def admin_stats():
         total_revenue = db.query(func.sum(Order.total_amount)).scalar() or 0
         
         # Get recent orders
-        recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(10).all()
+        recent_orders = db.query(Order).order_by(Order.created_at.desc(), Order.id.desc()).limit(10).all()
         
         return jsonify({
             'success': True,
@@ -287,7 +349,7 @@ def admin_stats():
                 'total_products': total_products,
                 'total_orders': total_orders,
                 'total_users': total_users,
-                'total_revenue': round(total_revenue, 2)
+                'total_revenue': total_revenue
             },
             'recent_orders': [order.to_dict() for order in recent_orders]
         })
@@ -307,12 +369,65 @@ def admin_stats():
 def health_check():
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+PRODUCT_SORT_COLUMNS = {
+    'id': Product.id,
+    'price': Product.price,
+    'rating': Product.rating,
+    'reviews': Product.reviews,
+    'name': Product.name
+}
+
+def products_from_snapshot(snapshot, page, per_page, category, min_price, max_price,
+                           sort_by, sort_order, cursor, include_total, facets=None):
+    """Filter, sort and page the catalog snapshot; same payload as the SQL path"""
+    result = products_page_from_snapshot(snapshot, page, per_page, category, min_price, max_price,
+                                         sort_by, sort_order, cursor, include_total)
+    if facets:
+        rows = snapshot.filter_sorted('id', 'asc', None, min_price, max_price)
+        result['facets'] = facet_counts_from_rows(rows, facets, category)
+    return result
+
+def products_page_from_snapshot(snapshot, page, per_page, category, min_price, max_price,
+                                sort_by, sort_order, cursor, include_total):
+    if cursor is not None:
+        after = decode_cursor(cursor, sort_by, sort_order) if cursor else None
+        rows = snapshot.seek(sort_by, sort_order, after, per_page + 1, category, min_price, max_price)
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        
+        pagination = {
+            'per_page': per_page,
+            'sort_by': sort_by,
+            'sort_order': sort_order,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(sort_by, sort_order, rows[-1][sort_by], rows[-1]['id']) if has_more else None
+        }
+        if include_total:
+            pagination['total'] = len(snapshot.filter_sorted('id', 'asc', category, min_price, max_price))
+        return {'success': True, 'products': rows, 'pagination': pagination}
+    
+    rows = snapshot.filter_sorted(sort_by, sort_order, category, min_price, max_price)
+    total = len(rows)
+    offset = (page - 1) * per_page
+    return {
+        'success': True,
+        'products': rows[offset:offset + per_page],
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': (total + per_page - 1) // per_page
+        }
+    }
+
 @app.route('/api/products', methods=['GET'])
+@catalog_conditional_get
 def get_products():
     """Get products with filtering and pagination"""
     db = None
     try:
-        db = get_db_session()
+        if 'ids' in request.args:
+            return get_products_by_ids(request.args.get('ids'))
         
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 8))
@@ -322,20 +437,30 @@ def get_products():
         max_price = request.args.get('max_price')
         sort_by = request.args.get('sort_by', 'id')
         sort_order = request.args.get('sort_order', 'asc')
+        # Keyset mode: pass cursor= (empty for the first page), then next_cursor
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() in ('1', 'true', 'yes')
+        facets = parse_facets(request.args.get('facets'))
+        
+        # Browsing without a text search is answered from the in-memory catalog
+        snapshot = None if search else catalog_cache.get_snapshot()
+        if snapshot is not None:
+            return jsonify(products_from_snapshot(
+                snapshot, page, per_page, category,
+                float(min_price) if min_price else None,
+                float(max_price) if max_price else None,
+                sort_by if sort_by in PRODUCT_SORT_COLUMNS else 'id',
+                'desc' if sort_order == 'desc' else 'asc',
+                cursor, include_total, facets
+            ))
         
+        db = get_db_session()
         query = db.query(Product)
         
-        if category and category != 'all':
-            query = query.filter(Product.category == category)
-        
+        search_rank = None
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term)
-                )
-            )
+            # FTS5 index lookup, bm25-ranked (falls back to LIKE without FTS5)
+            query, search_rank = apply_search(query, Product, search)
         
         if min_price:
             query = query.filter(Product.price >= float(min_price))
@@ -343,23 +468,68 @@ def get_products():
         if max_price:
             query = query.filter(Product.price <= float(max_price))
         
-        sort_column = {
-            'price': Product.price,
-            'rating': Product.rating,
-            'reviews': Product.reviews,
-            'name': Product.name
-        }.get(sort_by, Product.id)
+        # Facets are one GROUP BY over every filter except category
+        facet_counts = facet_counts_from_query(query, Product, facets, category) if facets else None
         
-        if sort_order == 'desc':
-            query = query.order_by(desc(sort_column))
+        if category and category != 'all':
+            query = query.filter(Product.category == category)
+        
+        count_query = query
+        count_key = (category, search, min_price, max_price)
+        
+        if search_rank is not None and (sort_by == 'relevance' or 'sort_by' not in request.args):
+            # Best matches first; id keeps equal scores in a stable order
+            sort_by, sort_order, sort_column = 'relevance', 'asc', search_rank
         else:
-            query = query.order_by(asc(sort_column))
+            sort_by = sort_by if sort_by in PRODUCT_SORT_COLUMNS else 'id'
+            sort_order = 'desc' if sort_order == 'desc' else 'asc'
+            sort_column = PRODUCT_SORT_COLUMNS[sort_by]
+        nullable = sort_by in ('rating', 'reviews')
+        
+        if cursor is not None:
+            after = decode_cursor(cursor, sort_by, sort_order) if cursor else None
+            query = apply_keyset(query, sort_column, Product.id, sort_order, after, nullable)
+            if sort_by == 'relevance':
+                query = query.add_columns(search_rank)
+            
+            # One extra row tells us whether another page exists
+            rows = query.limit(per_page + 1).all()
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            
+            if sort_by == 'relevance':
+                products = [row[0] for row in rows]
+                last_value = rows[-1][1] if rows else None
+            else:
+                products = rows
+                last_value = getattr(rows[-1], sort_by) if rows else None
+            
+            pagination = {
+                'per_page': per_page,
+                'sort_by': sort_by,
+                'sort_order': sort_order,
+                'has_more': has_more,
+                'next_cursor': encode_cursor(sort_by, sort_order, last_value, products[-1].id) if has_more else None
+            }
+            if include_total:
+                pagination['total'] = product_count_cache.get_or_compute(count_key, count_query.count)
+            
+            result = {
+                'success': True,
+                'products': [p.to_dict() for p in products],
+                'pagination': pagination
+            }
+            if facet_counts is not None:
+                result['facets'] = facet_counts
+            return jsonify(result)
         
-        total = query.count()
+        query = apply_keyset(query, sort_column, Product.id, sort_order, nullable=nullable)
+        
+        total = product_count_cache.get_or_compute(count_key, count_query.count)
         offset = (page - 1) * per_page
         products = query.offset(offset).limit(per_page).all()
         
-        result = jsonify({
+        result = {
             'success': True,
             'products': [p.to_dict() for p in products],
             'pagination': {
@@ -368,9 +538,14 @@ def get_products():
                 'total': total,
                 'total_pages': (total + per_page - 1) // per_page
             }
-        })
+        }
+        if facet_counts is not None:
+            result['facets'] = facet_counts
         
-        return result
+        return jsonify(result)
+    
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
     except Exception as e:
         print(f"Error in get_products: {str(e)}")
@@ -380,11 +555,57 @@ def get_products():
         if db:
             db.close()
 
+MAX_BATCH_PRODUCT_IDS = 500
+
+def get_products_by_ids(ids_param):
+    """Batch lookup for GET /api/products?ids=1,2,3 - one IN query or the snapshot"""
+    db = None
+    try:
+        try:
+            product_ids = list(dict.fromkeys(int(i) for i in ids_param.split(',') if i.strip()))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'ids must be a comma-separated list of integers'}), 400
+        
+        if not product_ids:
+            return jsonify({'success': False, 'error': 'At least one product id required'}), 400
+        
+        if len(product_ids) > MAX_BATCH_PRODUCT_IDS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_PRODUCT_IDS} ids per request'
+            }), 400
+        
+        snapshot = catalog_cache.get_snapshot()
+        if snapshot is not None:
+            found = {pid: snapshot.by_id[pid] for pid in product_ids if pid in snapshot.by_id}
+        else:
+            db = get_db_session()
+            rows = db.query(Product).filter(Product.id.in_(product_ids)).all()
+            found = {p.id: p.to_dict() for p in rows}
+        
+        return jsonify({
+            'success': True,
+            'products': {str(pid): found[pid] for pid in product_ids if pid in found},
+            'missing': [pid for pid in product_ids if pid not in found]
+        })
+    
+    finally:
+        if db:
+            db.close()
+
 @app.route('/api/products/<int:product_id>', methods=['GET'])
+@catalog_conditional_get
 def get_product(product_id):
     """Get single product by ID"""
     db = None
     try:
+        snapshot = catalog_cache.get_snapshot()
+        if snapshot is not None:
+            product = snapshot.by_id.get(product_id)
+            if not product:
+                return jsonify({'success': False, 'error': 'Product not found'}), 404
+            return jsonify({'success': True, 'product': product})
+        
         db = get_db_session()
         product = db.query(Product).filter(Product.id == product_id).first()
         
@@ -403,10 +624,15 @@ def get_product(product_id):
             db.close()
 
 @app.route('/api/products/categories', methods=['GET'])
+@catalog_conditional_get
 def get_categories():
     """Get all product categories"""
     db = None
     try:
+        snapshot = catalog_cache.get_snapshot()
+        if snapshot is not None:
+            return jsonify({'success': True, 'categories': snapshot.categories})
+        
         db = get_db_session()
         categories = db.query(Product.category).distinct().all()
         return jsonify({
@@ -420,9 +646,58 @@ def get_categories():
         if db:
             db.close()
 
+@app.route('/api/admin/catalog/cache-stats', methods=['GET'])
+@admin_required
+def get_catalog_cache_stats():
+    """Get catalog snapshot cache statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': catalog_cache.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/auth/cache-stats', methods=['GET'])
+@admin_required
+def get_role_cache_stats():
+    """Get admin role cache statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': role_cache.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ==================== CART ENDPOINTS ====================
 
+def load_cart(db, session_id):
+    """Cart payload (items, products and totals) from one joined SELECT"""
+    # Items and their products in one joined SELECT (no lazy load per item)
+    cart_items = db.query(CartItem).options(
+        joinedload(CartItem.product)
+    ).filter(
+        CartItem.session_id == session_id
+    ).order_by(CartItem.id).all()
+    
+    print(f"🎯 DEBUG: Found {len(cart_items)} cart items")
+    
+    items_list = [item.to_dict() for item in cart_items]
+    totals = cart_manager.calculate_cart_totals(
+        [item for item in items_list if item['product']]
+    )
+    
+    return {
+        'success': True,
+        'items': items_list,
+        'total': totals['subtotal'],
+        'totals': totals,
+        'count': len(cart_items)
+    }
+
 @app.route('/api/cart', methods=['GET'])
+@query_budget(3)  # the cart on a miss, plus occasional catalog and cart version polls
 def get_cart():
     """Get cart items for session"""
     db = None
@@ -433,28 +708,21 @@ def get_cart():
         if not session_id:
             return jsonify({'success': False, 'error': 'Session ID required'}), 400
         
-        db = get_db_session()
-        cart_items = db.query(CartItem).filter(
-            CartItem.session_id == session_id
-        ).all()
-        
-        print(f"🎯 DEBUG: Found {len(cart_items)} cart items")
+        # Cached carts embed product data, so they are only valid for the
+        # catalog version they were built from. Cart writes clear this
+        # worker's entry; other workers' writes are dropped at its next
+        # cart version poll (inside get_cached_cart).
+        catalog_version = catalog_cache.version
+        cached = cart_manager.get_cached_cart(session_id)
+        if cached and cached['data']['catalog_version'] == catalog_version:
+            return jsonify(cached['data']['cart'])
         
-        items_list = []
-        total = 0
-        
-        for item in cart_items:
-            item_dict = item.to_dict()
-            items_list.append(item_dict)
-            if item.product:
-                total += item.product.price * item.quantity
+        generation = cart_manager.get_generation()
+        db = get_db_session()
+        cart = load_cart(db, session_id)
+        cart_manager.cache_cart(session_id, {'catalog_version': catalog_version, 'cart': cart}, generation)
         
-        return jsonify({
-            'success': True,
-            'items': items_list,
-            'total': round(total, 2),
-            'count': len(cart_items)
-        })
+        return jsonify(cart)
     
     except Exception as e:
         print(f"💥 ERROR in get_cart: {str(e)}")
@@ -465,6 +733,26 @@ def get_cart():
         if db:
             db.close()
 
+def cart_upsert_statement(session_id, quantities, replace=False):
+    """INSERT a cart line per {product_id: quantity}, or on an existing
+    (session_id, product_id) add to its quantity (replace=True overwrites it
+    instead), in one statement.
+
+    Lines are selected from products, so an id that is not (or no longer) in
+    the database writes nothing; the statement RETURNs the product ids it
+    wrote.
+    """
+    insert = postgresql_insert if engine.dialect.name == 'postgresql' else sqlite_insert
+    rows = select(
+        literal(session_id, String), Product.id, case(quantities, value=Product.id)
+    ).where(Product.id.in_(list(quantities)))
+    statement = insert(CartItem).from_select(['session_id', 'product_id', 'quantity'], rows)
+    quantity = statement.excluded.quantity
+    return statement.on_conflict_do_update(
+        index_elements=[CartItem.session_id, CartItem.product_id],
+        set_={'quantity': quantity if replace else CartItem.quantity + quantity}
+    ).returning(CartItem.product_id)
+
 @app.route('/api/cart', methods=['POST'])
 def add_to_cart():
     """Add item to cart"""
@@ -483,39 +771,21 @@ def add_to_cart():
             print("❌ ERROR: Missing required fields")
             return jsonify({'success': False, 'error': 'Missing required fields'}), 400
         
-        db = get_db_session()
-        print(f"🎯 DEBUG: Querying product id={product_id}")
-        product = db.query(Product).filter(Product.id == product_id).first()
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            # Not an id, so not a product (as before the upsert)
+            return jsonify({'success': False, 'error': f'Product {product_id} not found'}), 404
         
-        if not product:
+        db = get_db_session()
+        # Single INSERT ... SELECT ... ON CONFLICT DO UPDATE: no read-modify-write
+        # race between concurrent adds, and the product is checked by the database
+        written = db.execute(cart_upsert_statement(session_id, {product_id: quantity})).all()
+        if not written:
+            db.rollback()
             print(f"❌ ERROR: Product {product_id} not found")
-            # List available products for debugging
-            all_products = db.query(Product.id, Product.name).all()
-            print(f"📋 Available products: {all_products}")
             return jsonify({'success': False, 'error': f'Product {product_id} not found'}), 404
-        
-        print(f"✅ DEBUG: Found product: {product.name} (ID: {product.id})")
-        
-        # Check if item already exists in cart
-        cart_item = db.query(CartItem).filter(
-            CartItem.session_id == session_id,
-            CartItem.product_id == product_id
-        ).first()
-        
-        if cart_item:
-            cart_item.quantity += quantity
-            message = 'Cart item quantity updated'
-            print(f"🔄 DEBUG: Updated existing cart item, new quantity: {cart_item.quantity}")
-        else:
-            cart_item = CartItem(
-                session_id=session_id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.add(cart_item)
-            message = 'Item added to cart'
-            print(f"🆕 DEBUG: Created new cart item")
-        
+        bump_cart_version(db, session_id)
         db.commit()
         print("✅ DEBUG: Database committed successfully")
         
@@ -554,6 +824,7 @@ def update_cart_item(item_id):
         if not cart_item:
             return jsonify({'success': False, 'error': 'Cart item not found'}), 404
         
+        session_id = cart_item.session_id
         if quantity == 0:
             db.delete(cart_item)
             message = 'Item removed from cart'
@@ -561,7 +832,9 @@ def update_cart_item(item_id):
             cart_item.quantity = quantity
             message = 'Cart item updated'
         
+        bump_cart_version(db, session_id)
         db.commit()
+        cart_manager.clear_cart_cache(session_id)
         
         return jsonify({
             'success': True,
@@ -585,8 +858,11 @@ def remove_cart_item(item_id):
         if not cart_item:
             return jsonify({'success': False, 'error': 'Cart item not found'}), 404
         
+        session_id = cart_item.session_id
         db.delete(cart_item)
+        bump_cart_version(db, session_id)
         db.commit()
+        cart_manager.clear_cart_cache(session_id)
         
         return jsonify({
             'success': True,
@@ -599,6 +875,99 @@ def remove_cart_item(item_id):
         if db:
             db.close()
 
+MAX_CART_BATCH_OPERATIONS = 200
+
+@app.route('/api/cart/batch', methods=['PATCH'])
+@query_budget(9)  # plus an occasional catalog version poll
+def batch_update_cart():
+    """Apply many cart line changes in one transaction.
+
+    Body: {"session_id": ..., "operations": [{"item_id" or "product_id": ..., "quantity": n}]}
+    quantity 0 removes the line; a product_id not yet in the cart is added.
+    """
+    db = None
+    try:
+        data = request.json or {}
+        session_id = data.get('session_id')
+        operations = data.get('operations')
+        
+        if not session_id or not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'session_id and operations required'}), 400
+        
+        if len(operations) > MAX_CART_BATCH_OPERATIONS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_CART_BATCH_OPERATIONS} operations per request'
+            }), 400
+        
+        # Later operations on the same line win
+        by_item, by_product = {}, {}
+        for op in operations:
+            quantity = op.get('quantity') if isinstance(op, dict) else None
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+                return jsonify({'success': False, 'error': f'Invalid quantity in operation: {op}'}), 400
+            key = 'item_id' if op.get('item_id') is not None else 'product_id'
+            if op.get(key) is None:
+                return jsonify({'success': False, 'error': f'item_id or product_id required: {op}'}), 400
+            try:
+                line_id = int(op[key])
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': f'Invalid {key} in operation: {op}'}), 400
+            (by_item if key == 'item_id' else by_product)[line_id] = quantity
+        
+        db = get_db_session()
+        
+        not_found = {'item_ids': [], 'product_ids': []}
+        if by_item:
+            owned = {row[0] for row in db.query(CartItem.id).filter(
+                CartItem.session_id == session_id,
+                CartItem.id.in_(list(by_item))
+            )}
+            not_found['item_ids'] = [i for i in by_item if i not in owned]
+            by_item = {i: q for i, q in by_item.items() if i in owned}
+        
+        added = {pid: q for pid, q in by_product.items() if q > 0}
+        
+        remove_items = [i for i, q in by_item.items() if q == 0]
+        remove_products = [pid for pid, q in by_product.items() if q == 0]
+        update_items = {i: q for i, q in by_item.items() if q > 0}
+        
+        if remove_items or remove_products:
+            db.query(CartItem).filter(
+                CartItem.session_id == session_id,
+                or_(CartItem.id.in_(remove_items), CartItem.product_id.in_(remove_products))
+            ).delete(synchronize_session=False)
+        
+        if update_items:
+            db.query(CartItem).filter(
+                CartItem.session_id == session_id,
+                CartItem.id.in_(list(update_items))
+            ).update(
+                {CartItem.quantity: case(update_items, value=CartItem.id)},
+                synchronize_session=False
+            )
+        
+        if added:
+            written = {row[0] for row in db.execute(cart_upsert_statement(session_id, added, replace=True))}
+            not_found['product_ids'] = [pid for pid in added if pid not in written]
+        
+        bump_cart_version(db, session_id)
+        db.commit()
+        cart_manager.clear_cart_cache(session_id)
+        
+        cart = load_cart(db, session_id)
+        cart['not_found'] = not_found
+        return jsonify(cart)
+    
+    except Exception as e:
+        if db:
+            db.rollback()
+        print(f"💥 ERROR in batch_update_cart: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if db:
+            db.close()
+
 @app.route('/api/cart/clear', methods=['DELETE'])
 def clear_cart():
     """Clear all items from cart for session"""
@@ -610,7 +979,9 @@ def clear_cart():
         
         db = get_db_session()
         db.query(CartItem).filter(CartItem.session_id == session_id).delete()
+        bump_cart_version(db, session_id)
         db.commit()
+        cart_manager.clear_cart_cache(session_id)
         
         return jsonify({
             'success': True,
@@ -625,6 +996,8 @@ def clear_cart():
 
 # ==================== ORDER ENDPOINTS ====================
 @app.route('/api/orders', methods=['POST'])
+@idempotent
+@query_budget(13)  # with a coupon: its version, its redemption and an occasional promotion index refresh
 def create_order():
     """Create a new order from cart with shipping info"""
     db = None
@@ -633,72 +1006,43 @@ def create_order():
         data = request.json
         session_id = data.get('session_id')
         shipping_info = data.get('shipping_info', {})
+        coupon_code = data.get('coupon_code')
         
         if not session_id:
             return jsonify({'success': False, 'error': 'Session ID required'}), 400
         
-        db = get_db_session()
-        
-        # Get cart items
-        cart_items = db.query(CartItem).filter(
-            CartItem.session_id == session_id
-        ).all()
-        
-        if not cart_items:
-            return jsonify({'success': False, 'error': 'Cart is empty'}), 400
-        
-        # Calculate total
-        total = 0
-        for item in cart_items:
-            if item.product:
-                total += item.product.price * item.quantity
-        
-        # Generate order number
-        order_number = generate_order_number()
-        
         # Get user_id if logged in
         user_id = session.get('user_id') if 'user_id' in session else None
         
-        # Create the order
-        order = Order(
-            order_number=order_number,
-            user_id=user_id,
-            session_id=session_id,
-            total_amount=total,
-            status='confirmed',
-            shipping_info=json.dumps(shipping_info)  # Save as JSON string
-        )
+        db = get_db_session()
+        # Load cart + products, price in memory, insert order and items in bulk
+        try:
+            order = checkout_cart(db, session_id, generate_order_number(), user_id, shipping_info, coupon_code)
+        except (EmptyCartError, CouponError) as e:
+            db.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        db.add(order)
-        db.flush()  # Get the order ID
-        print(f"DEBUG: Order created with ID: {order.id}")
-        
-        # Create order items
-        for cart_item in cart_items:
-            if cart_item.product:
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=cart_item.product.id,
-                    quantity=cart_item.quantity,
-                    price=cart_item.product.price
-                )
-                db.add(order_item)
-        
-        # Clear the cart
-        db.query(CartItem).filter(CartItem.session_id == session_id).delete()
+        result = {
+            'success': True,
+            'message': 'Order created successfully',
+            'order': order
+        }
+        # Committed with the order, so a retried request replays this response
+        try:
+            store_idempotent_response(db, result, 201)
+        except IdempotencyKeyLost as e:
+            # A retry took the key over while this request stalled; it places the order
+            db.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 409
         
         db.commit()
+        if coupon_code:
+            promotion_index.note_redemption(coupon_code)
+        cart_manager.clear_cart_cache(session_id)
+        analytics_cache.invalidate()
+        print(f"DEBUG: Order created with ID: {order['id']}")
         
-        return jsonify({
-            'success': True,
-            'message': 'Order created successfully',
-            'order': {
-                'id': order.id,
-                'order_number': order.order_number,
-                'total_amount': order.total_amount,
-                'status': order.status
-            }
-        }), 201
+        return jsonify(result), 201
     
     except Exception as e:
         print(f"Error creating order: {str(e)}")
@@ -846,135 +1190,280 @@ def get_singleton_stats():
             
 # ==================== DISCOUNT ENDPOINTS ====================
 
+def load_pricing_lines(db, data):
+    """Cart lines with database prices for the discount endpoints.
+    
+    Reads `items` ([{product_id, quantity}]), a `session_id` for the stored
+    cart, or a single `product_id`/`quantity`, in one query. Returns
+    (lines, requested product ids); raises ValueError on bad input.
+    """
+    if data.get('items') is not None or data.get('product_id') is not None:
+        items = data.get('items')
+        if items is None:
+            items = [{'product_id': data.get('product_id'), 'quantity': data.get('quantity', 1)}]
+        quantities = {}
+        try:
+            for item in items:
+                product_id, quantity = int(item['product_id']), int(item.get('quantity', 1))
+                if quantity < 1:
+                    raise ValueError('quantity must be at least 1')
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Invalid items: {e}')
+        rows = db.query(Product.id, Product.name, Product.price).filter(
+            Product.id.in_(quantities)).all() if quantities else []
+        return [{'product_id': row.id, 'name': row.name, 'price': row.price,
+                 'quantity': quantities[row.id]} for row in rows], set(quantities)
+    
+    if data.get('session_id'):
+        rows = db.query(CartItem.product_id, Product.name, Product.price, CartItem.quantity).join(
+            Product, CartItem.product_id == Product.id
+        ).filter(CartItem.session_id == data['session_id']).order_by(CartItem.id).all()
+        return [{'product_id': row.product_id, 'name': row.name, 'price': row.price,
+                 'quantity': row.quantity} for row in rows], set()
+    
+    raise ValueError('items, session_id or product_id is required')
+
 @app.route('/api/discounts/apply', methods=['POST'])
+@query_budget(2)  # prices, plus an occasional promotion index refresh for coupons
 def apply_discounts():
-    """Apply discounts to a product"""
-    data = request.json
-    product_id = data.get('product_id')
-    quantity = data.get('quantity', 1)
-    discounts = data.get('discounts', [])
-    
-    # Get product price from database
-    # For now, use a mock price based on product_id
-    product_price = 100  # Mock price
+    """Price a whole cart (or one product) through the requested discounts.
     
-    # Calculate original price
-    original_price = product_price * quantity
+    Prices come from the database in one query; bulk thresholds use the
+    total cart quantity.
+    """
+    data = request.json or {}
+    db = get_db_session()
+    try:
+        lines, requested = load_pricing_lines(db, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db.close()
     
-    # Create base calculator
-    calculator = BasePriceCalculator()
+    result = price_cart(lines, data.get('discounts', []))
+    result["missing_product_ids"] = sorted(requested - {line['product_id'] for line in lines})
+    if data.get('items') is None and data.get('product_id') is not None:
+        result["product_id"] = data.get('product_id')
+    return jsonify(result)
+
+
+@app.route('/api/discounts/optimize', methods=['POST'])
+@query_budget(2)  # prices, plus an occasional promotion index refresh for coupons
+def optimize_cart_discounts():
+    """Find the subset and stacking order of `discounts` with the lowest cart price.
     
-    # Apply discounts in order
-    for discount in discounts:
-        discount_type = discount.get('type')
-        
-        if discount_type == 'percentage':
-            calculator = PercentageDiscountDecorator(calculator, discount.get('percentage', 0))
-        elif discount_type == 'fixed':
-            calculator = FixedAmountDiscountDecorator(calculator, discount.get('amount', 0))
-        elif discount_type == 'bulk':
-            # Check if total cart quantity meets minimum
-            # This should check actual cart total, not just this item quantity
-            min_quantity = discount.get('min_quantity', 0)
-            # We need to pass cart total quantity to properly check bulk
-            # For now, we'll check this item's quantity
-            if quantity >= min_quantity:
-                calculator = PercentageDiscountDecorator(calculator, discount.get('percentage', 0))
-        elif discount_type == 'coupon':
-            # Handle coupon discount
-            pass
+    Discounts may set `exclusive_group` and `stackable`; `max_discounts`
+    caps how many are stacked. Same cart input as /api/discounts/apply.
+    """
+    data = request.json or {}
+    db = get_db_session()
+    try:
+        lines, requested = load_pricing_lines(db, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db.close()
     
-    final_price = calculator.calculate_price(product_price, quantity)
-    savings = original_price - final_price
+    try:
+        max_discounts = data.get('max_discounts')
+        max_discounts = int(max_discounts) if max_discounts is not None else None
+        result = optimize_discounts(lines, data.get('discounts', []), max_discounts)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
     
-    return jsonify({
-        "product_id": product_id,
-        "original_price": original_price,
-        "final_price": final_price,
-        "savings": savings,
-        "discount_description": calculator.get_description()
-    })
+    result["missing_product_ids"] = sorted(requested - {line['product_id'] for line in lines})
+    return jsonify(result)
     
     
 @app.route('/api/discounts/validate-coupon', methods=['POST'])
 def validate_coupon():
     """Validate a coupon code"""
     data = request.json
-    coupon_code = data.get('coupon_code', '').upper()
-    
-    valid_coupons = {
-        "WELCOME20": {
-            "type": "percentage",
-            "percentage": 20,
-            "description": "20% off your first purchase",
-            "code": "WELCOME20"
-        },
-        "SAVE10": {
-            "type": "fixed",
-            "amount": 10,
-            "description": "$10 off your order",
-            "code": "SAVE10"
-        },
-        "SUMMER25": {
-            "type": "percentage",
-            "percentage": 25,
-            "description": "25% off summer items",
-            "code": "SUMMER25"
-        }
-    }
+    promotion, error = promotion_index.lookup(data.get('coupon_code', ''))
     
-    if coupon_code in valid_coupons:
+    if promotion:
         return jsonify({
             "valid": True,
-            "coupon": valid_coupons[coupon_code]
+            "coupon": to_discount(promotion)
         })
     
     return jsonify({
         "valid": False,
-        "message": "Invalid coupon code"
+        "message": error
     })
 
 
 @app.route('/api/discounts/active', methods=['GET'])
 def get_active_discounts():
     """Get all active discounts"""
-    active_discounts = [
-        {
-            "id": 1,
-            "name": "Summer Sale",
-            "type": "percentage",
-            "value": 15,
-            "description": "15% off on all summer items",
-            "expires": "2024-08-31"
-        },
-        {
-            "id": 2,
-            "name": "First Purchase",
-            "type": "fixed",
-            "value": 10,
-            "description": "$10 off your first order",
-            "expires": "2024-12-31"
-        },
-        {
-            "id": 3,
-            "name": "Bulk Discount",
-            "type": "percentage",
-            "value": 20,
-            "description": "Buy 3+ items and get 20% off",
-            "min_quantity": 3,
-            "expires": None
-        },
-        {
-            "id": 4,
-            "name": "Welcome Discount",
-            "type": "percentage",
-            "value": 20,
-            "description": "20% off your first purchase",
-            "expires": "2024-12-31"
+    active_discounts = []
+    for promotion in promotion_index.active():
+        discount = {
+            "id": promotion['id'],
+            "name": promotion['name'],
+            "type": promotion['discount_type'],
+            "value": promotion['value'],
+            "description": promotion['description'],
+            "expires": promotion['ends_at'].strftime('%Y-%m-%d') if promotion['ends_at'] else None
         }
-    ]
+        if promotion['min_quantity']:
+            discount["min_quantity"] = promotion['min_quantity']
+        if promotion['category']:
+            discount["category"] = promotion['category']
+        if promotion['product_id'] is not None:
+            discount["product_id"] = promotion['product_id']
+        active_discounts.append(discount)
     return jsonify({"discounts": active_discounts})
 
+
+# ==================== ADMIN PROMOTION ENDPOINTS ====================
+
+PROMOTION_TYPES = ('percentage', 'fixed', 'bulk', 'free_shipping')
+
+def apply_promotion_fields(promotion, data):
+    """Copy editable fields from request JSON onto a Promotion; ValueError on bad input"""
+    if 'code' in data:
+        promotion.code = (data['code'] or '').strip().upper() or None
+    for field in ('name', 'description', 'category'):
+        if field in data:
+            setattr(promotion, field, data[field] or None)
+    if 'discount_type' in data:
+        if data['discount_type'] not in PROMOTION_TYPES:
+            raise ValueError(f"discount_type must be one of {', '.join(PROMOTION_TYPES)}")
+        promotion.discount_type = data['discount_type']
+    if 'value' in data:
+        promotion.value = float(data['value'])
+    for field in ('min_quantity', 'product_id', 'usage_limit'):
+        if field in data:
+            setattr(promotion, field, int(data[field]) if data[field] is not None else None)
+    for field in ('starts_at', 'ends_at'):
+        if field in data:
+            setattr(promotion, field, datetime.fromisoformat(data[field]) if data[field] else None)
+    if 'is_active' in data:
+        promotion.is_active = bool(data['is_active'])
+    
+    if not promotion.name or not promotion.discount_type:
+        raise ValueError('name and discount_type are required')
+    if promotion.starts_at and promotion.ends_at and promotion.starts_at >= promotion.ends_at:
+        raise ValueError('starts_at must be before ends_at')
+
+@app.route('/api/admin/promotions', methods=['GET'])
+@admin_required
+def admin_get_promotions():
+    """List all promotions, newest first"""
+    db = None
+    try:
+        db = get_db_session()
+        promotions = db.query(Promotion).order_by(Promotion.id.desc()).all()
+        return jsonify({
+            'success': True,
+            'promotions': [promotion.to_dict() for promotion in promotions],
+            'count': len(promotions)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if db:
+            db.close()
+
+@app.route('/api/admin/promotions', methods=['POST'])
+@admin_required
+def admin_create_promotion():
+    """Create a promotion or coupon code"""
+    db = None
+    try:
+        db = get_db_session()
+        promotion = Promotion(usage_count=0, is_active=True)
+        apply_promotion_fields(promotion, request.json or {})
+        
+        if promotion.code and db.query(Promotion.id).filter(Promotion.code == promotion.code).first():
+            return jsonify({'success': False, 'error': 'A promotion with this code already exists'}), 400
+        
+        promotion.version = bump_version_counter(db, 'promotions')
+        db.add(promotion)
+        db.commit()
+        promotion_index.upsert(promotion)
+        return jsonify({'success': True, 'promotion': promotion.to_dict()}), 201
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        if db:
+            db.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if db:
+            db.close()
+
+@app.route('/api/admin/promotions/<int:promotion_id>', methods=['PUT'])
+@admin_required
+def admin_update_promotion(promotion_id):
+    """Update a promotion"""
+    db = None
+    try:
+        db = get_db_session()
+        promotion = db.query(Promotion).filter(Promotion.id == promotion_id).first()
+        if not promotion:
+            return jsonify({'success': False, 'error': 'Promotion not found'}), 404
+        
+        # Taken before the row changes, in the same lock order as redeem_promotion()
+        promotion.version = bump_version_counter(db, 'promotions')
+        apply_promotion_fields(promotion, request.json or {})
+        if promotion.code and db.query(Promotion.id).filter(
+                Promotion.code == promotion.code, Promotion.id != promotion_id).first():
+            return jsonify({'success': False, 'error': 'A promotion with this code already exists'}), 400
+        
+        db.commit()
+        promotion_index.upsert(promotion)
+        return jsonify({'success': True, 'promotion': promotion.to_dict()})
+    except ValueError as e:
+        if db:
+            db.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        if db:
+            db.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if db:
+            db.close()
+
+@app.route('/api/admin/promotions/<int:promotion_id>', methods=['DELETE'])
+@admin_required
+def admin_delete_promotion(promotion_id):
+    """Deactivate a promotion (kept so other workers' indexes see the change)"""
+    db = None
+    try:
+        db = get_db_session()
+        promotion = db.query(Promotion).filter(Promotion.id == promotion_id).first()
+        if not promotion:
+            return jsonify({'success': False, 'error': 'Promotion not found'}), 404
+        
+        promotion.version = bump_version_counter(db, 'promotions')
+        promotion.is_active = False
+        db.commit()
+        promotion_index.upsert(promotion)
+        return jsonify({'success': True, 'message': 'Promotion deactivated'})
+    except Exception as e:
+        if db:
+            db.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if db:
+            db.close()
+
+@app.route('/api/admin/promotions/index-stats', methods=['GET'])
+@admin_required
+def get_promotion_index_stats():
+    """Get promotion index statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': promotion_index.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ==================== CREATE ADMIN USER ====================
 
 @app.route('/api/create-admin', methods=['POST'])
@@ -1010,6 +1499,8 @@ def create_admin_user():
         
         db.add(admin_user)
         db.commit()
+        # SQLite can reuse a deleted user's id; drop any stale entry for it
+        role_cache.invalidate(admin_user.id)
         
         return jsonify({
             'success': True,
@@ -1082,7 +1573,10 @@ def delete_product(product_id):
             }), 404
         
         db.delete(product)
+        written = bump_catalog_version(db)
         db.commit()
+        product_count_cache.invalidate()
+        catalog_cache.remove_product(written, product_id)
         
         return jsonify({
             'success': True,
@@ -1142,7 +1636,10 @@ def create_product():
         )
         
         db.add(new_product)
+        written = bump_catalog_version(db)
         db.commit()
+        product_count_cache.invalidate()
+        catalog_cache.upsert_product(written, new_product.to_dict())
         
         return jsonify({
             'success': True,
@@ -1219,7 +1716,10 @@ def update_product(product_id):
         if 'reviews' in data:
             product.reviews = int(data['reviews'])
         
+        written = bump_catalog_version(db)
         db.commit()
+        product_count_cache.invalidate()
+        catalog_cache.upsert_product(written, product.to_dict())
         
         return jsonify({
             'success': True,
@@ -1247,17 +1747,22 @@ def update_product(product_id):
             db.close()
 
 @app.route('/api/categories', methods=['GET'])
+@catalog_conditional_get
 def get_product_categories():
     """Get all product categories for dropdown"""
     db = None
     try:
-        db = get_db_session()
-        
-        # Get distinct categories from existing products
-        categories = db.query(Product.category).distinct().all()
+        snapshot = catalog_cache.get_snapshot()
+        if snapshot is not None:
+            all_categories = snapshot.categories
+        else:
+            db = get_db_session()
+            
+            # Get distinct categories from existing products
+            categories = db.query(Product.category).distinct().all()
+            all_categories = [c[0] for c in categories if c[0]]
         
         # Add some common categories if not present
-        all_categories = [c[0] for c in categories if c[0]]
         common_categories = ['electronics', 'audio', 'wearables', 'mobile', 'gaming', 
                            'photography', 'makeup', 'nail-polish', 'clothing', 
                            'shoes', 'bags', 'jewelry']
@@ -1349,6 +1854,7 @@ def admin_update_user(user_id):
         
         user.role = role
         db.commit()
+        role_cache.invalidate(user.id)
         
         return jsonify({
             'success': True,
@@ -1399,15 +1905,18 @@ def admin_delete_user(user_id):
         
         # Delete cart items associated with this user (optional, but good practice)
         try:
-            db.query(CartItem).filter(
-                CartItem.session_id.like(f'user_{user_id}_%')
-            ).delete()
+            user_carts = CartItem.session_id.like(f'user_{user_id}_%')
+            bump_cart_version(db, {row[0] for row in db.query(CartItem.session_id).filter(user_carts)})
+            db.query(CartItem).filter(user_carts).delete()
         except:
             pass  # If this fails, continue anyway
         
         # Use raw SQL with text() wrapper to avoid SQLAlchemy cascade issues
         result = db.execute(text("DELETE FROM users WHERE id = :user_id"), {"user_id": user_id})
         db.commit()
+        role_cache.invalidate(user_id)
+        # The user's carts were matched by pattern, so drop every cached cart
+        cart_manager.clear_cart_cache()
         
         return jsonify({
             'success': True,
@@ -1426,50 +1935,115 @@ def admin_delete_user(user_id):
         if db:
             db.close()
             
+MAX_ADMIN_ORDERS_PER_PAGE = 200
+
+def parse_order_date(value, end_of_day=False):
+    """Parse an ISO date/datetime filter; a bare date_to covers the whole day"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid date: {value}')
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def parse_order_filters():
+    """status / user_id / date_from / date_to from the query string"""
+    return {
+        'status': request.args.get('status'),
+        'user_id': request.args.get('user_id', type=int),
+        'date_from': parse_order_date(request.args.get('date_from')),
+        'date_to': parse_order_date(request.args.get('date_to'), end_of_day=True)
+    }
+
+def apply_order_filters(query, filters):
+    """Apply parse_order_filters() to an ORM query or a Core select on orders"""
+    if filters['status']:
+        query = query.filter(Order.status == filters['status'])
+    if filters['user_id'] is not None:
+        query = query.filter(Order.user_id == filters['user_id'])
+    if filters['date_from']:
+        query = query.filter(Order.created_at >= filters['date_from'])
+    if filters['date_to']:
+        query = query.filter(Order.created_at < filters['date_to'])
+    return query
+
 @app.route('/api/admin/orders', methods=['GET'])
 @admin_required
+@query_budget(3)
 def get_all_orders():
-    """Get all orders for admin dashboard"""
+    """Get orders for admin dashboard, newest first, one keyset page at a time.
+
+    Query params: per_page, cursor (next_cursor of the previous page),
+    status, user_id, date_from, date_to, include_total.
+    """
     db = None
     try:
+        per_page = min(max(int(request.args.get('per_page', 50)), 1), MAX_ADMIN_ORDERS_PER_PAGE)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        try:
+            filters = parse_order_filters()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         db = get_db_session()
         
-        # Get all orders with their items
-        orders = db.query(Order).order_by(Order.created_at.desc()).all()
+        query = apply_order_filters(db.query(Order), filters)
+        count_query = query
+        
+        # Ids grow with creation time, so newest first is id order. status and
+        # user_id equality filters seek their (x, id) index in that order; a
+        # created_at range uses (created_at, id) only to find its rows, which
+        # are then sorted by id, so a wide date range costs a sort per page
+        after = decode_cursor(cursor, 'id', 'desc') if cursor else None
+        query = apply_keyset(query, Order.id, Order.id, 'desc', after)
+        
+        # Customer joined into the page query, items + products in one more SELECT
+        orders = query.options(
+            joinedload(Order.customer),
+            selectinload(Order.line_items).joinedload(OrderItem.product)
+        ).limit(per_page + 1).all()
+        has_more = len(orders) > per_page
+        orders = orders[:per_page]
         
         orders_list = []
         for order in orders:
-            # Get order items
-            order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-            
-            # Get user info if available
-            user_info = None
-            if order.user_id:
-                user = db.query(User).get(order.user_id)
-                if user:
-                    user_info = user.to_dict()
-            
             orders_list.append({
                 'id': order.id,
                 'order_number': order.order_number,
-                'user': user_info,
+                'user': order.customer.to_dict() if order.customer else None,
                 'total_amount': order.total_amount,
                 'status': order.status,
                 'created_at': order.created_at.isoformat() if order.created_at else None,
-                'item_count': len(order_items),
+                'item_count': len(order.line_items),
                 'items': [{
                     'product_id': item.product_id,
                     'product_name': item.product.name if item.product else 'Unknown',
                     'quantity': item.quantity,
                     'price': item.price
-                } for item in order_items]
+                } for item in order.line_items]
             })
         
+        pagination = {
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_cursor': encode_cursor('id', 'desc', None, orders[-1].id) if has_more else None
+        }
+        if include_total:
+            pagination['total'] = count_query.count()
+        
         return jsonify({
             'success': True,
             'orders': orders_list,
-            'count': len(orders_list)
+            'count': len(orders_list),
+            'pagination': pagination
         })
+    
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
         
     except Exception as e:
         print(f"Error getting orders: {str(e)}")
@@ -1487,33 +2061,29 @@ def get_all_order_items():
     try:
         db = get_db_session()
         
-        # Get all order items with product and order information
-        order_items = db.query(OrderItem).order_by(OrderItem.created_at.desc()).all()
+        # Order items with product and order information, joined in one SELECT
+        rows = db.execute(
+            order_items_export_statement().order_by(None).order_by(OrderItem.created_at.desc())
+        ).all()
         
         order_items_list = []
-        for item in order_items:
-            # Get product info
-            product = db.query(Product).get(item.product_id)
-            
-            # Get order info
-            order = db.query(Order).get(item.order_id)
-            
+        for row in rows:
             order_items_list.append({
-                'id': item.id,
-                'order_id': item.order_id,
-                'product_id': item.product_id,
-                'quantity': item.quantity,
-                'price': item.price,
-                'created_at': item.created_at.isoformat() if item.created_at else None,
+                'id': row.id,
+                'order_id': row.order_id,
+                'product_id': row.product_id,
+                'quantity': row.quantity,
+                'price': row.price,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
                 'product': {
-                    'name': product.name if product else None,
-                    'image': product.image if product else None,
-                    'price': product.price if product else None
-                } if product else None,
+                    'name': row.product_name,
+                    'image': row.product_image,
+                    'price': row.product_price
+                } if row.product_name is not None else None,
                 'order': {
-                    'order_number': order.order_number if order else None,
-                    'total_amount': order.total_amount if order else None
-                } if order else None
+                    'order_number': row.order_number,
+                    'total_amount': row.order_total
+                }
             })
         
         return jsonify({
@@ -1530,183 +2100,105 @@ def get_all_order_items():
             db.close()  
             
             
+def export_response(statement, name):
+    """Stream `statement` as ?format=ndjson (default) or csv"""
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f'Unsupported format: {fmt}'}), 400
+    
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(stream_rows(statement, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/admin/orders/export', methods=['GET'])
+@admin_required
+def export_orders():
+    """Stream every order (same filters as /api/admin/orders) as NDJSON or CSV"""
+    try:
+        filters = parse_order_filters()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return export_response(apply_order_filters(orders_export_statement(), filters), 'orders')
+
+@app.route('/api/admin/order-items/export', methods=['GET'])
+@admin_required
+def export_order_items():
+    """Stream every order line (filtered by its order) as NDJSON or CSV"""
+    try:
+        filters = parse_order_filters()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return export_response(apply_order_filters(order_items_export_statement(), filters), 'order-items')
+
+
 # ==================== ANALYTICS ENDPOINTS ====================
 
 @app.route('/api/admin/analytics/summary', methods=['GET'])
 @admin_required
+@query_budget(5)
 def get_analytics_summary():
-    """Get analytics summary for dashboard"""
-    db = None
+    """Get analytics summary for dashboard (cached per period until the next order)"""
     try:
-        db = get_db_session()
-        
-        # Get period from query params
         period = request.args.get('period', '30')
+        today = datetime.utcnow()
         
-        # Calculate date range
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        
-        if period == '7':
-            start_date = today - timedelta(days=7)
-        elif period == '30':
-            start_date = today - timedelta(days=30)
-        elif period == '90':
-            start_date = today - timedelta(days=90)
-        elif period == '365':
-            start_date = today - timedelta(days=365)
-        else:
-            start_date = None  # All time
-        
-        # Total revenue
-        if start_date:
-            total_revenue = db.query(func.sum(Order.total_amount)).filter(
-                Order.created_at >= start_date
-            ).scalar() or 0
-            total_orders = db.query(func.count(Order.id)).filter(
-                Order.created_at >= start_date
-            ).scalar() or 0
-        else:
-            total_revenue = db.query(func.sum(Order.total_amount)).scalar() or 0
-            total_orders = db.query(func.count(Order.id)).scalar() or 0
-        
-        # Average order value
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-        
-        # Get today's sales
-        today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_revenue = db.query(func.sum(Order.total_amount)).filter(
-            Order.created_at >= today_start
-        ).scalar() or 0
-        today_orders = db.query(func.count(Order.id)).filter(
-            Order.created_at >= today_start
-        ).scalar() or 0
-        
-        # Get yesterday's sales for comparison
-        yesterday_start = today_start - timedelta(days=1)
-        yesterday_end = today_start
-        yesterday_revenue = db.query(func.sum(Order.total_amount)).filter(
-            Order.created_at >= yesterday_start,
-            Order.created_at < yesterday_end
-        ).scalar() or 0
-        
-        # Calculate growth percentage
-        revenue_growth = 0
-        if yesterday_revenue > 0:
-            revenue_growth = ((today_revenue - yesterday_revenue) / yesterday_revenue) * 100
-        
-        # Get top selling products
-        top_products = db.query(
-            OrderItem.product_id,
-            Product.name,
-            func.sum(OrderItem.quantity).label('total_quantity'),
-            func.sum(OrderItem.price * OrderItem.quantity).label('total_revenue')
-        ).join(Product, OrderItem.product_id == Product.id)\
-         .group_by(OrderItem.product_id, Product.name)\
-         .order_by(func.sum(OrderItem.quantity).desc())\
-         .limit(5)\
-         .all()
-        
-        # Get sales by category
-        category_sales = db.query(
-            Product.category,
-            func.sum(OrderItem.quantity).label('total_quantity'),
-            func.sum(OrderItem.price * OrderItem.quantity).label('total_revenue')
-        ).join(Product, OrderItem.product_id == Product.id)\
-         .group_by(Product.category)\
-         .order_by(func.sum(OrderItem.price * OrderItem.quantity).desc())\
-         .all()
-        
-        # Get recent orders for timeline
-        recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(10).all()
+        def build():
+            db = get_db_session()
+            try:
+                return analytics_summary(db, period, today)
+            finally:
+                db.close()
         
-        return jsonify({
-            'success': True,
-            'period': period,
-            'summary': {
-                'total_revenue': round(total_revenue, 2),
-                'total_orders': total_orders,
-                'avg_order_value': round(avg_order_value, 2),
-                'today_revenue': round(today_revenue, 2),
-                'today_orders': today_orders,
-                'revenue_growth': round(revenue_growth, 2),
-                'yesterday_revenue': round(yesterday_revenue, 2)
-            },
-            'top_products': [{
-                'product_id': p[0],
-                'name': p[1],
-                'total_quantity': p[2] or 0,
-                'total_revenue': float(p[3] or 0)
-            } for p in top_products],
-            'category_sales': [{
-                'category': c[0] or 'Uncategorized',
-                'total_quantity': c[1] or 0,
-                'total_revenue': float(c[2] or 0)
-            } for c in category_sales],
-            'recent_orders': [order.to_dict() for order in recent_orders]
-        })
+        return jsonify(analytics_cache.get_or_compute((period, day_bucket(today)), build))
         
     except Exception as e:
         print(f"Error getting analytics summary: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        if db:
-            db.close()
 
 @app.route('/api/admin/analytics/sales-trend', methods=['GET'])
 @admin_required
+@query_budget(2)
 def get_sales_trend():
-    """Get sales trend data for charts"""
+    """Get sales trend data for charts.
+
+    Query params: period (days or 'all') or start/end (YYYY-MM-DD, inclusive),
+    granularity (hour/day/week/month), ma (moving-average window in buckets),
+    compare=true (bucket deltas and the previous period's totals).
+    """
     db = None
     try:
         db = get_db_session()
         
-        period = request.args.get('period', '30')
-        days = int(period)
-        
-        # Generate date range
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        start_date = today - timedelta(days=days)
-        
-        # Get daily sales data
-        daily_sales = db.query(
-            func.date(Order.created_at).label('date'),
-            func.count(Order.id).label('order_count'),
-            func.sum(Order.total_amount).label('revenue')
-        ).filter(
-            Order.created_at >= start_date
-        ).group_by(
-            func.date(Order.created_at)
-        ).order_by(
-            func.date(Order.created_at)
-        ).all()
+        granularity = request.args.get('granularity', 'day')
+        window = request.args.get('ma', type=int)
+        compare = request.args.get('compare', 'false').lower() == 'true'
         
-        # Format for chart
-        dates = []
-        orders_data = []
-        revenue_data = []
+        # Generate date range (rollup buckets are UTC)
+        try:
+            if request.args.get('start'):
+                start_date = datetime.strptime(request.args['start'], '%Y-%m-%d')
+                end_date = datetime.strptime(request.args.get('end') or datetime.utcnow().strftime('%Y-%m-%d'), '%Y-%m-%d')
+                end_date += timedelta(days=1, microseconds=-1)
+            else:
+                end_date = datetime.utcnow()
+                period = request.args.get('period', '30')
+                if period == 'all':
+                    first_day = db.query(func.min(SalesDaily.day)).scalar()
+                    start_date = datetime.strptime(first_day, '%Y-%m-%d') if first_day else end_date
+                else:
+                    start_date = end_date - timedelta(days=int(period))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid period or date range'}), 400
         
-        # Fill in missing dates
-        current_date = start_date
-        while current_date <= today:
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Find sales for this date
-            sales_data = next((s for s in daily_sales if s[0] == current_date.date()), None)
-            
-            dates.append(date_str)
-            orders_data.append(sales_data[1] if sales_data else 0)
-            revenue_data.append(float(sales_data[2]) if sales_data else 0)
-            
-            current_date += timedelta(days=1)
+        try:
+            series = sales_series(db, start_date, end_date, granularity, window, compare)
+        except InvalidSeries as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        return jsonify({
-            'success': True,
-            'labels': dates,
-            'orders_data': orders_data,
-            'revenue_data': revenue_data
-        })
+        return jsonify({'success': True, **series})
         
     except Exception as e:
         print(f"Error getting sales trend: {str(e)}")
@@ -1723,22 +2215,16 @@ def get_hourly_sales():
     try:
         db = get_db_session()
         
-        # Get today's date
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Get today's date (rollup buckets are UTC hours)
+        today_day = day_bucket(datetime.utcnow())
         
         # Get hourly sales
         hourly_sales = db.query(
-            func.extract('hour', Order.created_at).label('hour'),
-            func.count(Order.id).label('order_count'),
-            func.sum(Order.total_amount).label('revenue')
+            SalesHourly.hour,
+            SalesHourly.order_count,
+            SalesHourly.revenue
         ).filter(
-            Order.created_at >= today_start
-        ).group_by(
-            func.extract('hour', Order.created_at)
-        ).order_by(
-            func.extract('hour', Order.created_at)
+            SalesHourly.hour.between(f'{today_day} 00', f'{today_day} 23')
         ).all()
         
         # Format for chart (24 hours)
@@ -1747,7 +2233,7 @@ def get_hourly_sales():
         hourly_revenue = [0] * 24
         
         for sale in hourly_sales:
-            hour = int(sale[0])
+            hour = int(sale[0][-2:])
             hourly_orders[hour] = sale[1] or 0
             hourly_revenue[hour] = float(sale[2] or 0)
         
@@ -0,0 +1,31 @@
+# backfill_sales_rollups.py
+# Rebuild the sales rollup tables (sales_daily, sales_hourly, product_sales,
+# category_sales) from existing orders. Safe to re-run, also with the app
+# running: the rebuild locks the rollups, so checkouts wait for it. The app
+# does this by itself on start when the rollups are empty; use this script to
+# rebuild ones that exist.
+import time
+from database import init_db, get_db_session
+from models import SalesDaily, SalesHourly, ProductSales, CategorySales
+from sales_rollups import rebuild_sales_rollups
+
+def backfill_sales_rollups():
+    init_db()
+    db = get_db_session()
+    try:
+        print("Rebuilding sales rollups from orders/order_items...")
+        start = time.perf_counter()
+        rebuild_sales_rollups(db)
+        db.commit()
+
+        for model in (SalesDaily, SalesHourly, ProductSales, CategorySales):
+            print(f"✓ {model.__tablename__}: {db.query(model).count()} rows")
+        print(f"\n✅ Sales rollups rebuilt in {time.perf_counter() - start:.1f}s")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_sales_rollups()
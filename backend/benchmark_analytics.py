@@ -0,0 +1,148 @@
+# benchmark_analytics.py
+# Compare the old analytics summary (eight aggregates over orders/order_items)
+# with the single-pass rollup summary and a cache hit.
+#
+#   python benchmark_analytics.py
+#   python benchmark_analytics.py --orders 100000 --repeat 5
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Product, Order, OrderItem
+from analytics import analytics_summary
+from pagination import TTLCache
+from sales_rollups import rebuild_sales_rollups
+
+
+def legacy_summary(db, period, now):
+    """get_analytics_summary as it was: one aggregate per metric over orders"""
+    start_date = now - timedelta(days=int(period))
+    total_revenue = db.query(func.sum(Order.total_amount)).filter(Order.created_at >= start_date).scalar() or 0
+    total_orders = db.query(func.count(Order.id)).filter(Order.created_at >= start_date).scalar() or 0
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_revenue = db.query(func.sum(Order.total_amount)).filter(Order.created_at >= today_start).scalar() or 0
+    today_orders = db.query(func.count(Order.id)).filter(Order.created_at >= today_start).scalar() or 0
+    yesterday_revenue = db.query(func.sum(Order.total_amount)).filter(
+        Order.created_at >= today_start - timedelta(days=1), Order.created_at < today_start).scalar() or 0
+    top_products = db.query(
+        OrderItem.product_id, Product.name,
+        func.sum(OrderItem.quantity), func.sum(OrderItem.price * OrderItem.quantity)
+    ).join(Product, OrderItem.product_id == Product.id).group_by(
+        OrderItem.product_id, Product.name).order_by(func.sum(OrderItem.quantity).desc()).limit(5).all()
+    category_sales = db.query(
+        Product.category, func.sum(OrderItem.quantity), func.sum(OrderItem.price * OrderItem.quantity)
+    ).join(Product, OrderItem.product_id == Product.id).group_by(Product.category).all()
+    recent_orders = db.query(Order).order_by(Order.order_number.desc()).limit(10).all()
+    item_counts = [order.items.count() for order in recent_orders]
+    return total_revenue, total_orders, today_revenue, today_orders, yesterday_revenue, \
+        top_products, category_sales, item_counts
+
+
+def seed(Session, orders, products, now):
+    rng = random.Random(42)
+    db = Session()
+    db.add_all([Product(name=f'Product {i}', category=f'category-{i % 12}', price=5 + i % 200,
+                        description='benchmark product') for i in range(products)])
+    db.commit()
+
+    batch = 50000
+    order_id = 0
+    for start in range(0, orders, batch):
+        order_rows, item_rows = [], []
+        for _ in range(min(batch, orders - start)):
+            order_id += 1
+            lines = [(rng.randint(1, products), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+            total = 0
+            for product_id, quantity in lines:
+                price = 5 + (product_id - 1) % 200
+                total += price * quantity
+                item_rows.append({'order_id': order_id, 'product_id': product_id,
+                                  'quantity': quantity, 'price': price})
+            order_rows.append({
+                'id': order_id,
+                'order_number': f'ORD-{order_id:09d}',
+                'session_id': f'bench-{order_id}',
+                'total_amount': total,
+                'status': 'confirmed',
+                'created_at': now - timedelta(seconds=rng.randint(0, 2 * 365 * 86400))
+            })
+        db.execute(insert(Order), order_rows)
+        db.execute(insert(OrderItem), item_rows)
+        db.commit()
+
+    start = time.perf_counter()
+    rebuild_sales_rollups(db)
+    db.commit()
+    db.close()
+    return time.perf_counter() - start
+
+
+def timed(Session, fn, repeat, statements):
+    best = None
+    for _ in range(repeat):
+        db = Session()
+        try:
+            statements[0] = 0
+            start = time.perf_counter()
+            fn(db)
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, statements[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analytics summary benchmark')
+    parser.add_argument('--orders', type=int, default=500000)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--period', default='30')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_analytics.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    now = datetime.utcnow()
+
+    print(f"Seeding {args.orders} orders over two years...")
+    rollup_time = seed(Session, args.orders, args.products, now)
+    print(f"Rollup backfill: {rollup_time:.1f}s\n")
+
+    statements = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(*_):
+        statements[0] += 1
+
+    cache = TTLCache(ttl_seconds=60)
+    key = (args.period, now.date())
+    db = Session()
+    cache.get_or_compute(key, lambda: analytics_summary(db, args.period, now))
+    db.close()
+
+    results = [
+        ('legacy (orders scans)', timed(Session, lambda db: legacy_summary(db, args.period, now), args.repeat, statements)),
+        ('single pass (rollups)', timed(Session, lambda db: analytics_summary(db, args.period, now), args.repeat, statements)),
+        ('cache hit', timed(Session, lambda db: cache.get_or_compute(key, None), args.repeat, statements)),
+    ]
+
+    legacy_time = results[0][1][0]
+    print(f"{'summary':<24}{'ms':>10}{'queries':>9}{'speedup':>10}")
+    for name, (elapsed, queries) in results:
+        print(f"{name:<24}{elapsed * 1000:>10.2f}{queries:>9}{legacy_time / elapsed:>9.0f}x")
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
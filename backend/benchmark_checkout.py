@@ -0,0 +1,103 @@
+# benchmark_checkout.py
+# Compare the old per-item checkout loop with the staged checkout pipeline.
+#
+#   python benchmark_checkout.py
+#   python benchmark_checkout.py --sizes 1,10,100,500 --repeat 20
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Product, CartItem, Order, OrderItem
+from checkout import checkout_cart
+
+
+def legacy_checkout(db, session_id, order_number):
+    """create_order as it was: lazy product loads and one add() per item"""
+    cart_items = db.query(CartItem).filter(CartItem.session_id == session_id).all()
+    total = 0
+    for item in cart_items:
+        if item.product:
+            total += item.product.price * item.quantity
+    order = Order(order_number=order_number, session_id=session_id, total_amount=total,
+                  status='confirmed', shipping_info=json.dumps({}))
+    db.add(order)
+    db.flush()
+    for cart_item in cart_items:
+        if cart_item.product:
+            db.add(OrderItem(order_id=order.id, product_id=cart_item.product.id,
+                             quantity=cart_item.quantity, price=cart_item.product.price))
+    db.query(CartItem).filter(CartItem.session_id == session_id).delete()
+    db.flush()
+
+
+def pipeline_checkout(db, session_id, order_number):
+    checkout_cart(db, session_id, order_number)
+    db.flush()
+
+
+def run(Session, fn, session_id, repeat, statements):
+    best = None
+    counted = 0
+    for i in range(repeat):
+        db = Session()
+        try:
+            statements[0] = 0
+            start = time.perf_counter()
+            fn(db, session_id, f"BENCH-{fn.__name__}-{i}")
+            elapsed = time.perf_counter() - start
+            counted = statements[0]
+        finally:
+            # Roll back so every run checks out the same cart
+            db.rollback()
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, counted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkout benchmark')
+    parser.add_argument('--sizes', default='1,10,50,100,250,500')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_checkout.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    statements = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(*_):
+        statements[0] += 1
+
+    db = Session()
+    db.add_all([Product(name=f'Product {i}', category='electronics', price=9.99 + i,
+                        description='benchmark product') for i in range(max(sizes))])
+    db.commit()
+    for size in sizes:
+        db.add_all([CartItem(session_id=f'cart-{size}', product_id=pid, quantity=2)
+                    for pid in range(1, size + 1)])
+    db.commit()
+    db.close()
+
+    print(f"{'lines':>6}{'legacy ms':>12}{'queries':>9}{'pipeline ms':>14}{'queries':>9}{'speedup':>10}")
+    for size in sizes:
+        legacy_time, legacy_queries = run(Session, legacy_checkout, f'cart-{size}', args.repeat, statements)
+        pipeline_time, pipeline_queries = run(Session, pipeline_checkout, f'cart-{size}', args.repeat, statements)
+        print(f"{size:>6}{legacy_time * 1000:>12.2f}{legacy_queries:>9}"
+              f"{pipeline_time * 1000:>14.2f}{pipeline_queries:>9}{legacy_time / pipeline_time:>9.1f}x")
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
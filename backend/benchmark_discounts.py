@@ -0,0 +1,146 @@
+# benchmark_discounts.py
+# Check the discount optimizer against exhaustive search over every subset
+# (to the cent), report how far stacking order is from the best of every
+# permutation, and time it on 20 candidates: random ones and ones paired up
+# in exclusive groups.
+#
+#   python benchmark_discounts.py
+#   python benchmark_discounts.py --trials 200 --candidates 20 --lines 50
+import argparse
+import gc
+import random
+import time
+from itertools import combinations, permutations
+
+from discount_optimizer import optimize_discounts, stacking_order, MAX_CANDIDATES
+from pricing_engine import price_cart
+from money import to_cents
+
+
+def random_lines(rng, count):
+    return [{'product_id': i, 'price': round(rng.uniform(1, 300), 2), 'quantity': rng.randint(1, 4)}
+            for i in range(count)]
+
+
+def random_candidates(rng, count):
+    candidates = []
+    for i in range(count):
+        kind = rng.choice(['percentage', 'percentage', 'fixed', 'bulk'])
+        if kind == 'fixed':
+            discount = {'type': 'fixed', 'amount': rng.choice([1, 2, 5, 10, 25])}
+        else:
+            discount = {'type': kind, 'percentage': rng.choice([5, 10, 12.5, 15, 20, 30])}
+            if kind == 'bulk':
+                discount['min_quantity'] = rng.randint(2, 40)
+        if rng.random() < 0.3:
+            discount['exclusive_group'] = f'group-{rng.randint(1, 3)}'
+        if rng.random() < 0.1:
+            discount['stackable'] = False
+        discount['id'] = i
+        candidates.append(discount)
+    return candidates
+
+
+def paired_candidates(rng, count):
+    """Close pairs of percentages, each pair one exclusive group"""
+    candidates = []
+    for i in range(count // 2):
+        percentage = rng.choice([5, 10, 12.5, 15, 20])
+        for offset in (0, rng.choice([0.5, 1, 2])):
+            candidates.append({'type': 'percentage', 'percentage': percentage + offset,
+                               'exclusive_group': f'pair-{i}', 'id': len(candidates)})
+    return candidates
+
+
+def legal(combo, max_discounts):
+    if max_discounts is not None and len(combo) > max_discounts:
+        return False
+    if len(combo) > 1 and any(d.get('stackable') is False for d in combo):
+        return False
+    groups = [d['exclusive_group'] for d in combo if d.get('exclusive_group')]
+    return len(groups) == len(set(groups))
+
+
+def exhaustive(lines, candidates, max_discounts, orders):
+    """Lowest price over every legal subset, in every order or stacking order"""
+    total_quantity = sum(line['quantity'] for line in lines)
+    usable = [d for d in candidates if d['type'] != 'bulk' or total_quantity >= d['min_quantity']]
+    best = to_cents(price_cart(lines, [])['final_price'])
+    for size in range(1, len(usable) + 1):
+        for combo in combinations(usable, size):
+            if not legal(combo, max_discounts):
+                continue
+            for ordered in (permutations(combo) if orders else [stacking_order(list(combo))]):
+                best = min(best, to_cents(price_cart(lines, list(ordered))['final_price']))
+    return best
+
+
+def time_optimizer(label, trials, make_lines, make_candidates, max_discounts):
+    # Otherwise one cart's timing takes the first full collection over every
+    # object SQLAlchemy & co. allocated at import
+    gc.collect()
+    gc.freeze()
+    timings, nodes = [], []
+    for _ in range(trials):
+        lines, candidates = make_lines(), make_candidates()
+        start = time.perf_counter()
+        result = optimize_discounts(lines, candidates, max_discounts())
+        timings.append(time.perf_counter() - start)
+        nodes.append(result['search']['nodes'])
+
+    timings.sort()
+    print(f"\n{label}")
+    print(f"  median {timings[len(timings) // 2] * 1000:.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.2f} ms, max {timings[-1] * 1000:.2f} ms")
+    print(f"  nodes visited: median {sorted(nodes)[len(nodes) // 2]}, max {max(nodes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Discount optimizer benchmark')
+    parser.add_argument('--trials', type=int, default=100)
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--lines', type=int, default=25)
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    for count in (5, 11):
+        for _ in range(30):
+            lines = random_lines(rng, rng.randint(1, 8))
+            candidates = random_candidates(rng, count)
+            max_discounts = rng.choice([None, 1, 2, 3])
+            expected = exhaustive(lines, candidates, max_discounts, orders=False)
+            result = optimize_discounts(lines, candidates, max_discounts)
+            found = to_cents(result['final_price'])
+            assert found == expected, f'optimizer {found} != exhaustive {expected} cents'
+            if result['optimal'] == 'exact':
+                assert found == exhaustive(lines, candidates, max_discounts, orders=True)
+        print(f"Matches exhaustive search over every subset to the cent ({count} candidates, 30 carts)")
+
+    # Percentages are stacked largest first; another order can round a cent
+    # or so lower on some lines, which the result flags as
+    # 'up_to_step_rounding'. Report how often and by how much.
+    gaps = []
+    for _ in range(30):
+        lines = random_lines(rng, rng.randint(1, 8))
+        candidates = random_candidates(rng, 5)
+        max_discounts = rng.choice([None, 1, 2, 3])
+        expected = exhaustive(lines, candidates, max_discounts, orders=True)
+        result = optimize_discounts(lines, candidates, max_discounts)
+        found = to_cents(result['final_price'])
+        assert found >= expected
+        assert found == expected or result['optimal'] == 'up_to_step_rounding'
+        gaps.append(found - expected)
+    print(f"Every permutation (5 candidates, 30 carts): best order cheaper in {sum(1 for g in gaps if g)} "
+          f"carts, by at most {max(gaps)} cents")
+
+    time_optimizer(f"{args.candidates} candidates, {args.lines} lines, {args.trials} carts "
+                   f"({2 ** args.candidates} subsets each)", args.trials,
+                   lambda: random_lines(rng, args.lines), lambda: random_candidates(rng, args.candidates),
+                   lambda: rng.choice([None, 3, 5]))
+    time_optimizer(f"{MAX_CANDIDATES} candidates in {MAX_CANDIDATES // 2} exclusive pairs, {args.lines} lines, "
+                   f"{args.trials} carts", args.trials,
+                   lambda: random_lines(rng, args.lines), lambda: paired_candidates(rng, MAX_CANDIDATES),
+                   lambda: None)
+
+if __name__ == '__main__':
+    main()
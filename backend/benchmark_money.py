@@ -0,0 +1,81 @@
+# benchmark_money.py
+# Compare float dollars with integer cents: drift against the exact decimal
+# total, Python cart totals, and SQL SUM() over a REAL vs an INTEGER column.
+#
+#   python benchmark_money.py
+#   python benchmark_money.py --rows 2000000 --repeat 5
+import argparse
+import random
+import sqlite3
+import time
+from decimal import Decimal
+
+from money import to_cents, from_cents, percent_of_cents
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def float_totals(prices, quantities):
+    """calculate_cart_totals as it was: float sums, rounded at the end"""
+    subtotal = sum(p * q for p, q in zip(prices, quantities))
+    tax = subtotal * 0.08
+    return round(subtotal, 2), round(subtotal + tax, 2)
+
+
+def cents_totals(price_cents, quantities):
+    subtotal = sum(p * q for p, q in zip(price_cents, quantities))
+    return from_cents(subtotal), from_cents(subtotal + percent_of_cents(subtotal, 8))
+
+
+def sql_sum(conn, table):
+    return conn.execute(f"SELECT SUM(amount) FROM {table}").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Float vs integer-cents money benchmark')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    prices = [round(rng.uniform(0.01, 999.99), 2) for _ in range(args.rows)]
+    quantities = [rng.randint(1, 5) for _ in range(args.rows)]
+    price_cents = [to_cents(p) for p in prices]
+
+    exact = sum(Decimal(repr(p)) * q for p, q in zip(prices, quantities))
+    float_sum = sum(p * q for p, q in zip(prices, quantities))
+    cents_sum = sum(p * q for p, q in zip(price_cents, quantities))
+    print(f"{args.rows} lines, exact total {exact}")
+    print(f"  float sum  {float_sum!r:>24}  off by {Decimal(repr(float_sum)) - exact}")
+    print(f"  cents sum  {from_cents(cents_sum)!r:>24}  off by {Decimal(cents_sum) / 100 - exact}")
+
+    float_time, _ = best_of(lambda: float_totals(prices, quantities), args.repeat)
+    cents_time, _ = best_of(lambda: cents_totals(price_cents, quantities), args.repeat)
+    print(f"\ncart totals in Python")
+    print(f"  {'float':<10}{float_time * 1000:>10.2f} ms")
+    print(f"  {'cents':<10}{cents_time * 1000:>10.2f} ms{float_time / cents_time:>8.2f}x")
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE dollars (amount REAL NOT NULL)")
+    conn.execute("CREATE TABLE cents (amount BIGINT NOT NULL)")
+    conn.executemany("INSERT INTO dollars VALUES (?)", ((p * q,) for p, q in zip(prices, quantities)))
+    conn.executemany("INSERT INTO cents VALUES (?)", ((p * q,) for p, q in zip(price_cents, quantities)))
+
+    float_time, float_total = best_of(lambda: sql_sum(conn, 'dollars'), args.repeat)
+    cents_time, cents_total = best_of(lambda: sql_sum(conn, 'cents'), args.repeat)
+    print(f"\nSQLite SUM() over {args.rows} rows")
+    print(f"  {'REAL':<10}{float_time * 1000:>10.2f} ms  {float_total!r}")
+    print(f"  {'INTEGER':<10}{cents_time * 1000:>10.2f} ms  {from_cents(cents_total)!r}{float_time / cents_time:>8.2f}x")
+    assert Decimal(cents_total) / 100 == exact, 'integer SUM differs from the exact total'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# benchmark_pricing.py
+# Compare pricing line by line through the discount decorator chain with a
+# compiled PricingPlan (NumPy when installed), and check they agree exactly.
+#
+#   python benchmark_pricing.py
+#   python benchmark_pricing.py --lines 10000 --catalog 200000 --repeat 5
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from database import Base, SessionLocal
+from discount_decorators import DiscountFactory
+from promotions import ensure_default_promotions
+import pricing_engine
+from pricing_engine import compile_pricing_plan
+
+CHAIN = [
+    {'type': 'percentage', 'percentage': 12.5},
+    {'type': 'bulk', 'min_quantity': 5, 'percentage': 7},
+    {'type': 'coupon', 'code': 'SAVE10', 'percentage': 10},
+    {'type': 'fixed', 'amount': 3},
+    {'type': 'coupon', 'code': 'NOT-A-CODE', 'percentage': 50},
+    {'type': 'percentage', 'percentage': 5},
+]
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def compare(label, calculator, prices, quantities, repeat):
+    plan = compile_pricing_plan(calculator)
+
+    chain_time, expected = best_of(
+        lambda: [calculator.calculate_price(p, q) for p, q in zip(prices, quantities)], repeat)
+    loop_time, looped = best_of(
+        lambda: [plan.price_line(p, q) for p, q in zip(prices, quantities)], repeat)
+    rows = [('decorator chain', chain_time), ('plan, Python loop', loop_time)]
+    assert looped == expected, 'plan loop differs from the decorator chain'
+
+    if pricing_engine.np is not None:
+        vector_time, (finals, _) = best_of(lambda: plan.evaluate(prices, quantities), repeat)
+        assert finals.tolist() == expected, 'vectorized plan differs from the decorator chain'
+        rows.append(('plan, NumPy', vector_time))
+
+    print(f"\n{label} ({len(prices)} lines, {len(plan.steps)} steps) - results identical")
+    for name, elapsed in rows:
+        print(f"  {name:<20}{elapsed * 1000:>10.2f} ms{chain_time / elapsed:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pricing engine benchmark')
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--catalog', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Coupons in the chain are checked against the promotions table: seed
+    # a scratch database rather than the one in DATABASE_URL
+    path = os.path.join(tempfile.mkdtemp(), 'bench_pricing.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(bind=engine)
+    SessionLocal.configure(bind=engine)
+    ensure_default_promotions()
+
+    rng = random.Random(7)
+    calculator = DiscountFactory.create_discount_calculator(CHAIN)
+    print(f"Chain: {calculator.get_description()}")
+    if pricing_engine.np is None:
+        print("NumPy not installed: only the Python loop is measured")
+
+    prices = [round(rng.uniform(0.5, 500), 2) for _ in range(args.lines)]
+    quantities = [rng.randint(1, 12) for _ in range(args.lines)]
+    compare('Cart', calculator, prices, quantities, args.repeat)
+
+    # Catalog-wide preview: every product at quantity 1
+    prices = [round(rng.uniform(0.5, 2000), 2) for _ in range(args.catalog)]
+    compare('Catalog preview', calculator, prices, [1] * args.catalog, args.repeat)
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
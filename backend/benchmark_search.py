@@ -0,0 +1,117 @@
+# benchmark_search.py
+# Compare the old LIKE '%term%' product search with the FTS5 index.
+#
+#   python benchmark_search.py                 # 1,000,000 products
+#   python benchmark_search.py --rows 100000
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, or_
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Product
+from search_index import init_search_index, apply_search
+
+WORDS = ['wireless', 'laptop', 'headphones', 'camera', 'smartwatch', 'leather', 'bag',
+         'lipstick', 'sneakers', 'gaming', 'mouse', 'keyboard', 'speaker', 'necklace',
+         'jacket', 'portable', 'premium', 'ultra', 'slim', 'pro', 'bluetooth', 'silver']
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'ze', 'qu', 'ph', 'tr', 'ix', 'on', 'ar']
+CATEGORIES = ['electronics', 'audio', 'wearables', 'clothing', 'shoes', 'bags', 'jewelry']
+SEARCHES = ['laptop', 'wireless head', 'necklace silver', 'pro', 'kalomi', 'zzz-no-match']
+
+
+def build_vocabulary(rng, size=20000):
+    """Common product words plus a long tail of brand/model-like tokens"""
+    vocabulary = set(WORDS)
+    vocabulary.add('kalomi')
+    while len(vocabulary) < size:
+        vocabulary.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(vocabulary)
+
+
+def seed(engine, rows, batch=50000):
+    rng = random.Random(42)
+    vocabulary = build_vocabulary(rng)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, rows, batch):
+            values = []
+            for _ in range(min(batch, rows - start)):
+                name = ' '.join(rng.sample(WORDS, 2) + rng.sample(vocabulary, 1)).title()
+                description = ' '.join(rng.choices(WORDS, k=4) + rng.choices(vocabulary, k=8))
+                values.append((name, rng.choice(CATEGORIES), round(rng.uniform(5, 2000), 2),
+                               round(rng.uniform(1, 5), 1), rng.randint(0, 500), description))
+            cursor.executemany(
+                "INSERT INTO products (name, category, price, rating, reviews, description) "
+                "VALUES (?, ?, ?, ?, ?, ?)", values)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def like_page(db, search, per_page=8):
+    term = f"%{search}%"
+    query = db.query(Product).filter(or_(Product.name.ilike(term), Product.description.ilike(term)))
+    total = query.count()
+    return total, query.order_by(Product.id).limit(per_page).all()
+
+
+def fts_page(db, search, per_page=8):
+    query, rank = apply_search(db.query(Product), Product, search)
+    total = query.count()
+    return total, query.order_by(rank, Product.id).limit(per_page).all()
+
+
+def timed(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Product search benchmark')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(bind=engine)
+
+    print(f"Seeding {args.rows:,} products...")
+    start = time.perf_counter()
+    seed(engine, args.rows)
+    print(f"  seeded in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    # The triggers did not exist during seeding, so this builds the index from scratch
+    init_search_index(engine)
+    print(f"  index built in {time.perf_counter() - start:.1f}s")
+
+    db = sessionmaker(bind=engine)()
+    try:
+        print(f"\n{'search':<20}{'matches':>10}{'LIKE ms':>12}{'FTS5 ms':>12}{'speedup':>10}")
+        for search in SEARCHES:
+            like_time, (like_total, _) = timed(like_page, db, search)
+            fts_time, (fts_total, _) = timed(fts_page, db, search)
+            print(f"{search:<20}{fts_total:>10,}{like_time * 1000:>12.1f}{fts_time * 1000:>12.1f}"
+                  f"{like_time / fts_time if fts_time else 0:>9.1f}x")
+            if like_total != fts_total:
+                # LIKE matches substrings anywhere, FTS5 matches word prefixes
+                print(f"  note: LIKE matched {like_total:,} rows (substring semantics)")
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
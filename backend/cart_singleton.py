@@ -1,6 +1,21 @@
 # backend/cart_singleton.py
+from collections import OrderedDict
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from config import Config
+from database import get_db_session
+from models import CartSessionVersion
+from money import to_cents, from_cents, percent_of_cents
+from version_counters import bump_version_counter
 import json
+import threading
+import time
+
+FREE_SHIPPING_THRESHOLD_CENTS = 5000
+SHIPPING_CENTS = 599
+TAX_PERCENTAGE = 8
 
 class CartSingleton:
     """
@@ -8,7 +23,7 @@ class CartSingleton:
     This acts as a facade over your database cart operations
     """
     _instance = None
-    _active_carts = {}  # Cache for active carts
+    _active_carts = OrderedDict()  # Cache for active carts (LRU order)
     
     def __new__(cls):
         if cls._instance is None:
@@ -19,39 +34,159 @@ class CartSingleton:
     
     def _initialize(self):
         """Initialize the singleton"""
-        self._active_carts = {}
+        # session_id -> (entry, last access monotonic time, size in bytes),
+        # least recently used first
+        self._active_carts = OrderedDict()
+        self._lock = threading.RLock()
+        self.max_entries = Config.CART_CACHE_MAX_ENTRIES
+        self.max_bytes = Config.CART_CACHE_MAX_BYTES
+        self.ttl_seconds = Config.CART_CACHE_TTL
+        self.poll_seconds = Config.CART_VERSION_POLL_SECONDS
+        self._total_bytes = 0
+        # Bumped by every invalidation so a read that raced a write is not cached
+        self._generation = 0
+        # Highest cart version seen by _poll(), and when it last ran
+        self._last_version = None
+        self._checked_at = None
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                          'remote_invalidations': 0}
         print("🛒 CartSingleton initialized")
     
     def get_cart_stats(self):
         """Get statistics about all carts (Singleton feature)"""
-        return {
-            'instance_id': id(self),
-            'is_singleton': self._instance is not None,
-            'active_carts_in_memory': len(self._active_carts),
-            'description': 'Singleton Cart Manager - Only one instance in entire application'
-        }
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'instance_id': id(self),
+                'is_singleton': self._instance is not None,
+                'active_carts_in_memory': len(self._active_carts),
+                'cache_bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'poll_seconds': self.poll_seconds,
+                **self._counters,
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0,
+                'description': 'Singleton Cart Manager - Only one instance in entire application'
+            }
     
-    def cache_cart(self, session_id, cart_data):
+    def get_generation(self):
+        """Invalidation counter; pass it back to cache_cart after loading from the DB"""
+        return self._generation
+    
+    def cache_cart(self, session_id, cart_data, generation=None):
         """Cache cart data in memory (Singleton cache feature)"""
-        self._active_carts[session_id] = {
+        entry = {
             'data': cart_data,
             'last_accessed': datetime.now().isoformat()
         }
-        print(f"🛒 Cached cart for session: {session_id}")
-        return self._active_carts[session_id]
+        size = len(json.dumps(cart_data, default=str))
+        
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # A cart was invalidated while this data was being loaded
+                return entry
+            
+            self._remove(session_id)
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return entry
+            
+            self._active_carts[session_id] = (entry, time.monotonic(), size)
+            self._total_bytes += size
+            self._evict()
+        return entry
+    
+    def _poll(self):
+        """Drop the cached carts other workers changed since the last poll.
+
+        Every cart write records its session under a new version of the
+        shared 'cart' counter (bump_cart_version), so this is one indexed
+        SELECT per poll interval, not a query per request.
+        """
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.poll_seconds:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.poll_seconds:
+                return
+            db = get_db_session()
+            try:
+                if self._last_version is None:
+                    # Nothing cached yet: only note where the log stands
+                    rows = [(None, db.query(func.max(CartSessionVersion.version)).scalar() or 0)]
+                else:
+                    rows = db.query(CartSessionVersion.session_id, CartSessionVersion.version).filter(
+                        CartSessionVersion.version > self._last_version).all()
+            finally:
+                db.close()
+            for session_id, version in rows:
+                if session_id in self._active_carts:
+                    self._remove(session_id)
+                    self._counters['remote_invalidations'] += 1
+                if self._last_version is None or version > self._last_version:
+                    self._last_version = version
+            if rows:
+                self._generation += 1
+            self._checked_at = now
     
     def get_cached_cart(self, session_id):
         """Get cached cart if exists"""
-        return self._active_carts.get(session_id)
+        self._poll()
+        with self._lock:
+            cached = self._active_carts.get(session_id)
+            if cached is None:
+                self._counters['misses'] += 1
+                return None
+            
+            entry, touched_at, size = cached
+            now = time.monotonic()
+            if self.ttl_seconds and now - touched_at > self.ttl_seconds:
+                self._remove(session_id)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            
+            self._active_carts[session_id] = (entry, now, size)
+            self._active_carts.move_to_end(session_id)
+            entry['last_accessed'] = datetime.now().isoformat()
+            self._counters['hits'] += 1
+            return entry
     
     def clear_cart_cache(self, session_id=None):
         """Clear cart cache"""
-        if session_id and session_id in self._active_carts:
-            del self._active_carts[session_id]
-            print(f"🛒 Cleared cache for session: {session_id}")
-        elif session_id is None:
-            self._active_carts.clear()
-            print("🛒 Cleared all cart cache")
+        with self._lock:
+            self._generation += 1
+            if session_id and session_id in self._active_carts:
+                self._remove(session_id)
+                print(f"🛒 Cleared cache for session: {session_id}")
+            elif session_id is None:
+                self._active_carts.clear()
+                self._total_bytes = 0
+                print("🛒 Cleared all cart cache")
+    
+    def _remove(self, session_id):
+        cached = self._active_carts.pop(session_id, None)
+        if cached is not None:
+            self._total_bytes -= cached[2]
+    
+    def _evict(self):
+        """Drop idle carts, then least recently used ones, until within budget"""
+        if self.ttl_seconds:
+            cutoff = time.monotonic() - self.ttl_seconds
+            # LRU order means idle entries are at the front
+            while self._active_carts:
+                session_id, (_, touched_at, _) = next(iter(self._active_carts.items()))
+                if touched_at > cutoff:
+                    break
+                self._remove(session_id)
+                self._counters['expirations'] += 1
+        
+        while self._active_carts and (
+                len(self._active_carts) > self.max_entries or self._total_bytes > self.max_bytes):
+            session_id = next(iter(self._active_carts))
+            self._remove(session_id)
+            self._counters['evictions'] += 1
     
     def validate_cart(self, cart_data):
         """Validate cart data (Singleton business logic)"""
@@ -71,30 +206,31 @@ class CartSingleton:
     
     def calculate_cart_totals(self, items):
         """Calculate cart totals (Singleton business logic)"""
+        # Summed in integer cents; only the returned figures are dollars
         subtotal = 0
         item_count = 0
         
         for item in items:
             if 'product' in item and 'quantity' in item:
-                price = item['product'].get('price', 0)
+                price = to_cents(item['product'].get('price', 0))
                 quantity = item['quantity']
                 subtotal += price * quantity
                 item_count += quantity
         
         # Calculate shipping
-        shipping = 0 if subtotal > 50 else 5.99
+        shipping = 0 if subtotal > FREE_SHIPPING_THRESHOLD_CENTS else SHIPPING_CENTS
         
         # Calculate tax (8%)
-        tax = subtotal * 0.08
+        tax = percent_of_cents(subtotal, TAX_PERCENTAGE)
         
         # Calculate total
         total = subtotal + shipping + tax
         
         return {
-            'subtotal': round(subtotal, 2),
-            'shipping': round(shipping, 2),
-            'tax': round(tax, 2),
-            'total': round(total, 2),
+            'subtotal': from_cents(subtotal),
+            'shipping': from_cents(shipping),
+            'tax': from_cents(tax),
+            'total': from_cents(total),
             'item_count': item_count
         }
     
@@ -121,33 +257,48 @@ class CartSingleton:
     
     def apply_discount(self, cart_data, discount_code):
         """Apply discount to cart (Singleton feature)"""
-        discounts = {
-            'WELCOME10': 0.10,  # 10% off
-            'SAVE15': 0.15,     # 15% off
-            'FREESHIP': 'free_shipping'
-        }
+        # Imported here: promotions pulls in the models and database modules
+        from promotions import promotion_index
+        promotion, _ = promotion_index.lookup(discount_code)
         
-        if discount_code not in discounts:
+        if promotion is None:
             return cart_data
         
-        discount = discounts[discount_code]
-        
-        if discount == 'free_shipping':
+        if promotion['discount_type'] == 'free_shipping':
             # Free shipping logic would be applied in calculate_cart_totals
             pass
-        elif isinstance(discount, float):
-            # Apply percentage discount
+        elif promotion['discount_type'] in ('percentage', 'fixed'):
             if 'discounts' not in cart_data:
                 cart_data['discounts'] = []
             
             cart_data['discounts'].append({
-                'code': discount_code,
-                'type': 'percentage',
-                'value': discount * 100,
+                'code': promotion['code'],
+                'type': promotion['discount_type'],
+                'value': promotion['value'],
                 'applied_at': datetime.now().isoformat()
             })
         
         return cart_data
 
+def bump_cart_version(db, session_ids):
+    """Record a write to the carts `session_ids` inside the caller's transaction.
+
+    Every cart write calls this so other workers' caches drop those carts at
+    their next poll; the writing worker also clears its own with
+    clear_cart_cache() after committing.
+    """
+    if isinstance(session_ids, str):
+        session_ids = [session_ids]
+    session_ids = list(session_ids)
+    if not session_ids:
+        return None
+    version = bump_version_counter(db, 'cart')
+    insert = postgresql_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    statement = insert(CartSessionVersion).values(
+        [{'session_id': session_id, 'version': version} for session_id in session_ids])
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[CartSessionVersion.session_id], set_={'version': statement.excluded.version}))
+    return version
+
 # Global singleton instance
 cart_manager = CartSingleton()
\ No newline at end of file
@@ -0,0 +1,285 @@
+# backend/catalog_cache.py
+import bisect
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from config import Config
+from database import get_db_session
+from models import Product, CatalogVersion
+from sqlalchemy import func, update
+
+
+def _sort_key(sort_by):
+    """Sort key matching SQLite's ORDER BY <col>, id (NULLs first)"""
+    def key(product):
+        value = product.get(sort_by)
+        return (value is not None, value if value is not None else 0, product['id'])
+    return key
+
+
+class CatalogSnapshot:
+    """Read-only, versioned copy of the product catalog"""
+
+    def __init__(self, version, products):
+        self.version = version
+        self.products = products  # Product.to_dict() rows ordered by id
+        self.by_id = {p['id']: p for p in products}
+        self.categories = sorted({p['category'] for p in products if p['category']})
+        self.size_bytes = sum(len(json.dumps(p)) for p in products) * 3
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def _ordered(self, sort_by):
+        """Products in ascending (sort_by, id) order, built once per snapshot"""
+        ordered = self._orders.get(sort_by)
+        if ordered is None:
+            with self._lock:
+                ordered = self._orders.get(sort_by)
+                if ordered is None:
+                    key = _sort_key(sort_by)
+                    rows = sorted(self.products, key=key)
+                    ordered = (rows, [key(p) for p in rows])
+                    self._orders[sort_by] = ordered
+        return ordered
+
+    @staticmethod
+    def _matcher(category, min_price, max_price):
+        def matches(p):
+            if category and category != 'all' and p['category'] != category:
+                return False
+            if min_price is not None and p['price'] < min_price:
+                return False
+            if max_price is not None and p['price'] > max_price:
+                return False
+            return True
+        return matches
+
+    def filter_sorted(self, sort_by, sort_order, category=None, min_price=None, max_price=None):
+        rows, _ = self._ordered(sort_by)
+        if sort_order == 'desc':
+            rows = reversed(rows)
+        matches = self._matcher(category, min_price, max_price)
+        return [p for p in rows if matches(p)]
+
+    def seek(self, sort_by, sort_order, after, limit, category=None, min_price=None, max_price=None):
+        """Keyset page: up to `limit` matching rows after the (value, id) pair"""
+        rows, keys = self._ordered(sort_by)
+        descending = sort_order == 'desc'
+
+        if after is None:
+            candidates = reversed(rows) if descending else iter(rows)
+        else:
+            value, row_id = after
+            position = (value is not None, value if value is not None else 0, row_id)
+            if descending:
+                candidates = reversed(rows[:bisect.bisect_left(keys, position)])
+            else:
+                candidates = iter(rows[bisect.bisect_right(keys, position):])
+
+        matches = self._matcher(category, min_price, max_price)
+        page = []
+        for p in candidates:
+            if matches(p):
+                page.append(p)
+                if len(page) == limit:
+                    break
+        return page
+
+
+class CatalogCache:
+    """
+    Singleton Pattern: one in-memory catalog snapshot per worker process.
+    The version is the shared catalog_version row, re-read at most every
+    CATALOG_VERSION_POLL_SECONDS, so every worker (and every restart) sees
+    the same version and picks up the others' writes. Admin product writes
+    in this worker patch the snapshot; catalogs over the configured budget
+    are not held and readers fall back to SQL. The version also keys the
+    ETags of the catalog endpoints.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self.enabled = Config.CATALOG_CACHE_ENABLED
+        self.max_products = Config.CATALOG_CACHE_MAX_PRODUCTS
+        self.max_bytes = Config.CATALOG_CACHE_MAX_BYTES
+        self.poll_seconds = Config.CATALOG_VERSION_POLL_SECONDS
+        self._snapshot = None
+        self._version = None
+        self._modified_at = None
+        self._checked_at = None
+        self._too_large_version = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'fallbacks': 0, 'rebuilds': 0, 'patches': 0}
+
+    @property
+    def version(self):
+        """Shared catalog version, as of the last poll"""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.poll_seconds:
+            with self._lock:
+                if self._checked_at is checked_at:
+                    self._load_version()
+        return self._version
+
+    @property
+    def modified_at(self):
+        """When the catalog last changed (UTC, whole seconds)"""
+        self.version  # polls if due
+        return self._modified_at
+
+    def _load_version(self):
+        db = get_db_session()
+        try:
+            row = db.query(CatalogVersion.version, CatalogVersion.modified_at).filter(
+                CatalogVersion.id == 1).first()
+        finally:
+            db.close()
+        self._set_version(*(row or (0, datetime(1970, 1, 1))))
+        self._checked_at = time.monotonic()
+
+    def _set_version(self, version, modified_at):
+        self._version = version
+        self._modified_at = modified_at.replace(tzinfo=timezone.utc, microsecond=0)
+
+    def get_snapshot(self):
+        """Current snapshot, or None when the SQL path must be used"""
+        if not self.enabled:
+            return None
+
+        version = self.version
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            self._stats['hits'] += 1
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self._version:
+                snapshot = self._rebuild()
+
+        if snapshot is None:
+            self._stats['fallbacks'] += 1
+        else:
+            self._stats['hits'] += 1
+        return snapshot
+
+    def _rebuild(self):
+        # A catalog that did not fit is re-checked only after a write or a TTL
+        if self._too_large_version == self._version:
+            return None
+
+        db = get_db_session()
+        try:
+            count = db.query(func.count(Product.id)).scalar() or 0
+            if count > self.max_products:
+                return self._mark_too_large(f"{count} products")
+
+            products = [p.to_dict() for p in db.query(Product).order_by(Product.id).all()]
+        finally:
+            db.close()
+
+        snapshot = CatalogSnapshot(self._version, products)
+        if snapshot.size_bytes > self.max_bytes:
+            return self._mark_too_large(f"~{snapshot.size_bytes // 1024} KB")
+
+        self._too_large_version = None
+        self._snapshot = snapshot
+        self._stats['rebuilds'] += 1
+        print(f"📦 Catalog snapshot v{snapshot.version} built ({len(products)} products)")
+        return snapshot
+
+    def _mark_too_large(self, size):
+        print(f"📦 Catalog too large for snapshot ({size}), using SQL")
+        self._snapshot = None
+        self._too_large_version = self._version
+        return None
+
+    def _patch(self, written, product_id, product_data=None):
+        version, _ = written
+        with self._lock:
+            snapshot = self._snapshot
+            # Patch only if our write is the one right after the snapshot;
+            # otherwise another worker wrote in between and we rebuild
+            current = snapshot is not None and snapshot.version == version - 1
+            if self._version is None or version > self._version:
+                self._set_version(*written)
+            if not current:
+                self._snapshot = None
+                return
+
+            products = [p for p in snapshot.products if p['id'] != product_id]
+            if product_data is not None:
+                bisect.insort(products, product_data, key=lambda p: p['id'])
+
+            self._snapshot = CatalogSnapshot(version, products)
+            self._stats['patches'] += 1
+
+    def upsert_product(self, written, product_data):
+        """Write-through after an admin create/update commit; `written` is
+        what bump_catalog_version() returned in that transaction"""
+        self._patch(written, product_data['id'], product_data)
+
+    def remove_product(self, written, product_id):
+        """Write-through after an admin delete commit"""
+        self._patch(written, product_id)
+
+    def invalidate(self):
+        """Drop the snapshot and re-read the version on next use"""
+        with self._lock:
+            self._snapshot = None
+            self._too_large_version = None
+            self._checked_at = None
+
+    def get_stats(self):
+        snapshot = self._snapshot
+        return {
+            'enabled': self.enabled,
+            'version': self._version,
+            'poll_seconds': self.poll_seconds,
+            'cached_products': len(snapshot.products) if snapshot else 0,
+            'size_bytes': snapshot.size_bytes if snapshot else 0,
+            'max_products': self.max_products,
+            'max_bytes': self.max_bytes,
+            **self._stats
+        }
+
+
+def bump_catalog_version(db):
+    """Count a product write inside the caller's transaction.
+
+    Returns the (version, modified_at) it wrote, for upsert_product() and
+    remove_product() once the transaction has committed.
+    """
+    now = datetime.utcnow()
+    result = db.execute(update(CatalogVersion).where(CatalogVersion.id == 1).values(
+        version=CatalogVersion.version + 1, modified_at=now))
+    if result.rowcount == 0:
+        db.add(CatalogVersion(id=1, version=1, modified_at=now))
+        db.flush()
+    version = db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar()
+    return version, now
+
+
+def ensure_catalog_version():
+    """Create the catalog_version row on first start"""
+    db = get_db_session()
+    try:
+        if db.query(CatalogVersion.id).filter(CatalogVersion.id == 1).first() is None:
+            db.add(CatalogVersion(id=1, version=1))
+            db.commit()
+    except Exception:
+        # Another worker created it first
+        db.rollback()
+    finally:
+        db.close()
+
+
+# Global singleton instance
+catalog_cache = CatalogCache()
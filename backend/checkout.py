@@ -0,0 +1,139 @@
+# backend/checkout.py
+import json
+from datetime import datetime
+from sqlalchemy import insert, delete
+from sqlalchemy.orm import joinedload
+from models import CartItem, Order, OrderItem
+from sales_rollups import record_order_sales
+from cart_singleton import bump_cart_version
+from money import to_cents, from_cents, prorate_cents
+from pricing_engine import price_cart
+from promotions import promotion_index, redeem_promotion, applies_to, to_discount
+
+
+class EmptyCartError(ValueError):
+    """Raised when checking out a session with no purchasable cart lines"""
+
+
+class CouponError(ValueError):
+    """Raised when the order's coupon cannot be redeemed"""
+
+
+def load_cart_lines(db, session_id):
+    """Stage 1: cart lines with their products, one joined SELECT"""
+    return db.query(CartItem).options(
+        joinedload(CartItem.product)
+    ).filter(
+        CartItem.session_id == session_id
+    ).all()
+
+
+def price_cart_lines(cart_items):
+    """Stage 2: price every line in memory -> (order item rows, order total in cents)"""
+    lines = []
+    total = 0
+    for item in cart_items:
+        product = item.product
+        if product is None:
+            continue
+        lines.append({
+            'product_id': product.id,
+            'quantity': item.quantity,
+            'price': product.price
+        })
+        total += to_cents(product.price) * item.quantity
+    return lines, total
+
+
+def discount_line(line, discount):
+    """Order item rows for `line` with `discount` cents off its total.
+
+    Unit prices stay whole cents, so a total that does not split evenly over
+    the quantity becomes two rows, one cent apart.
+    """
+    unit, extra = divmod(to_cents(line['price']) * line['quantity'] - discount, line['quantity'])
+    rows = []
+    if extra:
+        rows.append(dict(line, quantity=extra, price=from_cents(unit + 1)))
+    if line['quantity'] > extra:
+        rows.append(dict(line, quantity=line['quantity'] - extra, price=from_cents(unit)))
+    return rows
+
+
+def apply_coupon(db, coupon_code, cart_items, lines, total):
+    """Redeem `coupon_code` in the checkout transaction -> (order item rows,
+    discounted total in cents)
+
+    The usage count is taken with redeem_promotion(), so it rolls back with
+    the order and two checkouts cannot both take a coupon's last use. The
+    savings are prorated onto the discounted lines, so the items (and the
+    product and category rollups) add up to the order total.
+    """
+    promotion, reason = promotion_index.lookup(coupon_code)
+    if promotion is None:
+        raise CouponError(reason)
+    if not redeem_promotion(db, coupon_code):
+        raise CouponError('Coupon is no longer available')
+
+    products = {item.product.id: {'id': item.product.id, 'category': item.product.category}
+                for item in cart_items if item.product}
+    scoped = [line for line in lines if applies_to(promotion, products[line['product_id']])]
+    if not scoped:
+        return lines, total
+    savings = to_cents(price_cart(scoped, [to_discount(promotion)])['savings'])
+    shares = iter(prorate_cents([to_cents(line['price']) * line['quantity'] for line in scoped], savings))
+    discounted = []
+    for line in lines:
+        in_scope = applies_to(promotion, products[line['product_id']])
+        discounted.extend(discount_line(line, next(shares)) if in_scope else [line])
+    return discounted, total - savings
+
+
+def write_order(db, order_values, lines, session_id):
+    """Stages 3-5: insert the order, bulk-insert its items, empty the cart
+    (recorded for other workers' cart caches)"""
+    result = db.execute(insert(Order).values(**order_values))
+    order_id = result.inserted_primary_key[0]
+
+    # One executemany for all lines instead of an ORM add() per item
+    db.execute(insert(OrderItem), [dict(line, order_id=order_id) for line in lines])
+    db.execute(delete(CartItem).where(CartItem.session_id == session_id))
+    bump_cart_version(db, session_id)
+    return order_id
+
+
+def checkout_cart(db, session_id, order_number, user_id=None, shipping_info=None, coupon_code=None):
+    """Turn a session's cart into a confirmed order in one short transaction.
+
+    Returns the order summary dict; the caller owns commit/rollback.
+    """
+    cart_items = load_cart_lines(db, session_id)
+    lines, total = price_cart_lines(cart_items)
+    if not lines:
+        raise EmptyCartError('Cart is empty')
+    if coupon_code:
+        lines, total = apply_coupon(db, coupon_code, cart_items, lines, total)
+
+    # Set here rather than by the server default so the rollup buckets match it
+    created_at = datetime.utcnow().replace(microsecond=0)
+    order_values = {
+        'order_number': order_number,
+        'user_id': user_id,
+        'session_id': session_id,
+        'total_amount': from_cents(total),
+        'status': 'confirmed',
+        'shipping_info': json.dumps(shipping_info or {}),
+        'created_at': created_at
+    }
+    order_id = write_order(db, order_values, lines, session_id)
+
+    # Stage 6: sales rollups, committed (or rolled back) with the order
+    categories = {item.product.id: item.product.category for item in cart_items if item.product}
+    record_order_sales(db, created_at, total, lines, categories)
+
+    return {
+        'id': order_id,
+        'order_number': order_number,
+        'total_amount': from_cents(total),
+        'status': 'confirmed'
+    }
@@ -7,6 +7,41 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///shopease.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # In-memory catalog snapshot (per worker); larger catalogs are served from SQL
+    CATALOG_CACHE_ENABLED = os.getenv('CATALOG_CACHE_ENABLED', 'true').lower() == 'true'
+    CATALOG_CACHE_MAX_PRODUCTS = int(os.getenv('CATALOG_CACHE_MAX_PRODUCTS', 50000))
+    CATALOG_CACHE_MAX_BYTES = int(os.getenv('CATALOG_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # How often each worker re-reads the shared catalog version, i.e. how long
+    # another worker's product write can take to show up (0 = every request)
+    CATALOG_VERSION_POLL_SECONDS = int(os.getenv('CATALOG_VERSION_POLL_SECONDS', 5))
+    # Cache-Control max-age for anonymous catalog responses (reverse proxy / browser)
+    CATALOG_HTTP_MAX_AGE = int(os.getenv('CATALOG_HTTP_MAX_AGE', 60))
+    # CartSingleton in-memory cart cache bounds (per worker)
+    CART_CACHE_MAX_ENTRIES = int(os.getenv('CART_CACHE_MAX_ENTRIES', 10000))
+    CART_CACHE_MAX_BYTES = int(os.getenv('CART_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    CART_CACHE_TTL = int(os.getenv('CART_CACHE_TTL', 1800))
+    # How often each worker checks for carts changed through other workers, i.e.
+    # how long such a change can take to show up (0 = every request)
+    CART_VERSION_POLL_SECONDS = int(os.getenv('CART_VERSION_POLL_SECONDS', 1))
+    # Idempotency-Key handling for POST /api/orders
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 3600))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+    IDEMPOTENCY_WAIT_SECONDS = int(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 10))
+    # Order numbers: 'snowflake' (time + worker + sequence) or 'random' (legacy)
+    ORDER_NUMBER_GENERATOR = os.getenv('ORDER_NUMBER_GENERATOR', 'snowflake')
+    # Fixed worker id for this process (0-9999, unique across hosts); unset =
+    # lease a free one from the database, renewed while the process runs
+    ORDER_WORKER_ID = os.getenv('ORDER_WORKER_ID')
+    ORDER_WORKER_LEASE_SECONDS = int(os.getenv('ORDER_WORKER_LEASE_SECONDS', 600))
+    # admin_required role cache (per worker); bounds how long a revoked admin keeps access
+    ADMIN_ROLE_CACHE_TTL = int(os.getenv('ADMIN_ROLE_CACHE_TTL', 30))
+    ADMIN_ROLE_CACHE_MAX_ENTRIES = int(os.getenv('ADMIN_ROLE_CACHE_MAX_ENTRIES', 10000))
+    # Analytics summary response cache lifetime (cleared on order creation in this worker)
+    ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 60))
+    # How often PromotionIndex polls for promotions changed by other workers
+    PROMOTIONS_REFRESH_SECONDS = int(os.getenv('PROMOTIONS_REFRESH_SECONDS', 30))
+    # Raise instead of logging when a view exceeds its @query_budget
+    QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'false').lower() == 'true'
     # CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:8000').split(',')
     CORS_ORIGINS = [
     "http://localhost:8000",
@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, Integer
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.orm import Session
 from config import Config
+from money import Money
+from search_index import init_search_index
 
 # Create base class for models
 Base = declarative_base()
@@ -15,6 +17,55 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    check_money_columns()
+    ensure_indexes()
+    init_search_index(engine)
+
+def unconverted_money_columns(bind=engine):
+    """{table: [column, ...]} of Money columns the database still stores as
+    something other than integers (float dollars from before Money)"""
+    inspector = inspect(bind)
+    pending = {}
+    for table in Base.metadata.sorted_tables:
+        money = [column.name for column in table.columns if isinstance(column.type, Money)]
+        if not money:
+            continue
+        stored = {c['name']: c['type'] for c in inspector.get_columns(table.name)}
+        columns = [name for name in money if name in stored and not isinstance(stored[name], Integer)]
+        if columns:
+            pending[table.name] = columns
+    return pending
+
+def check_money_columns():
+    """Refuse to start on a database still holding float dollars.
+
+    Money would read $1299.99 as $12.99. The conversion rewrites tables, so
+    it is left to migrate_money_to_cents.py, run once with the app stopped.
+    """
+    pending = unconverted_money_columns()
+    if pending:
+        names = ', '.join(f'{table}.{name}' for table, columns in pending.items() for name in columns)
+        raise RuntimeError(f"{names} still hold float dollars; stop the app and run "
+                           f"`python migrate_money_to_cents.py` to convert them to integer cents")
+
+def ensure_indexes():
+    """Create indexes added to models after their table already existed.
+
+    A failure here stops startup: the unique cart line index in particular
+    is what add_to_cart's upsert relies on.
+    """
+    existing = {index['name'] for index in inspect(engine).get_indexes('cart_items')}
+    if 'uq_cart_items_session_product' not in existing:
+        # Older databases can hold duplicate cart lines that would block it
+        from dedupe_cart_items import merge_duplicate_cart_items
+        with engine.begin() as conn:
+            removed = merge_duplicate_cart_items(conn)
+        if removed:
+            print(f"🛒 Merged {removed} duplicate cart lines")
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 def get_db():
     """Get database session - CORRECTED VERSION"""
@@ -0,0 +1,50 @@
+# dedupe_cart_items.py
+# Merge duplicate (session_id, product_id) cart lines and add the unique
+# index add_to_cart's upsert relies on. init_db() does this automatically
+# when the index is missing; this script runs it by hand.
+from sqlalchemy import text
+
+
+def merge_duplicate_cart_items(conn):
+    """Keep the oldest row of each duplicated line with the summed quantity.
+
+    Returns how many rows were removed.
+    """
+    conn.execute(text("""
+        UPDATE cart_items SET quantity = (
+            SELECT SUM(c.quantity) FROM cart_items c
+            WHERE c.session_id = cart_items.session_id AND c.product_id = cart_items.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart_items
+            WHERE session_id IS NOT NULL AND product_id IS NOT NULL
+            GROUP BY session_id, product_id
+            HAVING COUNT(*) > 1
+        )
+    """))
+    result = conn.execute(text("""
+        DELETE FROM cart_items
+        WHERE session_id IS NOT NULL AND product_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM cart_items
+            WHERE session_id IS NOT NULL AND product_id IS NOT NULL
+            GROUP BY session_id, product_id
+        )
+    """))
+    return result.rowcount
+
+
+def dedupe_cart_items():
+    from database import engine, init_db
+    import models  # registers the tables init_db() creates
+
+    print("Merging duplicate (session_id, product_id) rows in 'cart_items'...")
+    with engine.begin() as conn:
+        removed = merge_duplicate_cart_items(conn)
+    print(f"✓ Removed {removed} duplicate rows")
+
+    # Creates uq_cart_items_session_product if it is still missing
+    init_db()
+    print("\n✅ Database updated successfully!")
+
+if __name__ == "__main__":
+    dedupe_cart_items()
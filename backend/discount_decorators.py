@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List
+from money import to_cents, from_cents, percent_of_cents
 
 class PriceCalculator(ABC):
     """Abstract base class for price calculation"""
@@ -15,7 +16,7 @@ class PriceCalculator(ABC):
 class BasePriceCalculator(PriceCalculator):
     """Concrete component - calculates base price without any discounts"""
     def calculate_price(self, original_price: float, quantity: int = 1) -> float:
-        return original_price * quantity
+        return from_cents(to_cents(original_price) * quantity)
     
     def get_description(self) -> str:
         return "Base Price"
@@ -40,9 +41,9 @@ class PercentageDiscountDecorator(DiscountDecorator):
         self.percentage = percentage
     
     def calculate_price(self, original_price: float, quantity: int = 1) -> float:
-        base_price = self._calculator.calculate_price(original_price, quantity)
-        discount_amount = base_price * (self.percentage / 100)
-        return max(0, base_price - discount_amount)
+        # Whole cents, discount rounded half-up
+        base_cents = to_cents(self._calculator.calculate_price(original_price, quantity))
+        return from_cents(max(0, base_cents - percent_of_cents(base_cents, self.percentage)))
     
     def get_description(self) -> str:
         return f"{self._calculator.get_description()} + {self.percentage}% off"
@@ -55,8 +56,8 @@ class FixedAmountDiscountDecorator(DiscountDecorator):
         self.amount = amount
     
     def calculate_price(self, original_price: float, quantity: int = 1) -> float:
-        base_price = self._calculator.calculate_price(original_price, quantity)
-        return max(0, base_price - self.amount)
+        base_cents = to_cents(self._calculator.calculate_price(original_price, quantity))
+        return from_cents(max(0, base_cents - to_cents(self.amount)))
     
     def get_description(self) -> str:
         return f"{self._calculator.get_description()} + ${self.amount:.2f} off"
@@ -72,18 +73,15 @@ class CouponDiscountDecorator(DiscountDecorator):
     def calculate_price(self, original_price: float, quantity: int = 1) -> float:
         base_price = self._calculator.calculate_price(original_price, quantity)
         if self.validate_coupon():
-            discount_amount = base_price * (self.discount_percentage / 100)
-            return max(0, base_price - discount_amount)
+            base_cents = to_cents(base_price)
+            return from_cents(max(0, base_cents - percent_of_cents(base_cents, self.discount_percentage)))
         return base_price
     
     def validate_coupon(self) -> bool:
-        # In a real app, you'd check against a database
-        valid_coupons = {
-            "SAVE10": True,
-            "WELCOME20": True,
-            "SUMMER25": True
-        }
-        return self.coupon_code in valid_coupons
+        # Imported here: promotions -> models -> discount_decorators
+        from promotions import promotion_index
+        promotion, _ = promotion_index.lookup(self.coupon_code)
+        return promotion is not None
     
     def get_description(self) -> str:
         if self.validate_coupon():
@@ -102,8 +100,8 @@ class BulkDiscountDecorator(DiscountDecorator):
         base_price = self._calculator.calculate_price(original_price, quantity)
         
         if quantity >= self.min_quantity:
-            discount_amount = base_price * (self.discount_percentage / 100)
-            return max(0, base_price - discount_amount)
+            base_cents = to_cents(base_price)
+            return from_cents(max(0, base_cents - percent_of_cents(base_cents, self.discount_percentage)))
         return base_price
     
     def get_description(self) -> str:
@@ -0,0 +1,224 @@
+# backend/discount_optimizer.py
+import time
+from typing import List, Optional
+from discount_decorators import DiscountFactory
+from pricing_engine import compile_pricing_plan, price_cart
+from money import to_cents
+
+# Keeps the search bounded even if a client sends a long list
+MAX_CANDIDATES = 20
+
+
+class CartPriceModel:
+    """Cart totals in cents, priced the way price_cart prices a stack.
+
+    Percentage steps are applied line by line with the same half-up cent
+    rounding as PricingPlan, and fixed amounts come off the order total
+    once, so a search node costs exactly what price_cart will report for it.
+    """
+
+    def __init__(self, bases: List[int]):
+        self.bases = list(bases)
+
+    def apply_rate(self, totals: List[int], numerator: int, denominator: int) -> List[int]:
+        return [max(0, total - (2 * total * numerator + denominator) // (2 * denominator)) for total in totals]
+
+    def price(self, totals: List[int], fixed: int) -> int:
+        return max(0, sum(totals) - fixed)
+
+    def lower_bound(self, subtotal: int, multiplier: float, steps: int, fixed: int) -> float:
+        """No stack that adds `steps` percentages (together `multiplier`) and
+        `fixed` cents to lines now adding up to `subtotal` can cost less.
+
+        Each rounded step can land at most half a cent per line below the
+        exact rate.
+        """
+        return max(0.0, subtotal * multiplier - 0.5 * len(self.bases) * steps - fixed)
+
+
+def _candidate_step(discount, total_quantity):
+    """('percentage', numerator, denominator) or ('fixed', cents) for one
+    discount, or (None, reason) if it cannot apply"""
+    plan = compile_pricing_plan(DiscountFactory.create_discount_calculator([discount]))
+    if not plan.steps:
+        if discount.get('type') == 'coupon':
+            return None, 'Invalid coupon code'
+        return None, f"Unsupported discount type: {discount.get('type')}"
+    step = plan.steps[0]
+    if step[0] == 'bulk':
+        if total_quantity < step[1]:
+            return None, f'Requires {step[1]}+ items in cart'
+        return ('percentage', step[2], step[3])
+    return step
+
+
+def _stacking_key(discount):
+    if discount.get('type') == 'fixed':
+        return (1, -discount.get('amount', 0))
+    return (0, -discount.get('percentage', 0))
+
+
+def stacking_order(discounts: List[dict]) -> List[dict]:
+    """The order a set of discounts is priced in: percentages, largest
+    first, then fixed amounts.
+
+    A fixed amount taken after the percentages is never scaled down by one
+    of them. Percentages commute up to each step's cent rounding, so they go
+    in one fixed order for the search and price_cart to agree on.
+    """
+    return sorted(discounts, key=_stacking_key)
+
+
+def _group_best(candidates, value, reverse):
+    """(value, group) of `candidates`, keeping only the best of each
+    exclusive group, best first"""
+    best = {}
+    ungrouped = []
+    for candidate in candidates:
+        group = candidate['group']
+        entry = (value(candidate), group)
+        if group is None:
+            ungrouped.append(entry)
+        elif group not in best or (entry[0] > best[group][0] if reverse else entry[0] < best[group][0]):
+            best[group] = entry
+    return sorted(ungrouped + list(best.values()), key=lambda entry: entry[0], reverse=reverse)
+
+
+def _take(entries, slots, used_groups):
+    """The first `slots` entries whose group is still free"""
+    taken = []
+    for value, group in entries:
+        if len(taken) == slots:
+            break
+        if group is None or group not in used_groups:
+            taken.append(value)
+    return taken
+
+
+def optimize_discounts(lines: List[dict], candidates: List[dict], max_discounts: Optional[int] = None) -> dict:
+    """Pick the subset and order of `candidates` giving the lowest cart price.
+
+    Candidates are DiscountFactory dicts and may also carry:
+      exclusive_group - at most one discount per group is used
+      stackable       - False means the discount can only be used on its own
+    `max_discounts` caps how many are stacked.
+
+    Branch-and-bound over subsets in stacking_order(), each node priced
+    exactly by CartPriceModel. A branch is dropped when the best the free
+    slots could still do - the smallest percentages and largest fixed
+    amounts left, at most one per unused exclusive group - cannot beat the
+    best price found so far.
+
+    The result's 'optimal' is 'exact' when no two percentages can be
+    stacked. Otherwise it is 'up_to_step_rounding': the subset is the best
+    one in stacking order, but stacking its percentages (or another
+    subset's) in a different order can round a cent or two lower.
+    """
+    started = time.perf_counter()
+    if len(candidates) > MAX_CANDIDATES:
+        raise ValueError(f'At most {MAX_CANDIDATES} candidate discounts')
+
+    total_quantity = sum(line['quantity'] for line in lines)
+    model = CartPriceModel([to_cents(line['price']) * line['quantity'] for line in lines])
+    original = model.price(model.bases, 0)
+
+    eligible, excluded = [], []
+    for discount in candidates:
+        step = _candidate_step(discount, total_quantity)
+        if step[0] is None:
+            excluded.append({'discount': discount, 'reason': step[1]})
+            continue
+        if step[1] < 0:
+            excluded.append({'discount': discount, 'reason': 'Discount would raise the price'})
+            continue
+        # A qualifying bulk discount is the percentage it gives to the whole cart
+        resolved = discount
+        if discount.get('type') == 'bulk':
+            resolved = {'type': 'percentage', 'percentage': discount.get('percentage', 0)}
+        eligible.append({'discount': discount, 'resolved': resolved, 'step': step,
+                         'group': discount.get('exclusive_group')})
+
+    best = {'price': original, 'chosen': []}
+    nodes = 0
+
+    def consider(price, chosen):
+        # Ties go to the smaller stack
+        if price < best['price'] or (price == best['price'] and len(chosen) < len(best['chosen'])):
+            best['price'], best['chosen'] = price, list(chosen)
+
+    def stack_price(candidate, totals, fixed):
+        step = candidate['step']
+        if step[0] == 'fixed':
+            return totals, fixed + step[1]
+        return model.apply_rate(totals, step[1], step[2]), fixed
+
+    # A non-stackable discount is only ever used alone
+    if max_discounts is None or max_discounts >= 1:
+        for candidate in eligible:
+            if not candidate['discount'].get('stackable', True):
+                consider(model.price(*stack_price(candidate, model.bases, 0)), [candidate])
+
+    # Search in stacking order, so each node extends its parent's line totals
+    stackable = sorted((c for c in eligible if c['discount'].get('stackable', True)),
+                       key=lambda c: _stacking_key(c['resolved']))
+    limit = len(stackable) if max_discounts is None else max(0, max_discounts)
+    # Percentages that could be stacked together: ungrouped ones plus one per group
+    stacked_percentages = min(limit, len(_group_best(
+        [c for c in stackable if c['step'][0] == 'percentage'], lambda c: 0, reverse=False)))
+
+    # For each suffix i: its multipliers smallest first and fixed amounts
+    # largest first, one entry per exclusive group
+    suffix_multipliers, suffix_fixed = [], []
+    for i in range(len(stackable) + 1):
+        rest = stackable[i:]
+        suffix_multipliers.append(_group_best(
+            [c for c in rest if c['step'][0] == 'percentage'],
+            lambda c: max(0.0, 1 - c['step'][1] / c['step'][2]), reverse=False))
+        suffix_fixed.append(_group_best(
+            [c for c in rest if c['step'][0] == 'fixed'], lambda c: c['step'][1], reverse=True))
+
+    chosen, groups = [], set()
+
+    def search(i, totals, fixed):
+        nonlocal nodes
+        nodes += 1
+        consider(model.price(totals, fixed), chosen)
+        if i == len(stackable) or len(chosen) == limit:
+            return
+        slots = limit - len(chosen)
+        multipliers = _take(suffix_multipliers[i], slots, groups)
+        multiplier = 1.0
+        for value in multipliers:
+            multiplier *= value
+        extra = sum(_take(suffix_fixed[i], slots, groups))
+        # Prices are whole cents and ties go to the smaller stack, so a branch
+        # is only worth it if it could reach best - 1
+        if model.lower_bound(sum(totals), multiplier, len(multipliers), fixed + extra) > best['price'] - 1 + 1e-6:
+            return
+
+        candidate = stackable[i]
+        group = candidate['group']
+        if group is None or group not in groups:
+            chosen.append(candidate)
+            if group is not None:
+                groups.add(group)
+            search(i + 1, *stack_price(candidate, totals, fixed))
+            chosen.pop()
+            groups.discard(group)
+        search(i + 1, totals, fixed)
+
+    search(0, model.bases, 0)
+
+    ordered = stacking_order([c['resolved'] for c in best['chosen']])
+    # Final figures come from the real decorator chain; they match the model
+    result = price_cart(lines, ordered)
+    result['discounts'] = stacking_order([c['discount'] for c in best['chosen']])
+    result['excluded'] = excluded
+    result['optimal'] = 'exact' if stacked_percentages < 2 else 'up_to_step_rounding'
+    result['search'] = {
+        'candidates': len(candidates),
+        'eligible': len(eligible),
+        'nodes': nodes,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    }
+    return result
@@ -0,0 +1,98 @@
+# backend/exports.py
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select, func
+from database import get_db_session
+from models import Order, OrderItem, Product, User
+
+# Rows fetched per round trip; memory stays bounded by one batch
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def orders_export_statement():
+    """Orders with their customer and item count, oldest first"""
+    item_count = select(func.count(OrderItem.id)).where(
+        OrderItem.order_id == Order.id
+    ).correlate(Order).scalar_subquery()
+
+    return select(
+        Order.id,
+        Order.order_number,
+        Order.user_id,
+        User.username,
+        User.email,
+        Order.session_id,
+        Order.total_amount,
+        Order.status,
+        Order.created_at,
+        item_count.label('item_count')
+    ).outerjoin(User, User.id == Order.user_id).order_by(Order.id)
+
+
+def order_items_export_statement():
+    """Order lines joined with their order and product, oldest first"""
+    return select(
+        OrderItem.id,
+        OrderItem.order_id,
+        Order.order_number,
+        Order.status.label('order_status'),
+        Order.total_amount.label('order_total'),
+        OrderItem.product_id,
+        Product.name.label('product_name'),
+        Product.image.label('product_image'),
+        Product.price.label('product_price'),
+        OrderItem.quantity,
+        OrderItem.price,
+        OrderItem.created_at
+    ).join(Order, Order.id == OrderItem.order_id).outerjoin(
+        Product, Product.id == OrderItem.product_id
+    ).order_by(OrderItem.id)
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(columns, rows):
+    return ''.join(
+        json.dumps({column: _serialize(value) for column, value in zip(columns, row)}) + '\n'
+        for row in rows
+    )
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[_serialize(value) for value in row] for row in rows])
+    return buffer.getvalue()
+
+
+def stream_rows(statement, fmt):
+    """Yield the statement's rows as NDJSON or CSV text, one batch at a time.
+
+    The session lives for the duration of the stream and rows are pulled
+    with yield_per, so memory is flat regardless of table size.
+    """
+    db = get_db_session()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+
+        if fmt == 'csv':
+            # Header goes out before the first batch is fetched
+            yield _csv_chunk([columns])
+
+        for rows in result.partitions():
+            if fmt == 'csv':
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(columns, rows)
+    finally:
+        db.close()
@@ -0,0 +1,93 @@
+# backend/facets.py
+from sqlalchemy import case, cast, func, Integer
+
+# Upper bounds of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKETS = [25, 50, 100, 250, 500, 1000]
+FACETS = ('category', 'price', 'rating')
+
+
+def parse_facets(value):
+    """`facets=category,price` -> ['category', 'price'] (unknown names ignored)"""
+    if not value:
+        return []
+    requested = [f.strip() for f in value.split(',')]
+    return [f for f in FACETS if f in requested]
+
+
+def price_bucket(price):
+    for index, upper in enumerate(PRICE_BUCKETS):
+        if price < upper:
+            return index
+    return len(PRICE_BUCKETS)
+
+
+def rating_bucket(rating):
+    return int(rating or 0)
+
+
+class FacetCounter:
+    """Accumulates category / price / rating counts in a single pass.
+
+    The category facet ignores the category filter so the storefront can
+    show counts for the other categories; price and rating counts respect
+    every filter, including category.
+    """
+
+    def __init__(self, facets, category=None):
+        self.facets = facets
+        self.category = category if category and category != 'all' else None
+        self.categories = {}
+        self.prices = [0] * (len(PRICE_BUCKETS) + 1)
+        self.ratings = [0] * 6
+
+    def add(self, category, price_index, rating_index, count=1):
+        self.categories[category] = self.categories.get(category, 0) + count
+        if self.category is None or category == self.category:
+            self.prices[price_index] += count
+            self.ratings[min(max(rating_index, 0), 5)] += count
+
+    def result(self):
+        result = {}
+        if 'category' in self.facets:
+            result['category'] = [
+                {'value': name, 'count': count}
+                for name, count in sorted(self.categories.items(), key=lambda c: (-c[1], c[0] or ''))
+            ]
+        if 'price' in self.facets:
+            bounds = [0] + PRICE_BUCKETS + [None]
+            result['price'] = [
+                {'min': bounds[i], 'max': bounds[i + 1], 'count': count}
+                for i, count in enumerate(self.prices)
+            ]
+        if 'rating' in self.facets:
+            result['rating'] = [
+                {'rating': stars, 'count': count}
+                for stars, count in enumerate(self.ratings)
+            ]
+        return result
+
+
+def facet_counts_from_rows(rows, facets, category=None):
+    """Facets over product dicts that already match every filter but category"""
+    counter = FacetCounter(facets, category)
+    for p in rows:
+        counter.add(p['category'], price_bucket(p['price']), rating_bucket(p['rating']))
+    return counter.result()
+
+
+def facet_counts_from_query(query, model, facets, category=None):
+    """Facets from one GROUP BY over a query filtered by everything but category"""
+    price_index = case(
+        *[(model.price < upper, index) for index, upper in enumerate(PRICE_BUCKETS)],
+        else_=len(PRICE_BUCKETS)
+    )
+    rating_index = cast(func.coalesce(model.rating, 0), Integer)
+
+    rows = query.with_entities(model.category, price_index, rating_index, func.count(model.id))\
+                .group_by(model.category, price_index, rating_index)\
+                .all()
+
+    counter = FacetCounter(facets, category)
+    for row_category, row_price, row_rating, count in rows:
+        counter.add(row_category, row_price, row_rating, count)
+    return counter.result()
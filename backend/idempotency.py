@@ -0,0 +1,195 @@
+# backend/idempotency.py
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, g, make_response
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from database import get_db_session
+from models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+class IdempotencyKeyLost(Exception):
+    """The request's claim on its Idempotency-Key was taken over by a retry"""
+
+
+def _request_hash():
+    return hashlib.sha256(request.get_data() or b'').hexdigest()
+
+
+def _replay(row):
+    response = make_response(row.response_body, row.response_code)
+    response.mimetype = 'application/json'
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(key, request_hash):
+    """Insert an in-progress row for `key`.
+
+    Returns (True, locked_at) when this request owns the key, or
+    (False, row) with the existing row when another request got there first.
+    """
+    now = datetime.utcnow()
+    db = get_db_session()
+    try:
+        db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < now).delete()
+        db.add(IdempotencyKey(
+            key=key,
+            path=request.path,
+            request_hash=request_hash,
+            status='in_progress',
+            locked_at=now,
+            expires_at=now + timedelta(seconds=Config.IDEMPOTENCY_TTL)
+        ))
+        db.commit()
+        return True, now
+    except IntegrityError:
+        db.rollback()
+        row = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+        if row is not None and row.status == 'in_progress' and row.request_hash == request_hash and \
+                now - row.locked_at > timedelta(seconds=Config.IDEMPOTENCY_LOCK_TIMEOUT):
+            # The owner died mid-request; take the key over (only one waiter wins)
+            taken = db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == 'in_progress',
+                IdempotencyKey.locked_at == row.locked_at
+            ).update({IdempotencyKey.locked_at: now}, synchronize_session=False)
+            db.commit()
+            if taken:
+                return True, now
+            return False, None
+        if row is not None:
+            db.expunge(row)
+        return False, row
+    finally:
+        db.close()
+
+
+def _owned(query, key):
+    """`query` narrowed to the key row as this request claimed it"""
+    return query.filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.status == 'in_progress',
+        IdempotencyKey.locked_at == g.idempotency_locked_at
+    )
+
+
+def _release(key):
+    """Forget a claim whose request failed, so the client can retry it"""
+    db = get_db_session()
+    try:
+        # A retry that took the key over keeps it
+        _owned(db.query(IdempotencyKey), key).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _wait_for(key):
+    """Poll until the in-flight request holding `key` finishes"""
+    deadline = time.monotonic() + Config.IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+        db = get_db_session()
+        try:
+            row = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+            if row is None or row.status == 'completed':
+                if row is not None:
+                    db.expunge(row)
+                return row
+        finally:
+            db.close()
+    return 'timeout'
+
+
+def store_idempotent_response(db, payload, status_code):
+    """Record the response for the active Idempotency-Key inside the caller's
+    transaction, so the result and the key are committed together.
+
+    Raises IdempotencyKeyLost if a retry took the key over after this
+    request stalled; the caller must roll back instead of committing.
+    """
+    key = g.get('idempotency_key')
+    if not key:
+        return
+    stored = _owned(db.query(IdempotencyKey), key).update({
+        IdempotencyKey.status: 'completed',
+        IdempotencyKey.response_code: status_code,
+        IdempotencyKey.response_body: json.dumps(payload)
+    }, synchronize_session=False)
+    if not stored:
+        raise IdempotencyKeyLost(f'{HEADER} {key} was taken over by a retry')
+    g.idempotency_stored = True
+
+
+def idempotent(f):
+    """Honour an optional Idempotency-Key header on a POST endpoint.
+
+    A replay gets the stored response without re-running the view; a
+    concurrent duplicate waits for the first request to finish. The view
+    should call store_idempotent_response() before it commits.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'success': False, 'error': f'{HEADER} too long'}), 400
+
+        request_hash = _request_hash()
+        while True:
+            claimed, row = _claim(key, request_hash)
+            if claimed:
+                locked_at = row
+                break
+            if row is not None and (row.request_hash != request_hash or row.path != request.path):
+                return jsonify({
+                    'success': False,
+                    'error': f'{HEADER} was already used for a different request'
+                }), 422
+            if row is not None and row.status == 'completed':
+                return _replay(row)
+
+            row = _wait_for(key)
+            if row == 'timeout':
+                return jsonify({
+                    'success': False,
+                    'error': 'A request with this Idempotency-Key is still in progress'
+                }), 409
+            if row is not None:
+                return _replay(row)
+            # The first request failed and released the key: try to claim it
+
+        g.idempotency_key = key
+        g.idempotency_locked_at = locked_at
+        g.idempotency_stored = False
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            _release(key)
+            raise
+
+        if response.status_code >= 500 or not response.is_json:
+            # Nothing was committed for this key; let the client retry
+            _release(key)
+        elif not g.idempotency_stored:
+            # Client errors are final for this key; store them on their own
+            db = get_db_session()
+            try:
+                store_idempotent_response(db, response.get_json(), response.status_code)
+                db.commit()
+            except IdempotencyKeyLost:
+                # The retry that holds the key now records its own response
+                db.rollback()
+            finally:
+                db.close()
+        return response
+    return decorated_function
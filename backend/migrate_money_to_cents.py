@@ -0,0 +1,106 @@
+# migrate_money_to_cents.py
+# Convert money columns from floating-point dollars to integer cents
+# (products.price, orders.total_amount, order_items.price), then recreate
+# the sales rollups and rebuild them in cents. Safe to re-run: columns that
+# are already integers are skipped. Run it once after upgrading, with the
+# app stopped; until then init_db() refuses to start on the old database.
+import time
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+from database import Base, engine, init_db, get_db_session, unconverted_money_columns
+from models import SalesDaily, SalesHourly, ProductSales, CategorySales
+from sales_rollups import rebuild_sales_rollups
+from search_index import is_fts_enabled, rebuild_search_index
+
+ROLLUPS = (SalesDaily, SalesHourly, ProductSales, CategorySales)
+
+
+def rebuild_sqlite_table(conn, table_name, money_columns):
+    """SQLite cannot change a column type: copy into a new table, swap it in.
+
+    Indexes and the search triggers go with the old table; init_db()
+    recreates them afterwards.
+    """
+    # Copy every table so the new one's foreign keys resolve
+    scratch = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(scratch)
+    new_table = Base.metadata.tables[table_name].to_metadata(scratch, name=f'{table_name}_new')
+
+    existing = {c['name'] for c in inspect(conn).get_columns(table_name)}
+    names = [c.name for c in new_table.columns if c.name in existing]
+    values = [f'CAST(ROUND({name} * 100) AS INTEGER)' if name in money_columns else name for name in names]
+
+    conn.execute(CreateTable(new_table))
+    conn.execute(text(
+        f"INSERT INTO {table_name}_new ({', '.join(names)}) SELECT {', '.join(values)} FROM {table_name}"
+    ))
+    conn.execute(text(f"DROP TABLE {table_name}"))
+    conn.execute(text(f"ALTER TABLE {table_name}_new RENAME TO {table_name}"))
+
+
+def convert_money_columns():
+    """Convert whatever money columns are still floats; returns them as
+    'table.column' names.
+
+    A no-op on a database already in cents. After a conversion the rollup
+    tables are recreated empty.
+    """
+    rollups = {model.__tablename__ for model in ROLLUPS}
+    with engine.begin() as conn:
+        # Read inside the transaction that converts them
+        pending = unconverted_money_columns(conn)
+        converted = [f'{table_name}.{name}' for table_name, columns in pending.items() for name in columns]
+        if not converted:
+            return []
+
+        for table_name, columns in pending.items():
+            if table_name in rollups:
+                continue
+            if engine.dialect.name == 'sqlite':
+                rebuild_sqlite_table(conn, table_name, columns)
+            else:
+                for name in columns:
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} ALTER COLUMN {name} TYPE BIGINT "
+                        f"USING CAST(ROUND({name} * 100) AS BIGINT)"
+                    ))
+
+        # Rollups are derived data: recreate them with the new column type
+        for model in ROLLUPS:
+            model.__table__.drop(conn, checkfirst=True)
+
+    print(f"💱 Converted {', '.join(converted)} to integer cents")
+    return converted
+
+
+def migrate_money_to_cents():
+    start = time.perf_counter()
+    # Tables added since the database was created, so every money column can be inspected
+    Base.metadata.create_all(bind=engine)
+    converted = convert_money_columns()
+    if not converted:
+        print("✓ Money columns are already in cents")
+
+    # Recreate rollup tables, indexes and search triggers
+    init_db()
+    if converted and is_fts_enabled():
+        rebuild_search_index(engine)
+
+    db = get_db_session()
+    try:
+        rebuild_sales_rollups(db)
+        db.commit()
+        for model in ROLLUPS:
+            print(f"✓ {model.__tablename__}: {db.query(model).count()} rows rebuilt")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"\n✅ Money columns migrated in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    migrate_money_to_cents()
@@ -1,11 +1,13 @@
 # models.py - FIXED VERSION
 
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Index, Boolean
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
+from money import Money
 from discount_decorators import DiscountFactory, BasePriceCalculator
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
 import json
 
 class User(Base):
@@ -42,13 +44,21 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200), nullable=False)
     category = Column(String(50), nullable=False, index=True)
-    price = Column(Float, nullable=False)
+    price = Column(Money, nullable=False)  # integer cents in the DB, dollars in Python
     rating = Column(Float, default=0.0)
     reviews = Column(Integer, default=0)
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     image = Column(String(500), nullable=True)
     
+    # (sort column, id) indexes back keyset pagination on /api/products
+    __table_args__ = (
+        Index('ix_products_price_id', 'price', 'id'),
+        Index('ix_products_rating_id', 'rating', 'id'),
+        Index('ix_products_reviews_id', 'reviews', 'id'),
+        Index('ix_products_name_id', 'name', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -62,6 +72,31 @@ class Product(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class VersionCounter(Base):
+    __tablename__ = 'version_counters'
+    
+    # One row per counter ('cart', ...), bumped by version_counters.bump_version_counter()
+    # in the same transaction as the writes it counts
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class CartSessionVersion(Base):
+    __tablename__ = 'cart_session_versions'
+    
+    # The 'cart' counter value of each cart's last write; workers poll for
+    # versions past the last one they saw to drop those carts from their cache
+    session_id = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+
+class CatalogVersion(Base):
+    __tablename__ = 'catalog_version'
+    
+    # A single row, bumped in the same transaction as every product write so
+    # all workers agree on the catalog version (see catalog_cache)
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    modified_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # UTC
+
 class CartItem(Base):
     __tablename__ = 'cart_items'
     
@@ -74,6 +109,11 @@ class CartItem(Base):
     # Use simple relationship
     product = relationship('Product')
     
+    # One row per product per cart; add_to_cart upserts against this
+    __table_args__ = (
+        Index('uq_cart_items_session_product', 'session_id', 'product_id', unique=True),
+    )
+    
     def to_dict(self):
         """Convert cart item to dictionary"""
         return {
@@ -92,13 +132,21 @@ class Order(Base):
     order_number = Column(String(50), unique=True, nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     session_id = Column(String(100), nullable=False)
-    total_amount = Column(Float, nullable=False)
+    total_amount = Column(Money, nullable=False)
     status = Column(String(50), default='pending')
     shipping_info = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Simple relationship without back_populates
     items = relationship('OrderItem', backref='order_rel', lazy='dynamic')
+    # Loadable counterpart of `items` for eager loading (selectinload) in listings
+    line_items = relationship('OrderItem', viewonly=True, order_by='OrderItem.id')
+    
+    __table_args__ = (
+        Index('ix_orders_status_id', 'status', 'id'),
+        Index('ix_orders_user_id_id', 'user_id', 'id'),
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -110,7 +158,8 @@ class Order(Base):
             'status': self.status,
             'shipping_info': json.loads(self.shipping_info) if self.shipping_info else {},
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'item_count': self.items.count() if hasattr(self, 'items') else 0
+            # line_items rather than items.count() so listings can eager-load it
+            'item_count': len(self.line_items)
         }
 
 class OrderItem(Base):
@@ -120,13 +169,17 @@ class OrderItem(Base):
     order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
     quantity = Column(Integer, default=1)
-    price = Column(Float, nullable=False)
+    price = Column(Money, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Simple relationships
     product = relationship('Product')
     # order_rel is created by backref in Order model
     
+    __table_args__ = (
+        Index('ix_order_items_order_id', 'order_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -135,4 +188,106 @@ class OrderItem(Base):
             'quantity': self.quantity,
             'price': self.price,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+    
+    key = Column(String(255), primary_key=True)
+    path = Column(String(200), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default='in_progress')  # 'in_progress' or 'completed'
+    response_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    locked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class OrderWorkerLease(Base):
+    __tablename__ = 'order_worker_leases'
+    
+    # Snowflake order number worker ids held by running processes
+    worker_id = Column(Integer, primary_key=True, autoincrement=False)
+    holder = Column(String(120), nullable=False)  # host:pid:token
+    expires_at = Column(DateTime, nullable=False)  # UTC
+
+class Promotion(Base):
+    __tablename__ = 'promotions'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String(50), unique=True, nullable=True)  # None: listed promotion, no code needed
+    name = Column(String(100), nullable=False)
+    description = Column(String(255), nullable=True)
+    discount_type = Column(String(20), nullable=False)  # percentage / fixed / bulk / free_shipping
+    value = Column(Float, nullable=False, default=0)  # percent, or amount for 'fixed'
+    min_quantity = Column(Integer, nullable=True)  # bulk: total cart quantity needed
+    category = Column(String(50), nullable=True)  # scope: only this category
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=True)  # scope: only this product
+    starts_at = Column(DateTime, nullable=True)  # UTC; None = no start limit
+    ends_at = Column(DateTime, nullable=True)  # UTC, exclusive; None = never expires
+    usage_limit = Column(Integer, nullable=True)
+    usage_count = Column(Integer, nullable=False, default=0)
+    is_active = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Drives PromotionIndex's incremental reload: every write sets it from
+    # bump_version_counter(db, 'promotions') in its transaction, so versions
+    # follow commit order (a timestamp can commit after a later one)
+    version = Column(Integer, nullable=False, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'code': self.code,
+            'name': self.name,
+            'description': self.description,
+            'discount_type': self.discount_type,
+            'value': self.value,
+            'min_quantity': self.min_quantity,
+            'category': self.category,
+            'product_id': self.product_id,
+            'starts_at': self.starts_at.isoformat() if self.starts_at else None,
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
+            'usage_limit': self.usage_limit,
+            'usage_count': self.usage_count,
+            'is_active': self.is_active,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
+        }
+
+# ==================== SALES ROLLUPS ====================
+# Maintained by sales_rollups.record_order_sales() in the checkout transaction;
+# rebuild with backfill_sales_rollups.py. Buckets are UTC strings; revenue is
+# integer cents (Money).
+
+class SalesDaily(Base):
+    __tablename__ = 'sales_daily'
+    
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Money, nullable=False, default=0)
+    items_sold = Column(Integer, nullable=False, default=0)
+
+class SalesHourly(Base):
+    __tablename__ = 'sales_hourly'
+    
+    hour = Column(String(13), primary_key=True)  # YYYY-MM-DD HH
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Money, nullable=False, default=0)
+    items_sold = Column(Integer, nullable=False, default=0)
+
+class ProductSales(Base):
+    __tablename__ = 'product_sales'
+    
+    product_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Money, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('ix_product_sales_quantity', 'quantity'),
+    )
+
+class CategorySales(Base):
+    __tablename__ = 'category_sales'
+    
+    category = Column(String(50), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Money, nullable=False, default=0)
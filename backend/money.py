@@ -0,0 +1,77 @@
+# backend/money.py
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amount):
+    """Dollars (int, float, str or Decimal) -> integer cents, half-up.
+
+    Floats go through their shortest repr, so 19.99 is exactly 1999 cents
+    rather than whatever 19.99 * 100 happens to round to.
+    """
+    if amount is None:
+        return 0
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return int(Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents):
+    """Integer cents -> float dollars, for JSON and the ORM"""
+    # int(): PostgreSQL returns SUM(bigint) as a Decimal
+    return int(cents) / 100
+
+
+def rate_fraction(percentage):
+    """A percentage as an exact fraction of one: 12.5 -> (1, 8)"""
+    numerator, denominator = Decimal(repr(percentage) if isinstance(percentage, float)
+                                     else str(percentage)).as_integer_ratio()
+    return numerator, denominator * 100
+
+
+def percent_of_cents(cents, percentage):
+    """`percentage`% of `cents`, rounded half-up to a whole cent"""
+    numerator, denominator = rate_fraction(percentage)
+    return (2 * cents * numerator + denominator) // (2 * denominator)
+
+
+def prorate_cents(amounts, cents):
+    """Split `cents` over `amounts` in proportion to them, in whole cents.
+
+    Leftover cents go to the largest remainders (earlier lines on ties), the
+    shares add up to exactly min(cents, sum(amounts)) and none exceeds its
+    amount.
+    """
+    whole = sum(amounts)
+    cents = min(cents, whole)
+    if cents <= 0:
+        return [0] * len(amounts)
+    shares = [amount * cents // whole for amount in amounts]
+    leftover = cents - sum(shares)
+    by_remainder = sorted(range(len(amounts)), key=lambda i: (-(amounts[i] * cents % whole), i))
+    for i in by_remainder[:leftover]:
+        shares[i] += 1
+    return shares
+
+
+class Money(TypeDecorator):
+    """Money stored as integer cents.
+
+    Python values stay dollars (floats out, anything to_cents accepts in),
+    so filters, sorting and to_dict() are unchanged, while SUM() and the
+    rollup increments add integers. Note that Money * Integer in SQL comes
+    back untyped, i.e. as raw cents.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
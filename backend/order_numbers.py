@@ -0,0 +1,192 @@
+# backend/order_numbers.py
+import os
+import random
+import socket
+import string
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from database import get_db_session
+from models import OrderWorkerLease
+
+
+class OrderNumberGenerator(ABC):
+    """Strategy for producing order numbers"""
+    @abstractmethod
+    def next_order_number(self) -> str:
+        pass
+
+    def prepare(self):
+        """Set up anything that needs the database before the first order"""
+
+
+class RandomOrderNumberGenerator(OrderNumberGenerator):
+    """Original format: ORD-<local timestamp>-<6 random chars>.
+    Collisions are only caught by the unique constraint at commit."""
+    def next_order_number(self) -> str:
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        return f"ORD-{timestamp}-{random_str}"
+
+
+MAX_WORKER_ID = 9999
+
+
+class WorkerIdLease:
+    """A worker id held in the order_worker_leases table.
+
+    The process claims an expired id (or the next unused one) and renews it
+    once half the lease has passed, before issuing another number. No two
+    live processes hold the same id, whatever their host or pid; if a
+    renewal finds the lease was lost, a new id is claimed.
+    """
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.holder = f"{socket.gethostname()[:80]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.worker_id = None
+        self._renew_at = 0
+
+    def current(self):
+        if self.worker_id is None or time.monotonic() >= self._renew_at:
+            if self.worker_id is None or not self._renew():
+                self.worker_id = self._claim()
+            self._renew_at = time.monotonic() + self.ttl_seconds / 2
+        return self.worker_id
+
+    def _expires_at(self, now):
+        return now + timedelta(seconds=self.ttl_seconds)
+
+    def _renew(self):
+        db = get_db_session()
+        try:
+            result = db.execute(update(OrderWorkerLease).where(
+                OrderWorkerLease.worker_id == self.worker_id,
+                OrderWorkerLease.holder == self.holder
+            ).values(expires_at=self._expires_at(datetime.utcnow())))
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def _claim(self):
+        db = get_db_session()
+        try:
+            for _ in range(10):
+                now = datetime.utcnow()
+                expired = db.query(OrderWorkerLease.worker_id).filter(
+                    OrderWorkerLease.expires_at < now
+                ).order_by(OrderWorkerLease.worker_id).first()
+                try:
+                    if expired is not None:
+                        worker_id = expired[0]
+                        # Conditional, so two processes cannot take the same one
+                        claimed = db.execute(update(OrderWorkerLease).where(
+                            OrderWorkerLease.worker_id == worker_id,
+                            OrderWorkerLease.expires_at < now
+                        ).values(holder=self.holder, expires_at=self._expires_at(now))).rowcount == 1
+                    else:
+                        highest = db.query(func.max(OrderWorkerLease.worker_id)).scalar()
+                        worker_id = 0 if highest is None else highest + 1
+                        if worker_id > MAX_WORKER_ID:
+                            raise RuntimeError(f"All {MAX_WORKER_ID + 1} order worker ids are leased")
+                        db.add(OrderWorkerLease(worker_id=worker_id, holder=self.holder,
+                                                expires_at=self._expires_at(now)))
+                        db.flush()
+                        claimed = True
+                except IntegrityError:
+                    claimed = False
+                if claimed:
+                    db.commit()
+                    print(f"🔢 Leased order worker id {worker_id}")
+                    return worker_id
+                db.rollback()
+            raise RuntimeError("Could not lease an order worker id")
+        finally:
+            db.close()
+
+
+class SnowflakeOrderNumberGenerator(OrderNumberGenerator):
+    """Snowflake-style order numbers: time + worker id + per-process sequence.
+
+    ORD-<UTC yyyymmddHHMMSS>-<millis:3><worker:4><sequence:4>
+
+    Numbers are unique as long as every process has its own worker id:
+    ORDER_WORKER_ID when set, otherwise one leased from the database
+    (WorkerIdLease). Apart from the occasional lease renewal they need no
+    database round trip. Older random numbers used local time, so sort
+    listings by created_at or id, not by order_number.
+    """
+    MAX_WORKER_ID = MAX_WORKER_ID
+    MAX_SEQUENCE = 9999
+
+    def __init__(self, worker_id: int = None, lease_seconds: int = None):
+        if worker_id is not None and not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {self.MAX_WORKER_ID}")
+        # None: lease one, again after a fork
+        self._configured_worker_id = worker_id
+        self._lease_seconds = Config.ORDER_WORKER_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lease = None if self._configured_worker_id is not None else WorkerIdLease(self._lease_seconds)
+        self.worker_id = self._configured_worker_id
+        self._last_ms = -1
+        self._sequence = 0
+
+    def prepare(self):
+        """Lease the worker id now rather than during the first checkout"""
+        with self._lock:
+            if self._lease is not None and os.getpid() == self._pid:
+                self.worker_id = self._lease.current()
+
+    def _next_id(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked (e.g. a pre-loading WSGI server): get our own worker id
+                self._reset()
+            if self._lease is not None:
+                self.worker_id = self._lease.current()
+
+            now_ms = int(time.time() * 1000)
+            # Never go back in time if the wall clock is adjusted
+            now_ms = max(now_ms, self._last_ms)
+
+            if now_ms == self._last_ms:
+                self._sequence += 1
+                if self._sequence > self.MAX_SEQUENCE:
+                    # Sequence exhausted for this millisecond: move to the next one
+                    now_ms += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+
+            self._last_ms = now_ms
+            return now_ms, self.worker_id, self._sequence
+
+    def next_order_number(self) -> str:
+        now_ms, worker_id, sequence = self._next_id()
+        created = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+        return (f"ORD-{created.strftime('%Y%m%d%H%M%S')}-"
+                f"{now_ms % 1000:03d}{worker_id:04d}{sequence:04d}")
+
+
+def create_order_number_generator(kind=None):
+    kind = kind or Config.ORDER_NUMBER_GENERATOR
+    if kind == 'random':
+        return RandomOrderNumberGenerator()
+    if kind == 'snowflake':
+        worker_id = Config.ORDER_WORKER_ID
+        return SnowflakeOrderNumberGenerator(int(worker_id) if worker_id is not None else None)
+    raise ValueError(f"Unknown order number generator: {kind}")
+
+
+# Process-wide generator used by create_order
+order_number_generator = create_order_number_generator()
@@ -0,0 +1,102 @@
+# backend/pagination.py
+import base64
+import json
+import threading
+import time
+from sqlalchemy import and_, or_, tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(sort_by, sort_order, value, row_id):
+    """Opaque cursor for the (sort value, id) pair of the last row on a page"""
+    payload = json.dumps([sort_by, sort_order, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """Return (value, row_id) from a cursor made for the same sort"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+    if cursor_sort != sort_by or cursor_order != sort_order or not isinstance(row_id, int):
+        raise InvalidCursor('Cursor does not match the requested sort')
+    return value, row_id
+
+
+def apply_keyset(query, sort_column, id_column, sort_order, after=None, nullable=False):
+    """Order by (sort_column, id) and seek past the `after` (value, id) pair.
+
+    Uses row-value comparisons so SQLite can answer with a range scan on a
+    (sort_column, id) index instead of skipping OFFSET rows. NULL sort values
+    sort first ascending and last descending, matching SQLite's ordering.
+    """
+    descending = sort_order == 'desc'
+
+    if sort_column is id_column:
+        query = query.order_by(id_column.desc() if descending else id_column.asc())
+        if after is not None:
+            query = query.filter(id_column < after[1] if descending else id_column > after[1])
+        return query
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    if after is None:
+        return query
+
+    value, row_id = after
+    if value is None:
+        if descending:
+            condition = and_(sort_column.is_(None), id_column < row_id)
+        else:
+            condition = or_(and_(sort_column.is_(None), id_column > row_id), sort_column.isnot(None))
+    elif descending:
+        condition = tuple_(sort_column, id_column) < (value, row_id)
+        if nullable:
+            condition = or_(condition, sort_column.is_(None))
+    else:
+        condition = tuple_(sort_column, id_column) > (value, row_id)
+
+    return query.filter(condition)
+
+
+class TTLCache:
+    """Small TTL cache for computed results, such as COUNT(*) totals keyed by
+    a filter signature"""
+
+    def __init__(self, ttl_seconds=60, max_entries=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+
+        value = compute()
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (value, now + self.ttl_seconds)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the product listing endpoints; cleared on catalog writes
+product_count_cache = TTLCache()
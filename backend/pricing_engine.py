@@ -0,0 +1,198 @@
+# backend/pricing_engine.py
+from typing import List, Sequence
+from discount_decorators import (
+    PriceCalculator,
+    BasePriceCalculator,
+    DiscountDecorator,
+    PercentageDiscountDecorator,
+    FixedAmountDiscountDecorator,
+    CouponDiscountDecorator,
+    BulkDiscountDecorator,
+    DiscountFactory
+)
+from money import to_cents, from_cents, rate_fraction, prorate_cents
+
+try:
+    import numpy as np
+except ImportError:  # optional; PricingPlan falls back to a plain loop
+    np = None
+
+
+class UnsupportedCalculator(ValueError):
+    """Raised when a chain contains a calculator the engine cannot flatten"""
+
+
+class PricingPlan:
+    """A decorator chain flattened into its steps, innermost first.
+
+    Everything is in integer cents, exactly as the decorators compute it.
+    Steps are ('percentage', numerator, denominator), ('fixed', cents) and
+    ('bulk', min_quantity, numerator, denominator), where numerator /
+    denominator is the exact rate and each discount is rounded half-up to a
+    cent. A valid coupon is a percentage step, an invalid one is dropped.
+    Every step clamps at zero like the decorator it came from.
+
+    price_line_cents() and evaluate_cents() price each line on its own, like
+    the decorators; price_cart_cents() takes fixed amounts once per order.
+    """
+
+    def __init__(self, steps: List[tuple], description: str):
+        self.steps = steps
+        self.description = description
+
+    @staticmethod
+    def _apply_step(step: tuple, total: int, quantity: int) -> int:
+        kind = step[0]
+        if kind == 'percentage':
+            return max(0, total - (2 * total * step[1] + step[2]) // (2 * step[2]))
+        if kind == 'fixed':
+            return max(0, total - step[1])
+        if quantity >= step[1]:
+            return max(0, total - (2 * total * step[2] + step[3]) // (2 * step[3]))
+        return total
+
+    def price_line_cents(self, price_cents: int, quantity: int = 1) -> int:
+        total = price_cents * quantity
+        for step in self.steps:
+            total = self._apply_step(step, total, quantity)
+        return total
+
+    def price_line(self, price: float, quantity: int = 1) -> float:
+        """Same result as calculator.calculate_price(price, quantity)"""
+        return from_cents(self.price_line_cents(to_cents(price), quantity))
+
+    def evaluate_cents(self, price_cents: Sequence[int], quantities: Sequence[int]):
+        """Price every (price in cents, quantity) line at once.
+
+        Returns (final line totals, savings) in cents as int64 NumPy arrays,
+        or lists when NumPy is not installed.
+        """
+        if np is None:
+            finals = [self.price_line_cents(p, q) for p, q in zip(price_cents, quantities)]
+            return finals, [p * q - f for p, q, f in zip(price_cents, quantities, finals)]
+
+        quantities = np.asarray(quantities, dtype=np.int64)
+        base = np.asarray(price_cents, dtype=np.int64) * quantities
+        total = base
+        for step in self.steps:
+            kind = step[0]
+            if kind == 'percentage':
+                total = np.maximum(total - (2 * total * step[1] + step[2]) // (2 * step[2]), 0)
+            elif kind == 'fixed':
+                total = np.maximum(total - step[1], 0)
+            else:
+                discounted = np.maximum(total - (2 * total * step[2] + step[3]) // (2 * step[3]), 0)
+                total = np.where(quantities >= step[1], discounted, total)
+        return total, base - total
+
+    def price_cart_cents(self, price_cents: Sequence[int], quantities: Sequence[int]):
+        """Price the lines of one order -> (final line totals, savings) as lists of cents.
+
+        Same as evaluate_cents() except that a fixed step comes off the order
+        once, split over the lines by what each costs at that point, rather
+        than off every line.
+        """
+        if not any(step[0] == 'fixed' for step in self.steps):
+            finals, savings = self.evaluate_cents(price_cents, quantities)
+            return list(map(int, finals)), list(map(int, savings))
+
+        base = [p * q for p, q in zip(price_cents, quantities)]
+        totals = list(base)
+        for step in self.steps:
+            if step[0] == 'fixed':
+                shares = prorate_cents(totals, step[1])
+                totals = [total - share for total, share in zip(totals, shares)]
+            else:
+                totals = [self._apply_step(step, total, q) for total, q in zip(totals, quantities)]
+        return totals, [b - t for b, t in zip(base, totals)]
+
+    def evaluate(self, prices: Sequence[float], quantities: Sequence[int]):
+        """evaluate_cents() for prices in dollars (whole cents, e.g. from a
+        Money column); returns dollars"""
+        if np is None:
+            finals, savings = self.evaluate_cents([to_cents(p) for p in prices], quantities)
+            return [from_cents(f) for f in finals], [from_cents(v) for v in savings]
+
+        price_cents = np.rint(np.asarray(prices, dtype=np.float64) * 100).astype(np.int64)
+        finals, savings = self.evaluate_cents(price_cents, quantities)
+        return finals / 100, savings / 100
+
+
+def compile_pricing_plan(calculator: PriceCalculator) -> PricingPlan:
+    """Flatten a DiscountFactory chain into a PricingPlan"""
+    steps = []
+    node = calculator
+    while isinstance(node, DiscountDecorator):
+        node_type = type(node)
+        if node_type is PercentageDiscountDecorator:
+            steps.append(('percentage', *rate_fraction(node.percentage)))
+        elif node_type is FixedAmountDiscountDecorator:
+            steps.append(('fixed', to_cents(node.amount)))
+        elif node_type is CouponDiscountDecorator:
+            # Coupon validity does not depend on the line, so check it once
+            if node.validate_coupon():
+                steps.append(('percentage', *rate_fraction(node.discount_percentage)))
+        elif node_type is BulkDiscountDecorator:
+            steps.append(('bulk', node.min_quantity, *rate_fraction(node.discount_percentage)))
+        elif node_type is not DiscountDecorator:
+            raise UnsupportedCalculator(f'Cannot compile {node_type.__name__}')
+        node = node._calculator
+
+    if type(node) is not BasePriceCalculator:
+        raise UnsupportedCalculator(f'Cannot compile {type(node).__name__}')
+
+    steps.reverse()
+    return PricingPlan(steps, calculator.get_description())
+
+
+def cart_discount_chain(discounts: List[dict], total_quantity: int) -> List[dict]:
+    """Resolve bulk discounts against the whole cart's quantity.
+
+    A met bulk threshold becomes a plain percentage step and an unmet one is
+    dropped, so every line sees the same chain.
+    """
+    chain = []
+    for discount in discounts:
+        if discount.get('type') == 'bulk':
+            if total_quantity >= discount.get('min_quantity', 0):
+                chain.append({'type': 'percentage', 'percentage': discount.get('percentage', 0)})
+        else:
+            chain.append(discount)
+    return chain
+
+
+def price_cart(lines: List[dict], discounts: List[dict]) -> dict:
+    """Price every cart line through one compiled discount chain.
+
+    `lines` are dicts with product_id, price and quantity (extra keys are
+    passed through). Returns per-line results and order-level totals; a
+    fixed amount is taken once from the order and prorated over its lines.
+    """
+    total_quantity = sum(line['quantity'] for line in lines)
+    calculator = DiscountFactory.create_discount_calculator(cart_discount_chain(discounts, total_quantity))
+    plan = compile_pricing_plan(calculator)
+
+    price_cents = [to_cents(line['price']) for line in lines]
+    finals, _ = plan.price_cart_cents(price_cents, [line['quantity'] for line in lines])
+
+    priced = []
+    original_total = final_total = 0
+    for line, cents, final in zip(lines, price_cents, finals):
+        original = cents * line['quantity']
+        original_total += original
+        final_total += final
+        priced.append({
+            **line,
+            'original_price': from_cents(original),
+            'final_price': from_cents(final),
+            'savings': from_cents(original - final)
+        })
+
+    return {
+        'lines': priced,
+        'total_quantity': total_quantity,
+        'original_price': from_cents(original_total),
+        'final_price': from_cents(final_total),
+        'savings': from_cents(original_total - final_total),
+        'discount_description': plan.description
+    }
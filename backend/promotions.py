@@ -0,0 +1,256 @@
+# backend/promotions.py
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import update, or_, func
+from config import Config
+from database import get_db_session
+from models import Promotion
+from version_counters import ensure_version_counter, bump_version_counter
+
+# Seeded on first start so the codes that used to be hard-coded keep working
+DEFAULT_PROMOTIONS = [
+    {'code': 'WELCOME20', 'name': 'Welcome Coupon', 'discount_type': 'percentage', 'value': 20,
+     'description': '20% off your first purchase'},
+    {'code': 'SAVE10', 'name': 'Save $10', 'discount_type': 'fixed', 'value': 10,
+     'description': '$10 off your order'},
+    {'code': 'SUMMER25', 'name': 'Summer Coupon', 'discount_type': 'percentage', 'value': 25,
+     'description': '25% off summer items'},
+    {'code': 'WELCOME10', 'name': 'Welcome 10', 'discount_type': 'percentage', 'value': 10,
+     'description': '10% off your order'},
+    {'code': 'SAVE15', 'name': 'Save 15%', 'discount_type': 'percentage', 'value': 15,
+     'description': '15% off your order'},
+    {'code': 'FREESHIP', 'name': 'Free Shipping', 'discount_type': 'free_shipping', 'value': 0,
+     'description': 'Free shipping on your order'},
+    {'code': None, 'name': 'Summer Sale', 'discount_type': 'percentage', 'value': 15,
+     'description': '15% off on all summer items'},
+    {'code': None, 'name': 'First Purchase', 'discount_type': 'fixed', 'value': 10,
+     'description': '$10 off your first order'},
+    {'code': None, 'name': 'Bulk Discount', 'discount_type': 'bulk', 'value': 20, 'min_quantity': 3,
+     'description': 'Buy 3+ items and get 20% off'},
+    {'code': None, 'name': 'Welcome Discount', 'discount_type': 'percentage', 'value': 20,
+     'description': '20% off your first purchase'},
+]
+
+_FIELDS = ('id', 'code', 'name', 'description', 'discount_type', 'value', 'min_quantity', 'category',
+           'product_id', 'starts_at', 'ends_at', 'usage_limit', 'usage_count', 'is_active', 'updated_at', 'version')
+
+
+def normalize_code(code):
+    return (code or '').strip().upper() or None
+
+
+def promotion_entry(row):
+    """Plain dict copy of a Promotion row (datetimes kept as datetimes)"""
+    return {field: getattr(row, field) for field in _FIELDS}
+
+
+def unavailable_reason(entry, now):
+    """None if the promotion can be used at `now`, else why not"""
+    if not entry['is_active']:
+        return 'Invalid coupon code'
+    if entry['starts_at'] and now < entry['starts_at']:
+        return 'Coupon is not active yet'
+    if entry['ends_at'] and now >= entry['ends_at']:
+        return 'Coupon has expired'
+    if entry['usage_limit'] is not None and entry['usage_count'] >= entry['usage_limit']:
+        return 'Coupon usage limit reached'
+    return None
+
+
+def applies_to(entry, product):
+    """Whether a promotion's category/product scope covers `product` (a dict)"""
+    if entry['product_id'] is not None and product.get('id') != entry['product_id']:
+        return False
+    if entry['category'] and product.get('category') != entry['category']:
+        return False
+    return True
+
+
+def to_discount(entry):
+    """Discount dict for DiscountFactory / the discount endpoints"""
+    discount = {'type': entry['discount_type'], 'code': entry['code'],
+                'name': entry['name'], 'description': entry['description']}
+    if entry['discount_type'] == 'fixed':
+        discount['amount'] = entry['value']
+    elif entry['discount_type'] in ('percentage', 'bulk'):
+        discount['percentage'] = entry['value']
+    if entry['min_quantity']:
+        discount['min_quantity'] = entry['min_quantity']
+    if entry['category']:
+        discount['category'] = entry['category']
+    if entry['product_id'] is not None:
+        discount['product_id'] = entry['product_id']
+    return discount
+
+
+class PromotionIndex:
+    """In-memory promotions, indexed by code and by active time window.
+
+    Coupon lookups are dict hits and the active listing is cached until the
+    next start/end boundary, so neither touches SQL. Writes made through
+    this worker are applied with upsert(); rows changed elsewhere are picked
+    up by an incremental reload (version > last loaded) at most every
+    PROMOTIONS_REFRESH_SECONDS.
+    """
+
+    def __init__(self, refresh_seconds=None):
+        self.refresh_seconds = Config.PROMOTIONS_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._by_id = {}
+        self._by_code = {}
+        # Highest Promotion.version read by _refresh(); upsert() leaves it
+        # alone so rows other workers committed before ours are still loaded
+        self._last_version = None
+        self._checked_at = None
+        self._version = 0
+        # (version, valid until, listed promotions) for the current window
+        self._active = None
+        self._lock = threading.RLock()
+        self._stats = {'lookups': 0, 'full_loads': 0, 'incremental_loads': 0, 'rows_reloaded': 0}
+
+    def _apply(self, entry):
+        previous = self._by_id.get(entry['id'])
+        if previous == entry:
+            # Reloading a row this worker already applied with upsert()
+            return
+        if previous and previous['code']:
+            self._by_code.pop(previous['code'], None)
+        self._by_id[entry['id']] = entry
+        if entry['code']:
+            self._by_code[entry['code']] = entry
+        self._version += 1
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            db = get_db_session()
+            try:
+                query = db.query(Promotion)
+                if self._checked_at is not None and self._last_version is not None:
+                    query = query.filter(Promotion.version > self._last_version)
+                    self._stats['incremental_loads'] += 1
+                else:
+                    self._stats['full_loads'] += 1
+                rows = query.all()
+            finally:
+                db.close()
+            for row in rows:
+                entry = promotion_entry(row)
+                self._apply(entry)
+                if self._last_version is None or entry['version'] > self._last_version:
+                    self._last_version = entry['version']
+            self._stats['rows_reloaded'] += len(rows)
+            self._checked_at = now
+
+    def upsert(self, row):
+        """Apply a Promotion row this worker just committed"""
+        with self._lock:
+            self._apply(promotion_entry(row))
+
+    def note_redemption(self, code):
+        """Count a redemption this worker just committed"""
+        with self._lock:
+            entry = self._by_code.get(normalize_code(code))
+            if entry:
+                self._apply(dict(entry, usage_count=entry['usage_count'] + 1))
+
+    def lookup(self, code, now=None):
+        """(promotion entry, None) for a usable code, else (None, reason)"""
+        self._refresh()
+        self._stats['lookups'] += 1
+        entry = self._by_code.get(normalize_code(code))
+        if entry is None:
+            return None, 'Invalid coupon code'
+        reason = unavailable_reason(entry, now or datetime.utcnow())
+        return (None, reason) if reason else (entry, None)
+
+    def active(self, now=None):
+        """Listed (code-less) promotions usable at `now`"""
+        self._refresh()
+        now = now or datetime.utcnow()
+        cached = self._active
+        if cached and cached[0] == self._version and now < cached[1]:
+            return cached[2]
+
+        with self._lock:
+            version = self._version
+            listed = []
+            valid_until = datetime.max
+            for entry in self._by_id.values():
+                if entry['code'] or not entry['is_active']:
+                    continue
+                # The listing changes next when a window opens or closes
+                for boundary in (entry['starts_at'], entry['ends_at']):
+                    if boundary and now < boundary < valid_until:
+                        valid_until = boundary
+                if unavailable_reason(entry, now) is None:
+                    listed.append(entry)
+            listed.sort(key=lambda e: e['id'])
+            self._active = (version, valid_until, listed)
+            return listed
+
+    def invalidate(self):
+        """Force a full reload on next use"""
+        with self._lock:
+            self._by_id.clear()
+            self._by_code.clear()
+            self._last_version = None
+            self._checked_at = None
+            self._version += 1
+
+    def get_stats(self):
+        return {
+            'promotions': len(self._by_id),
+            'codes': len(self._by_code),
+            'refresh_seconds': self.refresh_seconds,
+            **self._stats
+        }
+
+
+def redeem_promotion(db, code, now=None):
+    """Count one use of `code` inside the caller's transaction.
+
+    A single conditional UPDATE, so concurrent checkouts cannot exceed the
+    usage limit; it also bumps the row's version for other workers' indexes.
+    Returns False if the code is unknown or no longer usable.
+    """
+    now = now or datetime.utcnow()
+    version = bump_version_counter(db, 'promotions')
+    result = db.execute(update(Promotion).where(
+        Promotion.code == normalize_code(code),
+        Promotion.is_active.is_(True),
+        or_(Promotion.starts_at.is_(None), Promotion.starts_at <= now),
+        or_(Promotion.ends_at.is_(None), Promotion.ends_at > now),
+        or_(Promotion.usage_limit.is_(None), Promotion.usage_count < Promotion.usage_limit)
+    ).values(usage_count=Promotion.usage_count + 1, updated_at=now, version=version))
+    return result.rowcount == 1
+
+
+def ensure_default_promotions():
+    """Seed DEFAULT_PROMOTIONS into an empty promotions table.
+
+    Also starts the 'promotions' version counter above the versions already
+    stored. The emptiness check runs under the counter's lock, so of several
+    workers starting at once only the first seeds.
+    """
+    db = get_db_session()
+    try:
+        ensure_version_counter(db, 'promotions', db.query(func.coalesce(func.max(Promotion.version), 0)).scalar())
+        version = bump_version_counter(db, 'promotions')
+        if db.query(Promotion.id).first() is None:
+            db.add_all([Promotion(version=version, **promotion) for promotion in DEFAULT_PROMOTIONS])
+            print(f"🏷️ Seeded {len(DEFAULT_PROMOTIONS)} default promotions")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# Global index used by the discount endpoints, decorators and CartSingleton
+promotion_index = PromotionIndex()
@@ -0,0 +1,49 @@
+# backend/query_counter.py
+from functools import wraps
+from flask import g, has_request_context
+from sqlalchemy import event
+from config import Config
+
+
+def install_query_counter(app, engine):
+    """Count SQL statements per request and report them in X-Query-Count"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+        return response
+
+
+def get_query_count():
+    return g.get('query_count', 0) if has_request_context() else 0
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view issued more SQL statements than its declared budget"""
+
+
+def query_budget(max_queries):
+    """Declare how many SQL statements a view may issue, whatever its input size.
+
+    Overruns are logged; with QUERY_BUDGET_STRICT they raise instead, which
+    is how tests catch N+1 regressions.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            before = get_query_count()
+            response = f(*args, **kwargs)
+            used = get_query_count() - before
+            if used > max_queries:
+                message = f"{f.__name__} used {used} queries (budget {max_queries})"
+                if Config.QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(message)
+                print(f"⚠️ Query budget exceeded: {message}")
+            return response
+        return decorated_function
+    return decorator
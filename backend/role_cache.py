@@ -0,0 +1,71 @@
+# backend/role_cache.py
+import threading
+import time
+from config import Config
+
+
+class RoleCache:
+    """Short-TTL, per-worker cache of user_id -> role for admin_required.
+
+    Invalidated on role changes and deletes in this worker; other workers
+    pick the change up once their entry expires, so revocation takes at
+    most ttl_seconds everywhere.
+    """
+
+    def __init__(self, ttl_seconds=None, max_entries=None):
+        self.ttl_seconds = Config.ADMIN_ROLE_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self.max_entries = Config.ADMIN_ROLE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._entries = {}  # user_id -> (role or None for a missing user, expires at)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so a lookup that raced it is not cached
+        self._generation = 0
+        self._counters = {'hits': 0, 'misses': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get_role(self, user_id, load_role):
+        """Role for `user_id`, calling load_role(user_id) on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[1] > now:
+                    self._counters['hits'] += 1
+                    return entry[0]
+                del self._entries[user_id]
+                self._counters['expirations'] += 1
+            self._counters['misses'] += 1
+            generation = self._generation
+
+        role = load_role(user_id)
+
+        if self.ttl_seconds > 0:
+            with self._lock:
+                if generation == self._generation:
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.clear()
+                    self._entries[user_id] = (role, time.monotonic() + self.ttl_seconds)
+        return role
+
+    def invalidate(self, user_id=None):
+        """Forget one user's role, or every cached role"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._generation += 1
+            self._counters['invalidations'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'cached_users': len(self._entries),
+                'ttl_seconds': self.ttl_seconds,
+                'max_entries': self.max_entries,
+                **self._counters,
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0
+            }
+
+
+# Global instance used by admin_required
+role_cache = RoleCache()
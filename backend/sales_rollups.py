@@ -0,0 +1,154 @@
+# backend/sales_rollups.py
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from database import get_db_session
+from models import Order, OrderItem, Product, SalesDaily, SalesHourly, ProductSales, CategorySales
+from money import to_cents, from_cents
+from version_counters import bump_version_counter
+
+DAY_FORMAT = '%Y-%m-%d'
+HOUR_FORMAT = '%Y-%m-%d %H'
+
+
+def day_bucket(moment):
+    return moment.strftime(DAY_FORMAT)
+
+
+def hour_bucket(moment):
+    return moment.strftime(HOUR_FORMAT)
+
+
+def _dialect(db):
+    return db.get_bind().dialect.name
+
+
+def _increment(db, model, key, rows):
+    """Add rows' counters onto existing rollup rows (INSERT ... ON CONFLICT DO UPDATE)"""
+    insert = postgresql_insert if _dialect(db) == 'postgresql' else sqlite_insert
+    statement = insert(model)
+    counters = [name for name in rows[0] if name != key]
+    statement = statement.on_conflict_do_update(
+        index_elements=[key],
+        set_={name: getattr(model, name) + statement.excluded[name] for name in counters}
+    )
+    db.execute(statement, rows)
+
+
+def record_order_sales(db, created_at, total, lines, categories):
+    """Add one order to the rollups, inside the caller's checkout transaction.
+
+    `total` is the order total in cents, `lines` are the order item rows
+    ({product_id, quantity, price}) and `categories` maps product_id ->
+    category. Four statements whatever the number of lines.
+    """
+    items_sold = sum(line['quantity'] for line in lines)
+    # Revenue is added up in cents; from_cents() only feeds the Money binds
+    totals = {'order_count': 1, 'revenue': from_cents(total), 'items_sold': items_sold}
+    _increment(db, SalesDaily, 'day', [dict(totals, day=day_bucket(created_at))])
+    _increment(db, SalesHourly, 'hour', [dict(totals, hour=hour_bucket(created_at))])
+
+    # A discounted line can be two rows; one upsert row per product
+    by_product = {}
+    for line in lines:
+        quantity, revenue = by_product.get(line['product_id'], (0, 0))
+        by_product[line['product_id']] = (quantity + line['quantity'], revenue + to_cents(line['price']) * line['quantity'])
+    _increment(db, ProductSales, 'product_id', [{
+        'product_id': product_id,
+        'quantity': quantity,
+        'revenue': from_cents(revenue)
+    } for product_id, (quantity, revenue) in by_product.items()])
+
+    by_category = {}
+    for line in lines:
+        category = categories[line['product_id']]
+        quantity, revenue = by_category.get(category, (0, 0))
+        by_category[category] = (quantity + line['quantity'], revenue + to_cents(line['price']) * line['quantity'])
+    _increment(db, CategorySales, 'category', [{
+        'category': category,
+        'quantity': quantity,
+        'revenue': from_cents(revenue)
+    } for category, (quantity, revenue) in by_category.items()])
+
+
+def _bucket_sql(db, column, python_format):
+    """SQL expression formatting `column` the same way as day_bucket/hour_bucket"""
+    if _dialect(db) == 'postgresql':
+        return func.to_char(column, python_format.replace('%Y', 'YYYY').replace('%m', 'MM')
+                            .replace('%d', 'DD').replace('%H', 'HH24'))
+    return func.strftime(python_format, column)
+
+
+def _lock_rollups(db):
+    """Hold the rollups until the caller commits.
+
+    The counter row serialises rebuilds. On PostgreSQL the table lock also
+    waits for checkouts already adding to the rollups and holds off new ones,
+    so every order is counted by the rebuild or by its own checkout, never
+    both; SQLite's single writer gives the same once the counter is taken.
+    """
+    bump_version_counter(db, 'sales_rollups')
+    if _dialect(db) == 'postgresql':
+        tables = ', '.join(model.__tablename__ for model in (SalesDaily, SalesHourly, ProductSales, CategorySales))
+        db.execute(text(f'LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE'))
+
+
+def rebuild_sales_rollups(db):
+    """Recompute every rollup from orders/order_items (backfill); caller commits"""
+    _lock_rollups(db)
+    _rebuild(db)
+
+
+def _rebuild(db):
+    for model in (SalesDaily, SalesHourly, ProductSales, CategorySales):
+        db.execute(delete(model))
+
+    items_sold = select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(
+        OrderItem.order_id == Order.id
+    ).correlate(Order).scalar_subquery()
+
+    for model, key, python_format in ((SalesDaily, 'day', DAY_FORMAT),
+                                      (SalesHourly, 'hour', HOUR_FORMAT)):
+        bucket = _bucket_sql(db, Order.created_at, python_format)
+        db.execute(model.__table__.insert().from_select(
+            [key, 'order_count', 'revenue', 'items_sold'],
+            select(bucket, func.count(Order.id), func.sum(Order.total_amount), func.sum(items_sold))
+            .where(Order.created_at.isnot(None))
+            .group_by(bucket)
+        ))
+
+    line_revenue = func.sum(OrderItem.price * OrderItem.quantity)
+    db.execute(ProductSales.__table__.insert().from_select(
+        ['product_id', 'quantity', 'revenue'],
+        select(OrderItem.product_id, func.sum(OrderItem.quantity), line_revenue)
+        .group_by(OrderItem.product_id)
+    ))
+    # Categories as they are now; live checkouts record the category at sale time
+    db.execute(CategorySales.__table__.insert().from_select(
+        ['category', 'quantity', 'revenue'],
+        select(Product.category, func.sum(OrderItem.quantity), line_revenue)
+        .join(Product, Product.id == OrderItem.product_id)
+        .group_by(Product.category)
+    ))
+
+
+def ensure_sales_rollups():
+    """Backfill the rollups on the first start after upgrading.
+
+    Analytics read only the rollups, so empty ones next to existing orders
+    would report zero revenue until backfill_sales_rollups.py was run. The
+    check runs under the rollup lock, so of several workers starting at
+    once only the first rebuilds.
+    """
+    db = get_db_session()
+    try:
+        _lock_rollups(db)
+        if db.query(SalesDaily.day).first() is None and db.query(Order.id).first() is not None:
+            print("📈 Sales rollups are empty: rebuilding them from existing orders...")
+            _rebuild(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,109 @@
+# backend/search_index.py
+import re
+from sqlalchemy import text, table, column, literal_column
+
+# FTS5 virtual table mirroring products.name / products.description.
+# It is an external-content table, so the text itself is stored only once
+# (in products) and the triggers below keep the inverted index in sync.
+FTS_TABLE = 'products_fts'
+
+products_fts = table(FTS_TABLE, column('rowid'))
+
+_fts_enabled = False
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+
+def init_search_index(engine):
+    """Create the FTS5 index and its sync triggers (SQLite only)"""
+    global _fts_enabled
+
+    if engine.dialect.name != 'sqlite':
+        _fts_enabled = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"
+            ), {'name': FTS_TABLE}).first()
+
+            for statement in _SCHEMA:
+                conn.execute(text(statement))
+
+            # First run against an existing catalog: index what is already there
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                print(f"🔎 Built full-text index {FTS_TABLE}")
+
+        _fts_enabled = True
+    except Exception as e:
+        # SQLite builds without FTS5 fall back to the LIKE search
+        print(f"⚠️ Full-text search unavailable, using LIKE search: {e}")
+        _fts_enabled = False
+
+    return _fts_enabled
+
+
+def rebuild_search_index(engine):
+    """Rebuild the whole index from the products table"""
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def is_fts_enabled():
+    return _fts_enabled
+
+
+def build_match_query(search):
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    Words are quoted so user input can never inject FTS5 operators.
+    Returns None when the input has no searchable words.
+    """
+    terms = re.findall(r'\w+', search or '', flags=re.UNICODE)
+    if not terms:
+        return None
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def apply_search(query, model, search):
+    """Restrict a Product query to rows matching `search`.
+
+    Uses the FTS5 index when available and returns (query, rank_column);
+    rank_column is the bm25 score (lower is better) or None on the
+    LIKE fallback.
+    """
+    match = build_match_query(search) if _fts_enabled else None
+
+    if match is None:
+        search_term = f"%{search}%"
+        return query.filter(
+            model.name.ilike(search_term) | model.description.ilike(search_term)
+        ), None
+
+    rank = literal_column(f"bm25({FTS_TABLE})")
+    query = query.join(products_fts, products_fts.c.rowid == model.id)\
+                 .filter(text(f"{FTS_TABLE} MATCH :fts_match"))\
+                 .params(fts_match=match)
+    return query, rank
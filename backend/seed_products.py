@@ -4,6 +4,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from models import Product
 from app import app
 from database import SessionLocal
+from catalog_cache import bump_catalog_version
 from factories import ProductFactoryManager, ProductBuilder
 import json
 
@@ -582,6 +583,9 @@ def seed_products():
                 else:
                     print(f"⏭️ Skipped (already exists): {product_data['name']}")
             
+            if added_count:
+                # So every running worker rebuilds its catalog snapshot
+                bump_catalog_version(db)
             db.commit()
             print(f"\n✅ Successfully added {added_count} new products")
             print(f"⏭️ Skipped {len(products_data) - added_count} existing products")
@@ -0,0 +1,49 @@
+# backend/tests/conftest.py
+# The app reads its settings at import, so point it at a scratch database
+# (and make query budgets raise) before anything imports it.
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_shopease.db')}"
+os.environ['QUERY_BUDGET_STRICT'] = 'true'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    from database import get_db_session
+    session = get_db_session()
+    yield session
+    session.rollback()
+    session.close()
+
+
+@pytest.fixture
+def products(db):
+    """Fifty products to fill carts and orders with"""
+    from catalog_cache import bump_catalog_version, catalog_cache
+    from models import Product
+    rows = [Product(name=f'Test product {i}', category='electronics', price=10 + i,
+                    description='test product') for i in range(50)]
+    db.add_all(rows)
+    bump_catalog_version(db)
+    db.commit()
+    catalog_cache.invalidate()
+    return rows
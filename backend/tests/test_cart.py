@@ -0,0 +1,88 @@
+# backend/tests/test_cart.py
+from sqlalchemy import create_engine, inspect, text
+
+from database import Base
+from dedupe_cart_items import merge_duplicate_cart_items
+
+
+def test_add_to_cart_rejects_non_numeric_product_id(client):
+    response = client.post('/api/cart', json={'session_id': 'cart-bad-id', 'product_id': 'abc'})
+    assert response.status_code == 404
+    assert response.get_json()['success'] is False
+
+
+def test_add_to_cart_merges_repeat_adds(client, products):
+    product_id = products[0].id
+    for _ in range(3):
+        response = client.post('/api/cart', json={'session_id': 'cart-repeat', 'product_id': product_id,
+                                                  'quantity': 2})
+        assert response.status_code == 200
+    items = client.get('/api/cart', query_string={'session_id': 'cart-repeat'}).get_json()['items']
+    assert [(item['product_id'], item['quantity']) for item in items] == [(product_id, 6)]
+
+
+def test_add_to_cart_checks_the_product_in_the_database(client, db, products):
+    from catalog_cache import catalog_cache
+    from models import Product
+    product_id = products[-1].id
+    assert product_id in catalog_cache.get_snapshot().by_id
+
+    # Deleted by another worker: this one's snapshot still lists it
+    db.query(Product).filter(Product.id == product_id).delete()
+    db.commit()
+    response = client.post('/api/cart', json={'session_id': 'cart-deleted', 'product_id': product_id})
+    assert response.status_code == 404
+    response = client.patch('/api/cart/batch', json={'session_id': 'cart-deleted', 'operations': [
+        {'product_id': product_id, 'quantity': 1}, {'product_id': products[0].id, 'quantity': 1}]})
+    assert response.get_json()['not_found']['product_ids'] == [product_id]
+    assert [item['product_id'] for item in response.get_json()['items']] == [products[0].id]
+
+
+def test_duplicate_cart_lines_are_merged_before_the_unique_index():
+    engine = create_engine('sqlite://')
+    cart_items = Base.metadata.tables['cart_items']
+    with engine.begin() as conn:
+        # An old database: the table without its unique index
+        conn.execute(text("CREATE TABLE cart_items (id INTEGER PRIMARY KEY, session_id VARCHAR(100), "
+                          "product_id INTEGER, quantity INTEGER, created_at DATETIME)"))
+        conn.execute(text("INSERT INTO cart_items (session_id, product_id, quantity) VALUES "
+                          "('a', 1, 1), ('a', 1, 2), ('a', 2, 1), ('b', 1, 4), ('a', 1, 3)"))
+        assert merge_duplicate_cart_items(conn) == 2
+        for index in cart_items.indexes:
+            index.create(bind=conn)
+        rows = conn.execute(text("SELECT session_id, product_id, quantity FROM cart_items ORDER BY id")).all()
+    assert rows == [('a', 1, 6), ('a', 2, 1), ('b', 1, 4)]
+    assert 'uq_cart_items_session_product' in {i['name'] for i in inspect(engine).get_indexes('cart_items')}
+
+
+def test_cached_cart_is_served_without_sql_and_sees_other_workers_writes(client, db, products, monkeypatch):
+    from cart_singleton import bump_cart_version, cart_manager
+    from catalog_cache import catalog_cache
+    from models import CartItem
+    monkeypatch.setattr(catalog_cache, 'poll_seconds', 3600)
+    monkeypatch.setattr(cart_manager, 'poll_seconds', 3600)
+    product_id = products[0].id
+    client.post('/api/cart', json={'session_id': 'cart-shared', 'product_id': product_id})
+    client.get('/api/cart', query_string={'session_id': 'cart-shared'})
+    response = client.get('/api/cart', query_string={'session_id': 'cart-shared'})
+    assert response.get_json()['items'][0]['quantity'] == 1
+    assert response.headers['X-Query-Count'] == '0'
+
+    # Another worker's write: recorded in the database, this cache not cleared
+    db.query(CartItem).filter(CartItem.session_id == 'cart-shared').update({CartItem.quantity: 5})
+    bump_cart_version(db, 'cart-shared')
+    db.commit()
+    monkeypatch.setattr(cart_manager, 'poll_seconds', 0)
+    items = client.get('/api/cart', query_string={'session_id': 'cart-shared'}).get_json()['items']
+    assert items[0]['quantity'] == 5
+
+
+def test_batch_rejects_malformed_ids(client, products):
+    for op in ({'item_id': 'x', 'quantity': 1}, {'product_id': [1], 'quantity': 1}, {'quantity': 1}):
+        response = client.patch('/api/cart/batch', json={'session_id': 'cart-batch', 'operations': [op]})
+        assert response.status_code == 400, op
+
+    response = client.patch('/api/cart/batch', json={'session_id': 'cart-batch', 'operations': [
+        {'product_id': str(products[0].id), 'quantity': 2}]})
+    assert response.status_code == 200
+    assert [item['quantity'] for item in response.get_json()['items']] == [2]
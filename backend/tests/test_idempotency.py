@@ -0,0 +1,36 @@
+# backend/tests/test_idempotency.py
+from datetime import datetime
+
+import app as app_module
+from database import get_db_session
+from models import IdempotencyKey, Order
+
+
+def test_stalled_owner_cannot_complete_a_key_a_retry_took_over(client, db, products, monkeypatch):
+    session_id = 'idempotency-takeover'
+    client.post('/api/cart', json={'session_id': session_id, 'product_id': products[0].id, 'quantity': 1})
+    taken_over_at = datetime(2030, 1, 1)
+    checkout_cart = app_module.checkout_cart
+
+    def stall_then_lose_the_key(*args, **kwargs):
+        # A retry takes the stale claim over while this request is still working
+        other = get_db_session()
+        try:
+            other.query(IdempotencyKey).filter(IdempotencyKey.key == 'takeover-1').update(
+                {IdempotencyKey.locked_at: taken_over_at})
+            other.commit()
+        finally:
+            other.close()
+        return checkout_cart(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'checkout_cart', stall_then_lose_the_key)
+    response = client.post('/api/orders', json={'session_id': session_id},
+                           headers={'Idempotency-Key': 'takeover-1'})
+    assert response.status_code == 409
+
+    db.expire_all()
+    assert db.query(Order).filter(Order.session_id == session_id).count() == 0
+    row = db.query(IdempotencyKey).filter(IdempotencyKey.key == 'takeover-1').one()
+    # Still the retry's to complete
+    assert row.status == 'in_progress'
+    assert row.locked_at == taken_over_at
@@ -0,0 +1,44 @@
+# backend/tests/test_money.py
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+
+def _run(path, code):
+    # A fresh process: the app binds its engine to DATABASE_URL at import
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    return subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True)
+
+
+def test_float_dollar_database_is_refused_until_migrated(tmp_path):
+    path = tmp_path / 'dollars.db'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE products (id INTEGER NOT NULL, name VARCHAR(200) NOT NULL, '
+                 'category VARCHAR(50) NOT NULL, price FLOAT NOT NULL, rating FLOAT, reviews INTEGER, '
+                 'description TEXT, created_at DATETIME, image VARCHAR(500), PRIMARY KEY (id))')
+    conn.execute("INSERT INTO products (id, name, category, price) VALUES (1, 'Laptop', 'electronics', 1299.99)")
+    conn.commit()
+    conn.close()
+
+    start = "import models; from database import init_db, get_db_session; from models import Product; init_db(); "
+    refused = _run(path, start)
+    assert refused.returncode != 0
+    assert 'products.price' in refused.stderr and 'migrate_money_to_cents.py' in refused.stderr
+
+    conn = sqlite3.connect(path)
+    # Nothing was rewritten at startup
+    assert conn.execute('SELECT price, typeof(price) FROM products').fetchone() == (1299.99, 'real')
+    conn.close()
+
+    _run(path, 'from migrate_money_to_cents import migrate_money_to_cents; migrate_money_to_cents()').check_returncode()
+    started = _run(path, start + 'print(get_db_session().get(Product, 1).price)')
+    started.check_returncode()
+    assert started.stdout.strip().splitlines()[-1] == '1299.99'
+
+    conn = sqlite3.connect(path)
+    assert conn.execute('SELECT price, typeof(price) FROM products').fetchone() == (129999, 'integer')
+    conn.close()
@@ -0,0 +1,38 @@
+# backend/tests/test_order_numbers.py
+from datetime import datetime, timedelta
+
+from models import OrderWorkerLease
+from order_numbers import SnowflakeOrderNumberGenerator
+
+
+def test_processes_with_the_same_pid_lease_different_worker_ids():
+    # Two containers whose app runs as pid 1 look identical to os.getpid()
+    first, second = SnowflakeOrderNumberGenerator(), SnowflakeOrderNumberGenerator()
+    numbers = {first.next_order_number(), second.next_order_number()}
+    assert first.worker_id != second.worker_id
+    assert len(numbers) == 2
+
+
+def test_configured_worker_id_skips_the_lease():
+    generator = SnowflakeOrderNumberGenerator(worker_id=42)
+    assert generator.next_order_number().endswith('00420000')
+    assert generator._lease is None
+
+
+def test_expired_lease_is_reused_and_a_lost_lease_is_replaced(db):
+    generator = SnowflakeOrderNumberGenerator(lease_seconds=60)
+    generator.next_order_number()
+    worker_id = generator.worker_id
+
+    # The process stalled past its lease: another one may take the id
+    db.query(OrderWorkerLease).filter(OrderWorkerLease.worker_id == worker_id).update(
+        {OrderWorkerLease.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    other = SnowflakeOrderNumberGenerator(lease_seconds=60)
+    other.next_order_number()
+    assert other.worker_id == worker_id
+
+    # The next renewal finds the lease gone and claims another id
+    generator._lease._renew_at = 0
+    generator.next_order_number()
+    assert generator.worker_id != worker_id
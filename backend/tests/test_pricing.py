@@ -0,0 +1,35 @@
+# backend/tests/test_pricing.py
+from money import prorate_cents
+
+
+def test_fixed_discount_comes_off_the_order_once(client, products):
+    items = [{'product_id': product.id, 'quantity': 1} for product in products[:3]]
+    result = client.post('/api/discounts/apply', json={
+        'items': items, 'discounts': [{'type': 'fixed', 'amount': 10}]}).get_json()
+    assert result['savings'] == 10.0
+    assert round(sum(line['savings'] for line in result['lines']), 2) == 10.0
+
+
+def test_prorated_cents_add_up_and_never_exceed_a_line():
+    assert prorate_cents([100, 200, 300], 100) == [17, 33, 50]
+    assert prorate_cents([1, 1, 1], 2) == [1, 1, 0]
+    assert prorate_cents([150, 50], 1000) == [150, 50]
+
+
+def test_optimizer_prices_fixed_amounts_once_and_one_per_group():
+    from discount_optimizer import optimize_discounts
+    lines = [{'product_id': i, 'price': price, 'quantity': 1} for i, price in enumerate((10, 11, 12))]
+    result = optimize_discounts(lines, [
+        {'type': 'fixed', 'amount': 10},
+        {'type': 'percentage', 'percentage': 10, 'exclusive_group': 'seasonal'},
+        {'type': 'percentage', 'percentage': 20, 'exclusive_group': 'seasonal'},
+    ])
+    assert result['final_price'] == 16.4
+    assert [d['type'] for d in result['discounts']] == ['percentage', 'fixed']
+    assert result['discounts'][0]['percentage'] == 20
+    # One percentage per group: no order of percentages to round differently
+    assert result['optimal'] == 'exact'
+
+    result = optimize_discounts(lines, [{'type': 'percentage', 'percentage': 10},
+                                        {'type': 'percentage', 'percentage': 15}])
+    assert result['optimal'] == 'up_to_step_rounding'
@@ -0,0 +1,73 @@
+# backend/tests/test_promotions.py
+from datetime import datetime, timedelta
+
+from models import Order, OrderItem, Promotion
+from money import to_cents
+from promotions import PromotionIndex, promotion_index, ensure_default_promotions
+from version_counters import bump_version_counter
+
+
+def _order(client, session_id, product_id, coupon_code):
+    client.post('/api/cart', json={'session_id': session_id, 'product_id': product_id, 'quantity': 2})
+    return client.post('/api/orders', json={'session_id': session_id, 'coupon_code': coupon_code})
+
+
+def test_checkout_redeems_coupon_up_to_its_usage_limit(client, db, products):
+    db.add(Promotion(code='ONCE10', name='Once', discount_type='percentage', value=10, usage_limit=1,
+                     version=bump_version_counter(db, 'promotions')))
+    db.commit()
+    promotion_index.invalidate()
+    product = products[0]
+
+    first = _order(client, 'coupon-first', product.id, 'once10')
+    assert first.status_code == 201
+    assert first.get_json()['order']['total_amount'] == round(product.price * 2 * 0.9, 2)
+
+    second = _order(client, 'coupon-second', product.id, 'ONCE10')
+    assert second.status_code == 400
+    assert second.get_json()['success'] is False
+    # The rejected order left its cart alone
+    cart = client.get('/api/cart', query_string={'session_id': 'coupon-second'}).get_json()
+    assert len(cart['items']) == 1
+
+    db.expire_all()
+    assert db.query(Promotion.usage_count).filter(Promotion.code == 'ONCE10').scalar() == 1
+
+
+def test_incremental_reload_sees_a_row_committed_with_an_earlier_timestamp(db):
+    index = PromotionIndex(refresh_seconds=0)
+    index.lookup('WELCOME20')
+
+    # Stamped before everything already loaded, as a slow transaction would be
+    db.add(Promotion(code='LATE5', name='Late', discount_type='percentage', value=5,
+                     updated_at=datetime.utcnow() - timedelta(hours=1),
+                     version=bump_version_counter(db, 'promotions')))
+    db.commit()
+
+    promotion, reason = index.lookup('LATE5')
+    assert reason is None
+    assert promotion['code'] == 'LATE5'
+    assert index.get_stats()['incremental_loads'] >= 1
+
+
+def test_order_items_carry_the_coupon_discount(client, db, products):
+    product = products[1]  # $11
+    client.post('/api/cart', json={'session_id': 'coupon-lines', 'product_id': product.id, 'quantity': 3})
+    response = client.post('/api/orders', json={'session_id': 'coupon-lines', 'coupon_code': 'SAVE10'})
+    assert response.status_code == 201
+    order_id = response.get_json()['order']['id']
+
+    db.expire_all()
+    total = db.query(Order.total_amount).filter(Order.id == order_id).scalar()
+    items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+    # $33 - $10 over three units: $7.67 twice and $7.66 once
+    assert to_cents(total) == 2300
+    assert sum(to_cents(item.price) * item.quantity for item in items) == 2300
+    assert sorted((item.quantity, to_cents(item.price)) for item in items) == [(1, 766), (2, 767)]
+
+
+def test_default_promotions_are_seeded_once(db):
+    count = db.query(Promotion).count()
+    ensure_default_promotions()
+    ensure_default_promotions()
+    assert db.query(Promotion).count() == count
@@ -0,0 +1,39 @@
+# backend/tests/test_query_budget.py
+import pytest
+
+from models import CartItem
+from query_counter import QueryBudgetExceeded, query_budget
+
+
+def load_cart_queries(client, db, session_id, products, size):
+    db.add_all([CartItem(session_id=session_id, product_id=p.id, quantity=2) for p in products[:size]])
+    db.commit()
+    response = client.get('/api/cart', query_string={'session_id': session_id})
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == size
+    return int(response.headers['X-Query-Count'])
+
+
+def test_cart_load_query_count_does_not_grow_with_items(client, db, products, monkeypatch):
+    from cart_singleton import cart_manager
+    from catalog_cache import catalog_cache
+    # The first request also reads the catalog and cart versions; no re-poll after it
+    monkeypatch.setattr(catalog_cache, 'poll_seconds', 3600)
+    monkeypatch.setattr(cart_manager, 'poll_seconds', 3600)
+    client.get('/api/cart', query_string={'session_id': 'budget-cart-warmup'})
+    counts = {size: load_cart_queries(client, db, f'budget-cart-{size}', products, size)
+              for size in (1, 10, 50)}
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_strict_budget_raises_on_overrun(db, products):
+    from models import Product
+
+    @query_budget(1)
+    def one_query_per_product():
+        return [db.get(Product, p.id, populate_existing=True).name for p in products[:3]]
+
+    from app import app
+    with app.test_request_context():
+        with pytest.raises(QueryBudgetExceeded):
+            one_query_per_product()
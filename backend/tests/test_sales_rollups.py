@@ -0,0 +1,26 @@
+# backend/tests/test_sales_rollups.py
+from datetime import datetime
+
+from models import Order, OrderItem, SalesDaily, SalesHourly, ProductSales, CategorySales
+from money import to_cents
+from sales_rollups import ensure_sales_rollups
+
+
+def test_empty_rollups_are_backfilled_from_existing_orders(db, products):
+    # Orders written before the rollup tables existed
+    for model in (SalesDaily, SalesHourly, ProductSales, CategorySales):
+        db.query(model).delete()
+    # On a day of its own, so no other test's orders add to it
+    order = Order(order_number='ORD-ROLLUP-1', session_id='rollups', total_amount=21.5,
+                  status='confirmed', created_at=datetime(2001, 2, 3, 4, 5))
+    db.add(order)
+    db.flush()
+    db.add(OrderItem(order_id=order.id, product_id=products[0].id, quantity=2, price=10.75))
+    db.commit()
+
+    ensure_sales_rollups()
+
+    day = db.query(SalesDaily).filter(SalesDaily.day == order.created_at.strftime('%Y-%m-%d')).one()
+    assert to_cents(day.revenue) == 2150
+    assert day.order_count == 1 and day.items_sold == 2
+    assert db.query(ProductSales).filter(ProductSales.product_id == products[0].id).one().quantity == 2
@@ -0,0 +1,181 @@
+# backend/timeseries.py
+from datetime import datetime, timedelta
+from sqlalchemy import type_coerce, BigInteger
+from models import SalesDaily, SalesHourly
+from sales_rollups import DAY_FORMAT, HOUR_FORMAT
+from money import from_cents
+
+try:
+    import numpy as np
+except ImportError:  # optional; pure-Python fallbacks below
+    np = None
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+# Hourly buckets for ~5 years; keeps a single response bounded
+MAX_BUCKETS = 50000
+
+LABEL_FORMATS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',  # the Monday starting the week
+    'month': '%Y-%m'
+}
+
+
+class InvalidSeries(ValueError):
+    """Raised for an unknown granularity or an oversized range"""
+
+
+def bucket_start(moment, granularity):
+    """Start of the hour/day/week (Monday)/month containing `moment`"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_bucket(start, granularity):
+    if granularity == 'hour':
+        return start + timedelta(hours=1)
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(weeks=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def bucket_starts(start, end, granularity):
+    """Every bucket from the one containing `start` to the one containing `end`"""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise InvalidSeries(f'Range too large for {granularity} buckets (max {MAX_BUCKETS})')
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def load_rollup_rows(db, start, end, granularity):
+    """(bucket datetime, order_count, revenue in cents) rollup rows between start and end.
+
+    Hourly series read sales_hourly; everything else reads sales_daily.
+    """
+    if granularity == 'hour':
+        key, model, key_format = SalesHourly.hour, SalesHourly, HOUR_FORMAT
+    else:
+        key, model, key_format = SalesDaily.day, SalesDaily, DAY_FORMAT
+    rows = db.query(key, model.order_count, type_coerce(model.revenue, BigInteger)).filter(
+        key.between(start.strftime(key_format), end.strftime(key_format))
+    ).all()
+    return [(datetime.strptime(row[0], key_format), row[1], row[2]) for row in rows]
+
+
+def fill_series(rows, buckets, granularity):
+    """Sum rows into their buckets by dict lookup; empty buckets stay zero.
+    Revenue is summed in integer cents."""
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    orders = [0] * len(buckets)
+    revenue = [0] * len(buckets)
+    for moment, order_count, cents in rows:
+        i = index.get(bucket_start(moment, granularity))
+        if i is not None:
+            orders[i] += order_count or 0
+            revenue[i] += int(cents or 0)
+    return orders, revenue
+
+
+def moving_average(values, window):
+    """Trailing mean over `window` buckets; None until the window is full"""
+    if window <= 1:
+        return [float(v) for v in values]
+    if len(values) < window:
+        return [None] * len(values)
+    if np is not None:
+        means = np.convolve(np.asarray(values, dtype=float), np.ones(window) / window, mode='valid').tolist()
+    else:
+        running = sum(values[:window])
+        means = [running / window]
+        for i in range(window, len(values)):
+            running += values[i] - values[i - window]
+            means.append(running / window)
+    return [None] * (window - 1) + [round(m, 2) for m in means]
+
+
+def deltas(values):
+    """Change from the previous bucket (absolute and %); None for the first bucket"""
+    if not values:
+        return [], []
+    if np is not None:
+        array = np.asarray(values, dtype=float)
+        change = np.diff(array)
+        previous = array[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.where(previous != 0, change / np.where(previous != 0, previous, 1) * 100, np.nan)
+        absolute = [round(v, 2) for v in change.tolist()]
+        percent = [None if np.isnan(v) else round(v, 2) for v in percent.tolist()]
+    else:
+        absolute = [round(b - a, 2) for a, b in zip(values, values[1:])]
+        percent = [round((b - a) / a * 100, 2) if a else None for a, b in zip(values, values[1:])]
+    return [None] + absolute, [None] + percent
+
+
+def sales_series(db, start, end, granularity='day', window=None, compare=False):
+    """Orders/revenue per bucket from start to end (inclusive), plus optional
+    moving averages, bucket-over-bucket deltas and the previous equal-length period"""
+    if granularity not in GRANULARITIES:
+        raise InvalidSeries(f'Unknown granularity: {granularity}')
+    buckets = bucket_starts(start, end, granularity)
+
+    if not buckets:
+        raise InvalidSeries('start must not be after end')
+    range_start = buckets[0]
+    # The previous period has the same length and ends where this one starts
+    previous_start = range_start - (next_bucket(buckets[-1], granularity) - range_start)
+    rows = load_rollup_rows(db, previous_start if compare else range_start, end, granularity)
+    orders, revenue_cents = fill_series(rows, buckets, granularity)
+    revenue = [from_cents(cents) for cents in revenue_cents]
+
+    result = {
+        'granularity': granularity,
+        'labels': [bucket.strftime(LABEL_FORMATS[granularity]) for bucket in buckets],
+        'orders_data': orders,
+        'revenue_data': revenue
+    }
+
+    if window:
+        result['moving_average'] = {
+            'window': window,
+            'orders': moving_average(orders, window),
+            'revenue': moving_average(revenue, window)
+        }
+
+    if compare:
+        order_deltas, order_pct = deltas(orders)
+        revenue_deltas, revenue_pct = deltas(revenue)
+        result['deltas'] = {
+            'orders': order_deltas,
+            'orders_pct': order_pct,
+            'revenue': revenue_deltas,
+            'revenue_pct': revenue_pct
+        }
+
+        previous = [r for r in rows if r[0] < range_start]
+        previous_orders = sum(r[1] or 0 for r in previous)
+        previous_revenue = sum(int(r[2] or 0) for r in previous)
+        current_revenue = sum(revenue_cents)
+        result['previous_period'] = {
+            'orders': previous_orders,
+            'revenue': from_cents(previous_revenue),
+            'orders_change': sum(orders) - previous_orders,
+            'revenue_change': from_cents(current_revenue - previous_revenue),
+            'revenue_change_pct': round((current_revenue - previous_revenue) / previous_revenue * 100, 2)
+            if previous_revenue else None
+        }
+
+    return result
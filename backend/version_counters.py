@@ -0,0 +1,32 @@
+# backend/version_counters.py
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from models import VersionCounter
+
+
+def _insert(db):
+    return postgresql_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+
+
+def ensure_version_counter(db, name, start):
+    """Create counter `name` at `start` unless it exists, so a counter taking
+    over from versions already in a table continues above them"""
+    db.execute(_insert(db)(VersionCounter).values(name=name, version=start).on_conflict_do_nothing())
+
+
+def bump_version_counter(db, name):
+    """Take the next version of counter `name` inside the caller's transaction.
+
+    The UPDATE holds the counter's row lock until the caller commits, so a
+    second writer only gets its version once the first has committed:
+    versions follow commit order, on SQLite and PostgreSQL alike.
+    """
+    statement = update(VersionCounter).where(VersionCounter.name == name).values(
+        version=VersionCounter.version + 1).returning(VersionCounter.version)
+    version = db.execute(statement).scalar()
+    if version is None:
+        # First use of this counter; another transaction may be creating it too
+        ensure_version_counter(db, name, 0)
+        version = db.execute(statement).scalar()
+    return version
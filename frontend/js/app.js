@@ -67,6 +67,11 @@ async request(endpoint, options = {}) {
         return this.request(`/products/${productId}`);
     }
     
+    // Resolve many products in one request: { products: {id: product}, missing: [ids] }
+    async getProductsByIds(productIds) {
+        return this.request(`/products?ids=${productIds.join(',')}`);
+    }
+    
     async getCategories() {
         return this.request('/products/categories');
     }
@@ -115,6 +120,17 @@ async request(endpoint, options = {}) {
         });
     }
     
+    // Apply many line changes at once: [{ item_id | product_id, quantity }], quantity 0 removes
+    async batchUpdateCart(operations) {
+        return this.request('/cart/batch', {
+            method: 'PATCH',
+            body: JSON.stringify({
+                session_id: this.sessionId,
+                operations
+            })
+        });
+    }
+    
     async clearCart() {
         return this.request(`/cart/clear?session_id=${this.sessionId}`, {
             method: 'DELETE'
@@ -220,27 +236,29 @@ async function fetchCart() {
         const response = await api.getCart();
         console.log('📦 Cart response:', response);  // Add this line to debug
         
-        const cartItemsContainer = document.getElementById('cartItems');
-        const cartSummaryContainer = document.getElementById('cartSummary');
+        showCart(response);
+    } catch (error) {
+        console.error('Error fetching cart:', error);
+        showEmptyCart();
+    }
+}
+
+// Render a cart payload, as returned by GET /cart and PATCH /cart/batch
+function showCart(response) {
+    if (response.success) {
+        // FIX HERE: Use response.items (plural) instead of response.items
+        const cartItems = response.items || [];
         
-        if (response.success) {
-            // FIX HERE: Use response.items (plural) instead of response.items
-            const cartItems = response.items || [];
+        if (cartItems.length > 0) {
+            // Render cart items
+            renderCartItems(cartItems);
             
-            if (cartItems.length > 0) {
-                // Render cart items
-                renderCartItems(cartItems);
-                
-                // Render cart summary
-                renderCartSummary(response);
-            } else {
-                showEmptyCart();
-            }
+            // Render cart summary
+            renderCartSummary(response);
         } else {
             showEmptyCart();
         }
-    } catch (error) {
-        console.error('Error fetching cart:', error);
+    } else {
         showEmptyCart();
     }
 }
@@ -361,9 +379,9 @@ async function updateCartItemQuantity(itemId, newQuantity) {
             return;
         }
         
-        await api.updateCartItem(itemId, newQuantity);
+        // The batch endpoint answers with the updated cart
+        showCart(await api.batchUpdateCart([{ item_id: itemId, quantity: newQuantity }]));
         showNotification('Cart updated successfully');
-        fetchCart();
     } catch (error) {
         console.error('Error updating cart item:', error);
         showNotification('Failed to update cart', 'error');
@@ -372,9 +390,8 @@ async function updateCartItemQuantity(itemId, newQuantity) {
 
 async function removeCartItem(itemId) {
     try {
-        await api.removeFromCart(itemId);
+        showCart(await api.batchUpdateCart([{ item_id: itemId, quantity: 0 }]));
         showNotification('Item removed from cart');
-        fetchCart();
     } catch (error) {
         console.error('Error removing cart item:', error);
         showNotification('Failed to remove item', 'error');
@@ -278,58 +278,62 @@ class DiscountManager {
     async updateCartPrices() {
         console.log('🔄 Updating cart prices with discounts...');
         
-        // Update each cart item with discounts
-        for (const cartItem of this.cartItems) {
-            if (cartItem.product) {
-                console.log(`🔄 Processing: ${cartItem.product.name}, Qty: ${cartItem.quantity}`);
-                const discountedPrice = await this.calculateDiscountedPrice(
-                    cartItem.product.id, 
-                    cartItem.quantity
-                );
-                
-                // Update the cart item display
-                this.updateCartItemDisplay(cartItem.id, cartItem.product.price, discountedPrice, cartItem.quantity);
-            }
+        const lines = this.cartItems.filter(cartItem => cartItem.product);
+        const pricing = await this.calculateCartPricing(lines);
+        const finalPrices = {};
+        if (pricing && pricing.lines) {
+            pricing.lines.forEach(line => {
+                finalPrices[line.product_id] = line.final_price;
+            });
+        }
+        
+        // Update each cart item display from the single pricing response
+        for (const cartItem of lines) {
+            const discountedPrice = finalPrices[cartItem.product.id] !== undefined
+                ? finalPrices[cartItem.product.id] : null;
+            this.updateCartItemDisplay(cartItem.id, cartItem.product.price, discountedPrice, cartItem.quantity);
         }
         
         // Update cart summary
         await this.updateCartSummary();
     }
 
-    async calculateDiscountedPrice(productId, quantity) {
-        try {
-            console.log(`🔍 Calculating discount for product ${productId}, quantity ${quantity}`);
-            console.log(`🔍 Applied discounts:`, this.appliedDiscounts);
+    buildDiscountsPayload() {
+        // Prepare discounts data for API
+        return this.appliedDiscounts.map(d => {
+            const discountObj = {
+                type: d.type,
+                code: d.code || null
+            };
             
-            // Prepare discounts data for API
-            const discountsData = this.appliedDiscounts.map(d => {
-                const discountObj = {
-                    type: d.type,
-                    code: d.code || null
-                };
-                
-                if (d.type === 'percentage') {
-                    discountObj.percentage = d.value;
-                } else if (d.type === 'fixed') {
-                    discountObj.amount = d.value;
-                } else if (d.type === 'bulk') {
-                    discountObj.percentage = d.value;
-                    discountObj.min_quantity = d.min_quantity;
-                    // Include total cart quantity for bulk discount validation
-                    discountObj.cart_total_quantity = this.cartTotalQuantity;
-                } else if (d.discountData) {
-                    // For coupon discounts
-                    discountObj.type = d.discountData.type;
-                    if (d.discountData.percentage) {
-                        discountObj.percentage = d.discountData.percentage;
-                    }
-                    if (d.discountData.amount) {
-                        discountObj.amount = d.discountData.amount;
-                    }
+            if (d.type === 'percentage') {
+                discountObj.percentage = d.value;
+            } else if (d.type === 'fixed') {
+                discountObj.amount = d.value;
+            } else if (d.type === 'bulk') {
+                // The server checks min_quantity against the whole cart
+                discountObj.percentage = d.value;
+                discountObj.min_quantity = d.min_quantity;
+            } else if (d.discountData) {
+                // For coupon discounts
+                discountObj.type = d.discountData.type;
+                if (d.discountData.percentage) {
+                    discountObj.percentage = d.discountData.percentage;
                 }
-                
-                return discountObj;
-            });
+                if (d.discountData.amount) {
+                    discountObj.amount = d.discountData.amount;
+                }
+            }
+            
+            return discountObj;
+        });
+    }
+
+    async calculateCartPricing(lines) {
+        if (lines.length === 0) return null;
+        
+        try {
+            console.log(`🔍 Pricing ${lines.length} cart lines with discounts:`, this.appliedDiscounts);
             
             const response = await fetch(`${API_BASE_URL}/discounts/apply`, {
                 method: 'POST',
@@ -337,22 +341,20 @@ class DiscountManager {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    product_id: productId,
-                    quantity: quantity,
-                    discounts: discountsData
+                    items: lines.map(cartItem => ({
+                        product_id: cartItem.product.id,
+                        quantity: cartItem.quantity
+                    })),
+                    discounts: this.buildDiscountsPayload()
                 })
             });
 
             const data = await response.json();
             console.log(`🔍 Discount API response:`, data);
             
-            if (data && data.final_price !== undefined) {
-                return data.final_price;
-            }
-            
-            return null;
+            return response.ok ? data : null;
         } catch (error) {
-            console.error('❌ Error calculating discount:', error);
+            console.error('❌ Error calculating discounts:', error);
             return null;
         }
     }